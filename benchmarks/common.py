@@ -0,0 +1,39 @@
+"""
+Общие функции бенчмарков.
+
+Бенчмарки запускаются из корня репозитория как модули, например
+python -m benchmarks.indexes. Конфигурация бота читается при импорте,
+поэтому setup() вызывается до импорта пакета bumblebeereminderbot.
+"""
+import logging
+import os
+import tempfile
+
+# Токен в формате Bot API; бенчмарки не обращаются к настоящему Telegram
+BENCHMARK_TOKEN = "123456:" + "A" * 35
+
+
+def setup(name: str, **env: str) -> str:
+    """
+    Настраивает окружение бенчмарка: токен, отдельную временную базу данных и журнал.
+
+    :param name: Имя бенчмарка, используется в имени каталога базы данных
+    :param env: Дополнительные переменные окружения конфигурации бота
+    :return: Путь к файлу базы данных
+    """
+    path = os.path.join(tempfile.mkdtemp(prefix=f"bench-{name}-"), "db.sqlite3")
+    os.environ["TOKEN"] = BENCHMARK_TOKEN
+    os.environ["DB_URL"] = f"sqlite+aiosqlite:///{path}"
+    # Заполнение таблиц большими порциями не должно попадать в журнал медленных запросов
+    os.environ["SLOW_QUERY_MS"] = str(3600 * 1000)
+    os.environ.update(env)
+    logging.basicConfig(level=logging.WARNING)
+    return path
+
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    Возвращает перцентиль q (от 0 до 1) списка значений.
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
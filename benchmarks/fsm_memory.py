@@ -0,0 +1,70 @@
+"""
+Память состояния FSM на одного пользователя со списком заметок.
+
+Для --users пользователей, открывших страницу из 10 заметок, строятся
+данные FSM двух видов и измеряются через tracemalloc:
+- как раньше: курсоры страницы и ORM-объекты заметок страницы;
+- как сейчас: только курсоры и номер страницы.
+Страница для каждого пользователя загружается из базы отдельно, как при
+отдельных обновлениях, без кэша запросов.
+
+    python -m benchmarks.fsm_memory
+    python -m benchmarks.fsm_memory --users 2000
+"""
+import argparse
+import asyncio
+import gc
+import tracemalloc
+from datetime import datetime, timedelta
+
+from benchmarks.common import setup
+
+setup("fsm_memory", WRITE_BATCH_DELAY="0")
+
+from bumblebeereminderbot.database import requests as rq  # noqa: E402
+from bumblebeereminderbot.database.migrations import migrate  # noqa: E402
+from bumblebeereminderbot.database.writer import writer  # noqa: E402
+
+
+async def measure(users: int, keep_items: bool) -> float:
+    """
+    Возвращает память данных FSM на одного пользователя в КиБ.
+
+    :param users: Количество пользователей
+    :param keep_items: Хранить ли в состоянии объекты заметок страницы
+    """
+    gc.collect()
+    tracemalloc.start()
+    storage = {}
+    for user in range(users):
+        # Загрузка в обход кэша: у каждого пользователя свои объекты
+        page = await rq.get_notes_page.__wrapped__(1)
+        data = {"notes_cursors": [None, page.after], "notes_page": 0}
+        if keep_items:
+            data["notes"] = page.items
+        storage[user] = data
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / users / 1024
+
+
+async def main(users: int) -> None:
+    await migrate()
+    started = datetime(2024, 1, 1)
+    for i in range(30):
+        await rq.set_note(f"Заметка {i}", started + timedelta(hours=i), 1, "описание заметки " * 10)
+
+    before = await measure(users, keep_items=True)
+    after = await measure(users, keep_items=False)
+    print(f"{users} users with a 10-note page")
+    print(f"page objects in FSM (before): {before:.1f} KiB per user")
+    print(f"cursors only (after):         {after:.1f} KiB per user")
+    await writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500, help="количество пользователей")
+    args = parser.parse_args()
+    asyncio.run(main(args.users))
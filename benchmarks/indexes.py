@@ -0,0 +1,98 @@
+"""
+Задержка запросов одного пользователя при росте таблицы заметок.
+
+Таблица notes заполняется до каждого из размеров --sizes (по --per-user
+заметок на пользователя). На каждом размере для случайных пользователей
+выполняются первая страница заметок (NOTES_PAGE) и полный список
+(NOTES_BY_OWNER): с индексом (tg_id, note_date) и, для сравнения, тот же
+запрос с NOT INDEXED, то есть полным просмотром таблицы.
+
+    python -m benchmarks.indexes
+    python -m benchmarks.indexes --sizes 10000 100000 --queries 200
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import percentile, setup
+
+setup("indexes")
+
+from sqlalchemy import insert, text  # noqa: E402
+
+from bumblebeereminderbot.database import statements as st  # noqa: E402
+from bumblebeereminderbot.database.migrations import migrate  # noqa: E402
+from bumblebeereminderbot.database.models import async_session, read_session, Note  # noqa: E402
+
+# Запрос первой страницы без индекса: тот же NOTES_PAGE.first с запретом индексов
+PAGE_NOT_INDEXED = text(
+    "SELECT * FROM notes NOT INDEXED WHERE tg_id = :owner_id ORDER BY note_date, note_id LIMIT :limit"
+)
+
+
+async def fill(start: int, stop: int, per_user: int, batch_size: int = 50_000) -> None:
+    """
+    Добавляет заметки с номерами [start, stop); заметка i принадлежит пользователю i // per_user.
+    """
+    base = datetime(2024, 1, 1)
+    for offset in range(start, stop, batch_size):
+        rows = [
+            {
+                "note_title": f"Заметка {i}",
+                "note_description": "Описание заметки",
+                "note_date": base + timedelta(minutes=i),
+                "tg_id": i // per_user,
+            }
+            for i in range(offset, min(offset + batch_size, stop))
+        ]
+        async with async_session() as session:
+            await session.execute(insert(Note.__table__), rows)
+            await session.commit()
+    async with async_session() as session:
+        await session.execute(text("ANALYZE"))
+        await session.commit()
+
+
+async def measure(statement, users: int, queries: int, params: dict) -> tuple[float, float]:
+    """
+    Выполняет запрос queries раз для случайных пользователей.
+
+    :return: Кортеж (p50, p99) в миллисекундах
+    """
+    timings = []
+    async with read_session() as session:
+        for _ in range(queries):
+            owner = random.randrange(users)
+            started = time.perf_counter()
+            (await session.execute(statement, {**params, "owner_id": owner, "tg_id": owner})).all()
+            timings.append((time.perf_counter() - started) * 1000)
+    return percentile(timings, 0.5), percentile(timings, 0.99)
+
+
+async def main(sizes: list[int], per_user: int, queries: int) -> None:
+    await migrate()
+    print(f"{'rows':>9} {'users':>7} {'page p50/p99 ms':>17} {'list p50/p99 ms':>17} {'no index p50/p99 ms':>21}")
+    filled = 0
+    for size in sorted(sizes):
+        await fill(filled, size, per_user)
+        filled = size
+        users = size // per_user
+        page = await measure(st.NOTES_PAGE.first, users, queries, {"limit": 11})
+        full = await measure(st.NOTES_BY_OWNER, users, queries, {})
+        # Полный просмотр на больших таблицах медленный, поэтому запросов меньше
+        scan = await measure(PAGE_NOT_INDEXED, users, max(10, queries // 20), {"limit": 11})
+        print(
+            f"{size:>9} {users:>7} {page[0]:>8.3f}/{page[1]:<8.3f} {full[0]:>8.3f}/{full[1]:<8.3f} "
+            f"{scan[0]:>10.2f}/{scan[1]:<10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--per-user", type=int, default=100, help="заметок на пользователя")
+    parser.add_argument("--queries", type=int, default=1000, help="запросов на каждый замер")
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.per_user, args.queries))
@@ -0,0 +1,134 @@
+"""
+Рассылка напоминаний, наступивших в одну минуту.
+
+В базу добавляются --history уже отправленных напоминаний и --reminders
+напоминаний на одну минуту, по --per-user на пользователя. Затем
+ReminderDispatcher отправляет наступившие напоминания через бота-заглушку,
+который отвечает через --api-delay мс. Замер повторяется для каждого
+значения --workers на новых напоминаниях той же минуты.
+
+Отчет: время выборки наступивших напоминаний, количество сообщений после
+объединения по пользователям, время отправки и оценка времени отправки при
+ограничении RATE_LIMIT_GLOBAL сообщений в секунду, без объединения и с ним.
+
+    python -m benchmarks.reminder_delivery
+    python -m benchmarks.reminder_delivery --reminders 2000 --workers 16
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import setup
+
+setup("reminder_delivery")
+
+from sqlalchemy import insert, text  # noqa: E402
+
+from bumblebeereminderbot.config import RATE_LIMIT_GLOBAL, REMINDER_BATCH_SIZE, REMINDER_MAX_ATTEMPTS  # noqa: E402
+from bumblebeereminderbot.database import requests as rq  # noqa: E402
+from bumblebeereminderbot.database.migrations import migrate  # noqa: E402
+from bumblebeereminderbot.database.models import async_session, User, Car, Reminder  # noqa: E402
+from bumblebeereminderbot.database.writer import writer  # noqa: E402
+from bumblebeereminderbot.telegram.delivery.reminders import ReminderDispatcher  # noqa: E402
+
+
+class FakeBot:
+    """
+    Заглушка бота: считает сообщения и отвечает с задержкой вызова Bot API.
+    """
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.sent = 0
+
+    async def send_message(self, chat_id: int, text: str) -> None:
+        await asyncio.sleep(self.delay)
+        self.sent += 1
+
+
+async def fill(users: int, reminders: int, history: int, due: datetime) -> None:
+    """
+    Заполняет базу: пользователи с одним автомобилем, история отправленных и наступившие напоминания.
+    """
+    async with async_session() as session:
+        # История остается между замерами, удаляются только напоминания этой минуты
+        await session.execute(text("DELETE FROM reminders WHERE reminder_date >= :due"), {"due": due})
+        await session.execute(insert(User.__table__).prefix_with("OR IGNORE"), [{"tg_id": u} for u in range(users)])
+        await session.execute(
+            insert(Car.__table__).prefix_with("OR IGNORE"),
+            [{"car_id": u, "name": f"Car {u}", "year": 2020, "tg_id": u} for u in range(users)]
+        )
+        for offset in range(0, history, 50_000):
+            await session.execute(insert(Reminder.__table__), [
+                {
+                    "reminder_title": "ТО", "reminder_description": "Плановое обслуживание",
+                    "reminder_date": due - timedelta(days=1 + i % 365), "is_done_reminder": False,
+                    "car_id": i % users, "delivered_at": due, "delivery_attempts": 1,
+                }
+                for i in range(offset, min(offset + 50_000, history))
+            ])
+        # Напоминания одного пользователя добавлены в разное время, их id перемешаны
+        await session.execute(insert(Reminder.__table__), [
+            {
+                "reminder_title": f"Задача {i}", "reminder_description": "Описание задачи",
+                "reminder_date": due, "is_done_reminder": False, "car_id": i % users, "delivery_attempts": 0,
+            }
+            for i in range(reminders)
+        ])
+        await session.commit()
+
+
+async def select_due(due: datetime) -> tuple[int, float]:
+    """
+    Выбирает все наступившие напоминания порциями, как ReminderDispatcher.
+
+    :return: Кортеж (количество напоминаний, время в мс)
+    """
+    started = time.perf_counter()
+    count, after = 0, None
+    while True:
+        rows = await rq.get_due_reminders(due, REMINDER_MAX_ATTEMPTS, after=after, limit=REMINDER_BATCH_SIZE)
+        count += len(rows)
+        if len(rows) < REMINDER_BATCH_SIZE:
+            break
+        after = (rows[-1].tg_id, rows[-1].reminder_id)
+    return count, (time.perf_counter() - started) * 1000
+
+
+async def main(args) -> None:
+    await migrate()
+    users = args.reminders // args.per_user
+    due = datetime.now().replace(second=0, microsecond=0)
+    print(
+        f"{args.reminders} reminders due for {users} users, {args.history} delivered in history, "
+        f"{args.api_delay:g} ms per Bot API call"
+    )
+    for workers in args.workers:
+        await fill(users, args.reminders, args.history if workers == args.workers[0] else 0, due)
+        count, select_ms = await select_due(due)
+
+        bot = FakeBot(args.api_delay / 1000)
+        started = time.perf_counter()
+        delivered, failed = await ReminderDispatcher(bot, workers=workers).run(due)
+        elapsed = time.perf_counter() - started
+        print(
+            f"workers={workers:<4} select {count} due in {select_ms:6.0f} ms, "
+            f"delivered {delivered} ({failed} failed) in {bot.sent} messages, {elapsed:6.2f} s"
+        )
+
+    print(
+        f"At RATE_LIMIT_GLOBAL={RATE_LIMIT_GLOBAL:g} msg/s: one message per reminder "
+        f"{args.reminders / RATE_LIMIT_GLOBAL:.0f} s, coalesced {users / RATE_LIMIT_GLOBAL:.0f} s"
+    )
+    await writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reminders", type=int, default=10_000, help="напоминаний на одну минуту")
+    parser.add_argument("--per-user", type=int, default=4, help="наступивших напоминаний на пользователя")
+    parser.add_argument("--history", type=int, default=200_000, help="уже отправленных напоминаний")
+    parser.add_argument("--workers", type=int, nargs="+", default=[16, 64], help="варианты REMINDER_WORKERS")
+    parser.add_argument("--api-delay", type=float, default=50, help="имитация вызова Bot API, мс")
+    asyncio.run(main(parser.parse_args()))
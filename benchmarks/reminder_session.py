@@ -0,0 +1,151 @@
+"""
+Отправка --reminders наступивших напоминаний: новый Bot на каждое
+напоминание против общей сессии бота с пулом соединений.
+
+Локальный сервер aiohttp изображает Bot API по HTTPS с самоподписанным
+сертификатом (создается через openssl) и отвечает на sendMessage сразу.
+Напоминания отправляются по --concurrency одновременно, как их запускает
+планировщик. Ограничитель частоты не подключен: измеряется только
+стоимость соединений.
+
+- "Bot per reminder": как раньше send_message_scheduler - новый Bot,
+  новая сессия aiohttp и TLS-рукопожатие на каждое напоминание;
+- "shared session": один Bot с AiohttpSession(limit=BOT_CONNECTION_LIMIT),
+  как в app.py.
+
+Клиент и сервер работают в одном процессе, поэтому время вариантов с
+новыми соединениями включает и серверную сторону рукопожатий.
+
+    python -m benchmarks.reminder_session
+    python -m benchmarks.reminder_session --reminders 2000
+"""
+import argparse
+import asyncio
+import os
+import ssl
+import subprocess
+import tempfile
+import time
+import weakref
+
+from benchmarks.common import BENCHMARK_TOKEN, percentile, setup
+
+setup("reminder_session")
+
+from aiogram import Bot  # noqa: E402
+from aiogram.client.session.aiohttp import AiohttpSession  # noqa: E402
+from aiogram.client.telegram import TelegramAPIServer  # noqa: E402
+from aiohttp import web  # noqa: E402
+
+from bumblebeereminderbot.config import BOT_CONNECTION_LIMIT  # noqa: E402
+
+
+def make_certificate() -> tuple[str, str]:
+    """
+    Создает самоподписанный сертификат для 127.0.0.1.
+
+    :return: Пути к сертификату и ключу
+    """
+    directory = tempfile.mkdtemp(prefix="bench-cert-")
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+            "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+            "-keyout", key, "-out", cert,
+        ],
+        check=True, capture_output=True
+    )
+    return cert, key
+
+
+def make_session(api: TelegramAPIServer, cert: str, limit: int = 100) -> AiohttpSession:
+    """
+    Создает сессию бота, доверяющую сертификату тестового сервера.
+    """
+    session = AiohttpSession(api=api, limit=limit)
+    # Публичного параметра для своего SSL-контекста у AiohttpSession нет
+    session._connector_init["ssl"] = ssl.create_default_context(cafile=cert)
+    return session
+
+
+async def run(label: str, send, reminders: int, concurrency: int, connections: list[int]) -> None:
+    """
+    Отправляет reminders напоминаний функцией send(chat_id), не больше concurrency одновременно.
+
+    :param connections: Счетчик новых соединений сервера из одного элемента
+    """
+    connections[0] = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+
+    async def one(chat_id):
+        async with semaphore:
+            started = time.perf_counter()
+            await send(chat_id)
+            timings.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(reminders)))
+    elapsed = time.perf_counter() - started
+    print(
+        f"{label:18} {elapsed:7.1f} s  {reminders / elapsed:6.0f} msg/s  "
+        f"p50 {percentile(timings, 0.5):7.1f} ms  p99 {percentile(timings, 0.99):7.1f} ms  "
+        f"connections {connections[0]}"
+    )
+
+
+async def main(reminders: int, concurrency: int, port: int) -> None:
+    cert, key = make_certificate()
+    # Открытые соединения; транспорт закрытого соединения удаляется из множества
+    # сам, поэтому запрос с транспортом не из множества пришел по новому соединению
+    open_transports = weakref.WeakSet()
+    connections = [0]
+
+    async def send_message(request: web.Request) -> web.Response:
+        if request.transport not in open_transports:
+            open_transports.add(request.transport)
+            connections[0] += 1
+        data = await request.post()
+        return web.json_response({"ok": True, "result": {
+            "message_id": 1, "date": 0, "text": data.get("text", ""),
+            "chat": {"id": int(data.get("chat_id", 0)), "type": "private"},
+        }})
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/sendMessage", send_message)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    server_ssl = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    server_ssl.load_cert_chain(cert, key)
+    await web.TCPSite(runner, "127.0.0.1", port, ssl_context=server_ssl).start()
+    api = TelegramAPIServer.from_base(f"https://127.0.0.1:{port}")
+
+    async def bot_per_reminder(chat_id):
+        bot = Bot(BENCHMARK_TOKEN, session=make_session(api, cert))
+        try:
+            await bot.send_message(chat_id=chat_id, text="Напоминание")
+        finally:
+            await bot.session.close()
+
+    shared = Bot(BENCHMARK_TOKEN, session=make_session(api, cert, limit=BOT_CONNECTION_LIMIT))
+
+    async def shared_session(chat_id):
+        await shared.send_message(chat_id=chat_id, text="Напоминание")
+
+    print(f"{reminders} reminders, {concurrency} at a time, BOT_CONNECTION_LIMIT={BOT_CONNECTION_LIMIT}")
+    try:
+        await run("Bot per reminder", bot_per_reminder, reminders, concurrency, connections)
+        await run("shared session", shared_session, reminders, concurrency, connections)
+    finally:
+        await shared.session.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reminders", type=int, default=10_000, help="количество напоминаний")
+    parser.add_argument("--concurrency", type=int, default=100, help="одновременных отправок")
+    parser.add_argument("--port", type=int, default=8443)
+    args = parser.parse_args()
+    asyncio.run(main(args.reminders, args.concurrency, args.port))
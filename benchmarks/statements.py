@@ -0,0 +1,99 @@
+"""
+Накладные расходы на построение запросов: новый select() на каждый вызов
+против объекта запроса из database/statements.py, построенного один раз.
+
+Для каждого частого запроса измеряется:
+- построение запроса (build);
+- построение и вычисление ключа кэша компиляции (build+key) против ключа
+  готового объекта, у которого он запоминается (key pre);
+- полное выполнение запроса в синхронной сессии SQLite.
+Экономия на вызов пересчитывается в процессорное время в секунду при
+--rate обновлений в секунду и --queries запросах на обновление.
+
+    python -m benchmarks.statements
+    python -m benchmarks.statements --calls 50000 --rate 200
+"""
+import argparse
+import timeit
+
+from benchmarks.common import setup
+
+DB_PATH = setup("statements")
+
+from sqlalchemy import and_, create_engine, func, select  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from bumblebeereminderbot.database import statements as st  # noqa: E402
+from bumblebeereminderbot.database.models import Base, Car, Note, Analytics  # noqa: E402
+
+# Запросы: (название, построение нового запроса, готовый запрос, параметры готового запроса)
+QUERIES = (
+    (
+        "cars by tg_id",
+        lambda: select(Car).where(Car.tg_id == 1),
+        st.CARS_BY_OWNER, {"tg_id": 1},
+    ),
+    (
+        "notes by tg_id",
+        lambda: select(Note).where(Note.tg_id == 1),
+        st.NOTES_BY_OWNER, {"tg_id": 1},
+    ),
+    (
+        "notes first page",
+        lambda: select(Note).where(Note.tg_id == 1).order_by(Note.note_date, Note.note_id).limit(11),
+        st.NOTES_PAGE.first, {"owner_id": 1, "limit": 11},
+    ),
+    (
+        "analytics by id",
+        lambda: select(Analytics).where(and_(Analytics.analytics_id == 1, Analytics.tg_id == 1)),
+        st.ANALYTICS_BY_ID, {"analytics_id": 1, "tg_id": 1},
+    ),
+    (
+        "notes count",
+        lambda: select(func.count()).select_from(Note).where(Note.tg_id == 1),
+        st.NOTES_PAGE.count, {"owner_id": 1},
+    ),
+)
+
+
+def per_call(statement, calls: int) -> float:
+    """
+    Возвращает среднее время вызова statement в микросекундах.
+    """
+    return timeit.timeit(statement, number=calls) / calls * 1e6
+
+
+def main(calls: int, rate: float, queries: int) -> None:
+    engine = create_engine(f"sqlite:///{DB_PATH}")
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+
+    print(f"{calls} calls, per call in us")
+    print(f"{'query':18} {'build':>7} {'build+key':>9} {'key pre':>8} {'exec new':>9} {'exec pre':>9} {'saved':>7}")
+    saved_total = 0.0
+    for name, build, prebuilt, params in QUERIES:
+        build_time = per_call(build, calls)
+        key_new = per_call(lambda: build()._generate_cache_key(), calls)
+        key_pre = per_call(lambda: prebuilt._generate_cache_key(), calls)
+        exec_new = per_call(lambda: session.execute(build()).all(), calls)
+        exec_pre = per_call(lambda: session.execute(prebuilt, params).all(), calls)
+        saved = exec_new - exec_pre
+        saved_total += saved
+        print(
+            f"{name:18} {build_time:>7.1f} {key_new:>9.1f} {key_pre:>8.1f} "
+            f"{exec_new:>9.1f} {exec_pre:>9.1f} {saved:>7.1f}"
+        )
+
+    average = saved_total / len(QUERIES)
+    cpu = average * rate * queries / 1000
+    print(f"\nAverage saved per query: {average:.1f} us")
+    print(f"At {rate:g} updates/s x {queries} queries: {cpu:.1f} ms of CPU per second saved")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20_000, help="вызовов в каждом замере")
+    parser.add_argument("--rate", type=float, default=100, help="обновлений в секунду")
+    parser.add_argument("--queries", type=int, default=3, help="запросов к базе на одно обновление")
+    args = parser.parse_args()
+    main(args.calls, args.rate, args.queries)
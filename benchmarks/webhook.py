@@ -0,0 +1,138 @@
+"""
+Нагрузочный тест webhook: задержка обработки синтетических обновлений.
+
+Локальный сервер aiohttp принимает обновления через обработчик aiogram
+SimpleRequestHandler (задача на каждое обновление) и через
+WorkerRequestHandler с разным количеством обработчиков. Клиенты отправляют
+POST с сообщениями на webhook; обработчик сообщения читает автомобили
+пользователя из базы и ждет --api-delay мс вместо вызова Bot API.
+Задержка считается от отправки POST до завершения обработчика.
+
+Без --rate клиенты отправляют обновления без пауз (насыщение), с --rate
+обновления отправляются с постоянной частотой.
+
+    python -m benchmarks.webhook
+    python -m benchmarks.webhook --rate 500 --workers 64
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import BENCHMARK_TOKEN, percentile, setup
+
+setup("webhook")
+
+from aiogram import Bot, Dispatcher, types  # noqa: E402
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler  # noqa: E402
+from aiohttp import ClientSession, web  # noqa: E402
+
+from bumblebeereminderbot.database import requests as rq  # noqa: E402
+from bumblebeereminderbot.database.migrations import migrate  # noqa: E402
+from bumblebeereminderbot.database.writer import writer  # noqa: E402
+from bumblebeereminderbot.telegram.webhook.handler import WorkerRequestHandler  # noqa: E402
+
+SECRET = "benchmark-secret"
+# Количество разных пользователей в синтетических обновлениях
+USERS = 500
+
+
+async def run(label: str, make_handler, args) -> None:
+    """
+    Отправляет args.updates обновлений на webhook и печатает p50/p99 задержки и пропускную способность.
+
+    :param label: Название варианта в отчете
+    :param make_handler: Функция (dispatcher, bot) -> обработчик webhook
+    """
+    dp = Dispatcher()
+    bot = Bot(BENCHMARK_TOKEN)
+    sent: dict[int, float] = {}
+    done: dict[int, float] = {}
+    finished = asyncio.Event()
+
+    @dp.message()
+    async def handle(message: types.Message):
+        await rq.get_cars(message.from_user.id)
+        await asyncio.sleep(args.api_delay / 1000)
+        done[message.message_id] = time.perf_counter()
+        if len(done) == args.updates:
+            finished.set()
+
+    app = web.Application()
+    handler = make_handler(dp, bot)
+    handler.register(app, path="/webhook")
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+
+    queue = asyncio.Queue()
+    for i in range(args.updates):
+        queue.put_nowait(i)
+    started = time.perf_counter()
+    # Отправка с постоянной частотой начинается через 0,1 с, когда все клиенты запущены
+    first_send = started + 0.1
+
+    async def client(session):
+        while not queue.empty():
+            i = queue.get_nowait()
+            if args.rate:
+                delay = first_send + i / args.rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            update = {
+                "update_id": i,
+                "message": {
+                    "message_id": i, "date": 0, "text": "hi",
+                    "chat": {"id": i % USERS, "type": "private"},
+                    "from": {"id": i % USERS, "is_bot": False, "first_name": "User"},
+                },
+            }
+            sent[i] = time.perf_counter()
+            response = await session.post(
+                f"http://127.0.0.1:{args.port}/webhook",
+                json=update,
+                headers={"X-Telegram-Bot-Api-Secret-Token": SECRET}
+            )
+            response.raise_for_status()
+
+    try:
+        async with ClientSession() as session:
+            await asyncio.gather(*(client(session) for _ in range(args.clients)))
+        await finished.wait()
+        elapsed = time.perf_counter() - started
+    finally:
+        await runner.cleanup()
+        # Останавливает обработчики WorkerRequestHandler и закрывает сессию бота
+        await handler.close()
+
+    latency = [(done[i] - sent[i]) * 1000 for i in range(args.updates)]
+    print(
+        f"{label:32} p50 {percentile(latency, 0.5):7.1f} ms  p99 {percentile(latency, 0.99):7.1f} ms  "
+        f"{args.updates / elapsed:6.0f} updates/s"
+    )
+
+
+async def main(args) -> None:
+    await migrate()
+    mode = f"paced {args.rate:g} updates/s" if args.rate else f"saturated by {args.clients} clients"
+    print(f"{args.updates} updates, {mode}, {args.api_delay:g} ms per Bot API call")
+    # Прогрев: кэш запросов, соединения с базой, импорт обработчиков
+    await run("warmup", lambda dp, bot: WorkerRequestHandler(dp, bot, workers=16, secret_token=SECRET), args)
+    await run("SimpleRequestHandler", lambda dp, bot: SimpleRequestHandler(dp, bot, secret_token=SECRET), args)
+    for workers in args.workers:
+        await run(
+            f"WorkerRequestHandler workers={workers}",
+            lambda dp, bot: WorkerRequestHandler(dp, bot, workers=workers, secret_token=SECRET),
+            args
+        )
+    await writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=3000, help="количество обновлений в каждом замере")
+    parser.add_argument("--clients", type=int, default=64, help="количество одновременных клиентов")
+    parser.add_argument("--rate", type=float, default=None, help="обновлений в секунду; без него - насыщение")
+    parser.add_argument("--workers", type=int, nargs="+", default=[16, 64], help="варианты WEBHOOK_WORKERS")
+    parser.add_argument("--api-delay", type=float, default=5, help="имитация вызова Bot API, мс")
+    parser.add_argument("--port", type=int, default=8099)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,83 @@
+"""
+Пропускная способность записи: отдельный COMMIT на каждый вызов против очереди записи.
+
+--writes одновременных добавлений заметок выполняются двумя способами:
+- как до появления очереди записи: у каждого вызова своя сессия и свой COMMIT;
+- через rq.set_note, то есть через общую очередь с групповой фиксацией.
+Замер повторяется для каждого уровня одновременности --concurrency.
+
+Режим синхронизации SQLite задается переменной DB_SYNCHRONOUS, как у бота:
+
+    python -m benchmarks.write_queue
+    DB_SYNCHRONOUS=FULL python -m benchmarks.write_queue --writes 1000
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime
+
+from benchmarks.common import percentile, setup
+
+setup("write_queue")
+
+from bumblebeereminderbot.database import requests as rq  # noqa: E402
+from bumblebeereminderbot.database.migrations import migrate  # noqa: E402
+from bumblebeereminderbot.database.models import async_session, Note  # noqa: E402
+from bumblebeereminderbot.database.writer import writer  # noqa: E402
+
+
+async def commit_per_call(tg_id: int) -> None:
+    """
+    Добавление заметки в отдельной транзакции, как до очереди записи.
+    """
+    async with async_session() as session:
+        session.add(Note(note_title="Заметка", note_description="Описание", note_date=datetime.now(), tg_id=tg_id))
+        await session.commit()
+
+
+async def group_commit(tg_id: int) -> None:
+    """
+    Добавление заметки через очередь записи.
+    """
+    await rq.set_note("Заметка", datetime.now(), tg_id, "Описание")
+
+
+async def run(write, writes: int, concurrency: int) -> tuple[float, float, float]:
+    """
+    Выполняет writes вызовов write, не больше concurrency одновременно.
+
+    :return: Кортеж (записей в секунду, p50 мс, p99 мс)
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+
+    async def one(i):
+        async with semaphore:
+            started = time.perf_counter()
+            await write(i % 1000)
+            timings.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(writes)))
+    elapsed = time.perf_counter() - started
+    return writes / elapsed, percentile(timings, 0.5), percentile(timings, 0.99)
+
+
+async def main(writes: int, concurrency: list[int]) -> None:
+    await migrate()
+    print(f"DB_SYNCHRONOUS={os.getenv('DB_SYNCHRONOUS', 'NORMAL')}, {writes} writes")
+    print(f"{'mode':18} {'concurrency':>11} {'writes/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for level in concurrency:
+        for label, write in (("commit per call", commit_per_call), ("group commit", group_commit)):
+            rate, p50, p99 = await run(write, writes, level)
+            print(f"{label:18} {level:>11} {rate:>9.0f} {p50:>8.2f} {p99:>8.2f}")
+    await writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writes", type=int, default=2000, help="количество записей в каждом замере")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 100, 500])
+    args = parser.parse_args()
+    asyncio.run(main(args.writes, args.concurrency))
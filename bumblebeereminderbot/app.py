@@ -1,27 +1,49 @@
 import asyncio
 import logging
+import secrets
+from datetime import datetime
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 
 from aiogram import Bot, Dispatcher, types
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.fsm.scene import SceneRegistry
 from aiogram.fsm.storage.memory import SimpleEventIsolation
+from aiogram.webhook.aiohttp_server import setup_application
+from aiohttp import web
 
-from bumblebeereminderbot.config import TOKEN
+from bumblebeereminderbot.config import TOKEN, ARCHIVE_INTERVAL_HOURS, BOT_CONNECTION_LIMIT, REMINDER_SLICE_SECONDS
+from bumblebeereminderbot.config import WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_SECRET
 from bumblebeereminderbot.telegram.handlers.user_private import user_private, Menu, Profile, Notes, Purchase, Analisis, Reminders
 from bumblebeereminderbot.telegram.common.bot_cmds_list import private
-from bumblebeereminderbot.telegram.middlewares.scheduler import CounterMiddleware
-
-from bumblebeereminderbot.database.models import async_main
+from bumblebeereminderbot.telegram.middlewares.scheduler import CounterMiddleware, setup_reminder_bot
+from bumblebeereminderbot.telegram.middlewares.database import DatabaseMiddleware
+from bumblebeereminderbot.telegram.middlewares.profiling import QueryStatsMiddleware
+from bumblebeereminderbot.telegram.middlewares.ratelimit import RateLimitMiddleware, limiter
+from bumblebeereminderbot.telegram.storage.sqlite import SQLiteStorage
+from bumblebeereminderbot.telegram.webhook.handler import WorkerRequestHandler
+from bumblebeereminderbot.telegram.delivery.reminders import deliver_reminders
+
+from bumblebeereminderbot.database.archive import archive
+from bumblebeereminderbot.database.migrations import migrate
+from bumblebeereminderbot.database.models import read_session
+from bumblebeereminderbot.database.profiling import report
+from bumblebeereminderbot.database.writer import writer
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
 logging.basicConfig(filename="log.log", filemode="w", level=logging.DEBUG)
 
 # Инициализация бота и диспетчера
-bot = Bot(token=TOKEN)
-dp = Dispatcher(events_isolation=SimpleEventIsolation())
+# Одна сессия с ограниченным пулом соединений на весь процесс, включая напоминания
+bot = Bot(token=TOKEN, session=AiohttpSession(limit=BOT_CONNECTION_LIMIT))
+# Все исходящие сообщения проходят через общий ограничитель частоты
+bot.session.middleware(RateLimitMiddleware())
+# Состояния FSM хранятся в базе данных и переживают перезапуск; диспетчер
+# закрывает хранилище при остановке раньше on_shutdown, поэтому оставшиеся
+# изменения успевают попасть в очередь записи до её закрытия
+dp = Dispatcher(storage=SQLiteStorage(), events_isolation=SimpleEventIsolation())
 
 # Подключение роутеров
 dp.include_router(user_private)
@@ -40,16 +62,64 @@ scheduler = AsyncIOScheduler(jobstores=jobstores)
 
 
 async def on_startup(bot: Bot):
-    """Запускает планировщик задач при старте бота."""
+    """Регистрирует бота для напоминаний, запускает планировщик задач, рассылку напоминаний и периодический перенос данных в архив при старте бота."""
+    # Напоминания отправляются через сессию этого бота, поэтому он регистрируется до запуска планировщика
+    setup_reminder_bot(bot)
     scheduler.start()
+    scheduler.add_job(archive, "interval", hours=ARCHIVE_INTERVAL_HOURS, id="archive", replace_existing=True)
+    # Проверки выравниваются по началу минуты: напоминания с точностью до минуты
+    # уходят в первую проверку после наступления; пропущенные проверки не копятся
+    scheduler.add_job(
+        deliver_reminders, "interval", seconds=REMINDER_SLICE_SECONDS,
+        start_date=datetime.now().replace(second=0, microsecond=0),
+        id="reminders", replace_existing=True, max_instances=1, coalesce=True
+    )
     print("APScheduler started")
 
 
 
 async def on_shutdown(bot: Bot):
-    """Останавливает планировщик задач при выключении бота."""
+    """Останавливает планировщик задач, дописывает очередь записи и сохраняет отчеты о запросах и отправках при выключении бота."""
     scheduler.shutdown()
     print("APScheduler stopped")
+    await writer.close()
+    logger.info("SQL queries per handler:\n%s", report())
+    logger.info("Outbound messages:\n%s", limiter.report())
+
+
+async def run_polling() -> None:
+    """
+    Получение обновлений через long polling.
+    """
+    # Telegram не отдает обновления через getUpdates, пока установлен webhook
+    await bot.delete_webhook()
+    await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+
+
+async def run_webhook() -> None:
+    """
+    Получение обновлений через webhook: сервер aiohttp принимает обновления
+    от Telegram и передает их пулу обработчиков WorkerRequestHandler.
+    """
+    secret_token = WEBHOOK_SECRET or secrets.token_urlsafe(32)
+    app = web.Application()
+    WorkerRequestHandler(dispatcher=dp, bot=bot, secret_token=secret_token).register(app, path=WEBHOOK_PATH)
+    # Запуск и остановка диспетчера (on_startup, on_shutdown) вместе с сервером
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host=WEBHOOK_HOST, port=WEBHOOK_PORT).start()
+        await bot.set_webhook(
+            url=WEBHOOK_URL,
+            secret_token=secret_token,
+            allowed_updates=dp.resolve_used_update_types()
+        )
+        # Сервер работает до отмены задачи
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
 
 
 async def main() -> None:
@@ -57,18 +127,27 @@ async def main() -> None:
     Основная функция для запуска бота и взаимодействия с базой данных.
     """
     try:
-        # Запуск и создание базы данных
-        await async_main()
+        # Приведение схемы базы данных к актуальной версии
+        await migrate()
         # Регистрируем функцию on_startup, которая будет вызвана при запуске бота
         dp.startup.register(on_startup) 
         # Регистрируем функцию on_shutdown, которая будет вызвана при остановке бота
         dp.shutdown.register(on_shutdown)
         # Добавление middleware для диспетчера с использованием планировщика
         dp.update.middleware(CounterMiddleware(scheduler=scheduler))
+        # Одна сессия базы данных на обновление; внешний middleware, чтобы
+        # сессия попадала и в данные сцен, с которыми работает ScenesManager
+        dp.update.outer_middleware(DatabaseMiddleware(session_pool=read_session))
+        # Учет SQL-запросов каждого обработчика
+        dp.message.middleware(QueryStatsMiddleware())
+        dp.callback_query.middleware(QueryStatsMiddleware())
         # Установка команд бота для всех приватных чатов
         await bot.set_my_commands(commands=private, scope=types.BotCommandScopeAllPrivateChats())
-        # Запуск поллинга (прослушивания обновлений)
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        # Прием обновлений через webhook, если задан его адрес, иначе через поллинг
+        if WEBHOOK_URL:
+            await run_webhook()
+        else:
+            await run_polling()
     except asyncio.exceptions.CancelledError as e:
         print(e)
 
@@ -6,3 +6,81 @@ load_dotenv(find_dotenv())
 
 # Получение токена бота из переменных окружения
 TOKEN = os.environ["TOKEN"]
+
+# Адрес базы данных
+DB_URL = os.getenv("DB_URL", "sqlite+aiosqlite:///db.sqlite3")
+# Количество соединений только для чтения. Соединение занимается только на время
+# запроса и не удерживается при ожидании другого, поэтому пул любого размера не
+# блокируется; размер ограничивает число одновременно выполняемых запросов
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", 4))
+# Настройки SQLite, применяемые к каждому соединению
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", 256 * 1024 * 1024))
+DB_CACHE_SIZE = int(os.getenv("DB_CACHE_SIZE", -64 * 1024))  # Отрицательное значение - размер в КиБ
+DB_BUSY_TIMEOUT = int(os.getenv("DB_BUSY_TIMEOUT", 5000))  # В миллисекундах
+DB_TEMP_STORE = os.getenv("DB_TEMP_STORE", "MEMORY")
+
+# Максимальное количество записей в кэше запросов к базе данных
+CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", 4096))
+# Время жизни записи кэша в секундах
+CACHE_TTL = int(os.getenv("CACHE_TTL", 300))
+# Количество пользователей, регистрация которых запоминается в памяти процесса
+KNOWN_USERS_MAXSIZE = int(os.getenv("KNOWN_USERS_MAXSIZE", 100_000))
+
+# Окно группировки записей в одну транзакцию, в миллисекундах
+WRITE_BATCH_DELAY = int(os.getenv("WRITE_BATCH_DELAY", 5))
+# Максимальное количество операций записи в одной транзакции
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", 100))
+
+# Записи аналитики старше этого количества дней переносятся в архив
+ARCHIVE_ANALYTICS_DAYS = int(os.getenv("ARCHIVE_ANALYTICS_DAYS", 365))
+# Интервал запуска переноса в архив, в часах
+ARCHIVE_INTERVAL_HOURS = int(os.getenv("ARCHIVE_INTERVAL_HOURS", 24))
+
+# Запросы дольше этого времени записываются в журнал медленных запросов, в миллисекундах
+SLOW_QUERY_MS = int(os.getenv("SLOW_QUERY_MS", 100))
+
+# Количество состояний FSM, хранящихся в памяти процесса
+FSM_CACHE_MAXSIZE = int(os.getenv("FSM_CACHE_MAXSIZE", 10_000))
+# Состояние FSM без изменений дольше этого времени удаляется, в секундах
+FSM_TTL = int(os.getenv("FSM_TTL", 7 * 24 * 3600))
+# Интервал записи измененных состояний FSM в базу данных, в миллисекундах
+FSM_FLUSH_INTERVAL = int(os.getenv("FSM_FLUSH_INTERVAL", 1000))
+# Интервал удаления устаревших состояний FSM, в секундах
+FSM_SWEEP_INTERVAL = int(os.getenv("FSM_SWEEP_INTERVAL", 3600))
+
+# Адрес, по которому Telegram отправляет обновления; если не задан, бот работает через long polling
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+# Путь обработчика webhook на локальном сервере
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+# Адрес и порт, на которых слушает сервер webhook
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8080))
+# Секрет, который Telegram передает в заголовке X-Telegram-Bot-Api-Secret-Token;
+# если не задан, при каждом запуске создается случайный
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+# Количество обновлений, обрабатываемых одновременно
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", 64))
+# Количество принятых, но еще не обработанных обновлений, после которого сервер перестает отвечать Telegram
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", 1000))
+
+# Ограничения исходящих сообщений: всего от бота и в один чат, сообщений в секунду
+RATE_LIMIT_GLOBAL = float(os.getenv("RATE_LIMIT_GLOBAL", 30))
+RATE_LIMIT_PER_CHAT = float(os.getenv("RATE_LIMIT_PER_CHAT", 1))
+# Сколько сообщений подряд можно отправить в чат без ожидания
+RATE_LIMIT_CHAT_BURST = float(os.getenv("RATE_LIMIT_CHAT_BURST", 3))
+# Количество повторов запроса после ошибки TelegramRetryAfter
+RATE_LIMIT_RETRIES = int(os.getenv("RATE_LIMIT_RETRIES", 3))
+
+# Наибольшее количество одновременных соединений с Bot API; соединения переиспользуются (keep-alive)
+BOT_CONNECTION_LIMIT = int(os.getenv("BOT_CONNECTION_LIMIT", 32))
+
+# Интервал проверки наступивших напоминаний, в секундах; напоминания, наступившие
+# за интервал, отправляются одной рассылкой
+REMINDER_SLICE_SECONDS = int(os.getenv("REMINDER_SLICE_SECONDS", 30))
+# Количество пользователей, которым напоминания отправляются одновременно
+REMINDER_WORKERS = int(os.getenv("REMINDER_WORKERS", 16))
+# Количество напоминаний, выбираемых из базы за один запрос
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", 1000))
+# Количество попыток отправки напоминания, после которого оно больше не отправляется
+REMINDER_MAX_ATTEMPTS = int(os.getenv("REMINDER_MAX_ATTEMPTS", 3))
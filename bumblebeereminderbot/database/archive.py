@@ -0,0 +1,96 @@
+"""
+Архив выполненных напоминаний и старых записей аналитики.
+
+Рабочие таблицы reminders и analytics хранят только актуальные данные,
+чтобы их индексы оставались небольшими и помещались в кэш. Периодическая
+задача archive() переносит остальные строки в таблицы *_archive.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from bumblebeereminderbot.config import ARCHIVE_ANALYTICS_DAYS, REMINDER_MAX_ATTEMPTS
+from .cache import cache
+from .requests import invalidate_car_dashboard
+from .writer import writer
+
+logger = logging.getLogger(__name__)
+
+REMINDER_COLUMNS = (
+    "reminder_id, reminder_title, reminder_description, reminder_date, is_done_reminder, "
+    "delivered_at, delivery_error, delivery_attempts, car_id"
+)
+ANALYTICS_COLUMNS = "analytics_id, analytics_title, analytics_description, analytics_date, analytics_price, tg_id"
+
+
+def analytics_horizon(now=None) -> datetime:
+    """
+    Возвращает границу архива аналитики: более ранние записи хранятся в analytics_archive.
+    """
+    return (now or datetime.now()) - timedelta(days=ARCHIVE_ANALYTICS_DAYS)
+
+
+async def archive(now=None):
+    """
+    Асинхронная функция для переноса выполненных и прошедших отправленных напоминаний
+    и старых записей аналитики в архивные таблицы.
+
+    Перенос выполняется одной транзакцией через очередь записи. Сводка
+    daily_spending сохраняет архивные суммы, поэтому отчеты по дням и
+    категориям не зависят от того, где лежат исходные записи.
+
+    :param now: Текущее время (для проверки), по умолчанию datetime.now()
+    :return: Кортеж (перенесено напоминаний, перенесено записей аналитики)
+    """
+    now = now or datetime.now()
+    params = {"now": now, "horizon": analytics_horizon(now), "max_attempts": REMINDER_MAX_ATTEMPTS}
+    # Прошедшие напоминания переносятся только после отправки или исчерпания попыток
+    reminders_where = (
+        "is_done_reminder = 1 OR (reminder_date < :now "
+        "AND (delivered_at IS NOT NULL OR delivery_attempts >= :max_attempts))"
+    )
+    analytics_where = "analytics_date < :horizon"
+
+    async def write(session):
+        car_ids = list(await session.scalars(
+            text(f"SELECT DISTINCT car_id FROM reminders WHERE {reminders_where}"), params
+        ))
+        tg_ids = list(await session.scalars(
+            text(f"SELECT DISTINCT tg_id FROM analytics WHERE {analytics_where}"), params
+        ))
+
+        await session.execute(text(
+            f"INSERT OR REPLACE INTO reminders_archive ({REMINDER_COLUMNS}) "
+            f"SELECT {REMINDER_COLUMNS} FROM reminders WHERE {reminders_where}"
+        ), params)
+        reminders = await session.execute(text(f"DELETE FROM reminders WHERE {reminders_where}"), params)
+
+        await session.execute(text(
+            f"INSERT OR REPLACE INTO analytics_archive ({ANALYTICS_COLUMNS}) "
+            f"SELECT {ANALYTICS_COLUMNS} FROM analytics WHERE {analytics_where}"
+        ), params)
+        # Триггер удаления вычтет переносимые суммы из сводки, поэтому сначала
+        # они добавляются повторно: после удаления сводка останется прежней
+        await session.execute(text(
+            "INSERT INTO daily_spending(tg_id, day, category, total, count) "
+            "SELECT tg_id, date(analytics_date), analytics_title, SUM(COALESCE(analytics_price, 0)), COUNT(*) "
+            f"FROM analytics WHERE {analytics_where} "
+            "GROUP BY tg_id, date(analytics_date), analytics_title "
+            "ON CONFLICT(tg_id, day, category) DO UPDATE SET "
+            "total = total + excluded.total, count = count + excluded.count"
+        ), params)
+        analytics = await session.execute(text(f"DELETE FROM analytics WHERE {analytics_where}"), params)
+
+        return car_ids, tg_ids, reminders.rowcount, analytics.rowcount
+
+    car_ids, tg_ids, reminders_count, analytics_count = await writer.submit(write)
+
+    for car_id in car_ids:
+        await cache.invalidate("reminders", car_id)
+        await invalidate_car_dashboard(car_id)
+    for tg_id in tg_ids:
+        await cache.invalidate("analytics", tg_id)
+
+    logger.info("Archived %d reminders and %d analytics rows", reminders_count, analytics_count)
+    return reminders_count, analytics_count
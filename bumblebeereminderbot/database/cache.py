@@ -0,0 +1,142 @@
+from collections import OrderedDict
+from functools import wraps
+from inspect import signature
+from time import monotonic
+from typing import Any, Hashable, Optional
+
+from bumblebeereminderbot.config import CACHE_MAXSIZE, CACHE_TTL, KNOWN_USERS_MAXSIZE
+
+# Маркер отсутствия значения в кэше (None - допустимое кэшируемое значение)
+MISSING = object()
+
+
+class LRUCache:
+    """
+    Асинхронный кэш с вытеснением давно неиспользуемых записей (LRU) и временем жизни (TTL).
+
+    Ключи - кортежи вида (пространство, владелец, *аргументы). Пара (пространство, владелец)
+    служит тегом, по которому сбрасываются все связанные записи.
+    """
+
+    def __init__(self, maxsize: int = CACHE_MAXSIZE, ttl: Optional[int] = CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[tuple, tuple[Any, Optional[float]]] = OrderedDict()
+        self._tags: dict[tuple, set[tuple]] = {}
+
+    async def get(self, key: tuple, default: Any = None) -> Any:
+        if key not in self._cache:
+            self.misses += 1
+            return default
+
+        value, expiry = self._cache[key]
+        if expiry and monotonic() > expiry:
+            await self.delete(key)
+            self.misses += 1
+            return default
+
+        self._cache.move_to_end(key)
+        self.hits += 1
+        return value
+
+    async def set(self, key: tuple, value: Any, ttl: Optional[int] = None) -> None:
+        ttl = ttl or self.ttl
+        self._cache[key] = (value, monotonic() + ttl if ttl else None)
+        self._cache.move_to_end(key)
+        self._tags.setdefault(key[:2], set()).add(key)
+
+        # Вытеснение самых старых записей при переполнении
+        while len(self._cache) > self.maxsize:
+            oldest, _ = self._cache.popitem(last=False)
+            self._untag(oldest)
+
+    async def delete(self, key: tuple) -> None:
+        if self._cache.pop(key, None) is not None:
+            self._untag(key)
+
+    async def invalidate(self, namespace: str, owner_id: Hashable) -> None:
+        """
+        Удаляет все записи пространства namespace, относящиеся к владельцу owner_id.
+        """
+        for key in self._tags.pop((namespace, owner_id), ()):
+            self._cache.pop(key, None)
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._tags.clear()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Счетчики попаданий и промахов кэша."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._cache)}
+
+    def _untag(self, key: tuple) -> None:
+        keys = self._tags.get(key[:2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._tags[key[:2]]
+
+
+class KnownUsers:
+    """
+    Ограниченное множество tg_id пользователей, уже зарегистрированных в этом процессе.
+
+    Хранит только целые числа в словаре без значений; при переполнении
+    вытесняются самые давно добавленные пользователи.
+    """
+
+    def __init__(self, maxsize: int = KNOWN_USERS_MAXSIZE):
+        self.maxsize = maxsize
+        self._users: dict[int, None] = {}
+
+    def __contains__(self, tg_id: int) -> bool:
+        return tg_id in self._users
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def add(self, tg_id: int) -> None:
+        self._users[tg_id] = None
+        if len(self._users) > self.maxsize:
+            del self._users[next(iter(self._users))]
+
+
+# Общий кэш слоя запросов к базе данных
+cache = LRUCache()
+# Пользователи, уже записанные в базу данных
+known_users = KnownUsers()
+
+
+def cached(namespace: str):
+    """
+    Декоратор кэширования результата асинхронной функции запроса.
+
+    Первый аргумент функции считается владельцем записи (tg_id или car_id),
+    остальные аргументы, кроме сессии session, входят в ключ.
+
+    :param namespace: Пространство ключей, по которому выполняется сброс кэша
+    """
+    def decorator(func):
+        sig = signature(func)
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            # Сессия обновления не влияет на результат запроса
+            bound.arguments.pop("session", None)
+            owner_id, *rest = bound.arguments.values()
+            # Имя функции в ключе разделяет разные запросы одного владельца
+            key = (namespace, owner_id, func.__name__, *rest)
+
+            value = await cache.get(key, MISSING)
+            if value is MISSING:
+                value = await func(*args, **kwargs)
+                await cache.set(key, value)
+            return value
+
+        return wrapper
+    return decorator
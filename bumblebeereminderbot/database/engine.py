@@ -0,0 +1,73 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from bumblebeereminderbot.config import (
+    DB_SYNCHRONOUS,
+    DB_MMAP_SIZE,
+    DB_CACHE_SIZE,
+    DB_BUSY_TIMEOUT,
+    DB_TEMP_STORE,
+)
+from .profiling import instrument
+
+
+def sqlite_pragmas(readonly=False) -> dict[str, str | int]:
+    """
+    Возвращает набор PRAGMA, применяемых к каждому новому соединению SQLite.
+
+    :param readonly: Запретить запись через соединение
+    :return: Словарь вида {имя PRAGMA: значение}
+    """
+    pragmas = {
+        # Ожидание блокировки задается первым, чтобы смена журнала тоже его учитывала
+        "busy_timeout": DB_BUSY_TIMEOUT,
+        "journal_mode": "WAL",
+        "synchronous": DB_SYNCHRONOUS,
+        "mmap_size": DB_MMAP_SIZE,
+        "cache_size": DB_CACHE_SIZE,
+        "temp_store": DB_TEMP_STORE,
+    }
+    if readonly:
+        pragmas["query_only"] = "ON"
+    return pragmas
+
+
+def create_sqlite_engine(url, pool_size=1, readonly=False) -> AsyncEngine:
+    """
+    Создает асинхронный двигатель SQLite с настроенными PRAGMA.
+
+    :param url: Адрес базы данных
+    :param pool_size: Количество соединений в пуле
+    :param readonly: Создать двигатель только для чтения
+    :return: Экземпляр AsyncEngine
+    """
+    engine = create_async_engine(url=url, pool_size=pool_size, max_overflow=0)
+    pragmas = sqlite_pragmas(readonly=readonly)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        # Применение PRAGMA при открытии каждого соединения
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    # Учет количества и времени запросов
+    instrument(engine.sync_engine)
+    return engine
+
+
+def create_engines(url, read_pool_size) -> tuple[AsyncEngine, AsyncEngine]:
+    """
+    Создает пару двигателей: единственное соединение для записи и пул соединений для чтения.
+
+    SQLite допускает только одного писателя, поэтому все изменения идут
+    через одно соединение, а чтения в режиме WAL выполняются параллельно.
+
+    :param url: Адрес базы данных
+    :param read_pool_size: Количество соединений для чтения
+    :return: Кортеж (двигатель записи, двигатель чтения)
+    """
+    writer = create_sqlite_engine(url, pool_size=1)
+    reader = create_sqlite_engine(url, pool_size=read_pool_size, readonly=True)
+    return writer, reader
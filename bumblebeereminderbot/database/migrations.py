@@ -0,0 +1,283 @@
+"""
+Версионированные миграции схемы базы данных.
+
+Текущая версия схемы хранится в таблице schema_version. При запуске бота
+выполняется один запрос к ней, и если схема актуальна, на этом всё заканчивается.
+Иначе по порядку применяются недостающие миграции, каждая в своей транзакции.
+Миграции идемпотентны, поэтому базы, созданные раньше через create_all,
+доводятся до актуальной схемы начиная с версии 0.
+"""
+import json
+import logging
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy import Connection, Index
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .models import Base, engine
+from .models import User, Car, Reminder, Note, Purchase, Analytics, DailySpending
+from .models import ReminderArchive, AnalyticsArchive, PurchasePhoto, FSMState
+from .search import create_search_index, rebuild_search_update_triggers
+from .rollup import create_rollup
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Migration:
+    """
+    Шаг миграции схемы.
+    """
+    # Номер версии схемы после применения шага
+    version: int
+    # Краткое описание шага для журнала
+    description: str
+    # Функция, выполняющая шаг на синхронном соединении
+    apply: Callable[[Connection], None]
+
+
+def create_index(sync_conn: Connection, index: Index) -> None:
+    """
+    Создает индекс в отдельной короткой транзакции.
+
+    SQLite не умеет строить индекс параллельно с записью, но в режиме WAL
+    чтение во время построения продолжается, а писатели ждут не дольше
+    busy_timeout. Фиксация сразу после каждого индекса не дает миграции
+    удерживать блокировку записи дольше, чем строится один индекс.
+
+    :param sync_conn: Синхронное соединение с базой данных
+    :param index: Индекс из метаданных моделей
+    """
+    index.create(sync_conn, checkfirst=True)
+    sync_conn.commit()
+
+
+def rebuild_table(sync_conn: Connection, table_name: str, create_sql: str, columns: str, batch_size: int = 5000) -> None:
+    """
+    Перестраивает большую таблицу (смена типов или ограничений столбцов) порциями.
+
+    Данные копируются в новую таблицу порциями по rowid с фиксацией после
+    каждой порции, поэтому блокировка записи удерживается недолго. Затем в одной
+    короткой транзакции докопируются строки, добавленные во время копирования,
+    удаляются строки, удаленные за это время, и таблицы меняются местами.
+    Изменения уже скопированных строк не переносятся, поэтому функция
+    предназначена для таблиц, в которые строки только добавляются и удаляются.
+
+    После перестройки индексы и триггеры таблицы нужно создать заново.
+
+    :param sync_conn: Синхронное соединение с базой данных
+    :param table_name: Имя перестраиваемой таблицы
+    :param create_sql: CREATE TABLE для новой таблицы с подстановкой {name}
+    :param columns: Список копируемых столбцов через запятую
+    :param batch_size: Количество строк в одной порции
+    """
+    new_name = f"{table_name}__new"
+    sync_conn.exec_driver_sql(f"DROP TABLE IF EXISTS {new_name}")
+    sync_conn.exec_driver_sql(create_sql.format(name=new_name))
+    sync_conn.commit()
+
+    last_rowid = 0
+    while True:
+        sync_conn.exec_driver_sql(
+            f"INSERT INTO {new_name}(rowid, {columns}) "
+            f"SELECT rowid, {columns} FROM {table_name} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+            (last_rowid, batch_size)
+        )
+        copied_rowid = sync_conn.exec_driver_sql(f"SELECT MAX(rowid) FROM {new_name}").scalar() or 0
+        sync_conn.commit()
+        if copied_rowid == last_rowid:
+            break
+        last_rowid = copied_rowid
+
+    # Короткая транзакция переключения: новые писатели ждут её завершения
+    sync_conn.exec_driver_sql("BEGIN IMMEDIATE")
+    sync_conn.exec_driver_sql(
+        f"INSERT INTO {new_name}(rowid, {columns}) SELECT rowid, {columns} FROM {table_name} WHERE rowid > ?",
+        (last_rowid,)
+    )
+    sync_conn.exec_driver_sql(
+        f"DELETE FROM {new_name} WHERE rowid NOT IN (SELECT rowid FROM {table_name})"
+    )
+    sync_conn.exec_driver_sql(f"DROP TABLE {table_name}")
+    sync_conn.exec_driver_sql(f"ALTER TABLE {new_name} RENAME TO {table_name}")
+    sync_conn.commit()
+
+
+def create_base_tables(sync_conn: Connection) -> None:
+    """Создает основные таблицы бота."""
+    Base.metadata.create_all(
+        sync_conn,
+        tables=[model.__table__ for model in (User, Car, Reminder, Note, Purchase, Analytics)]
+    )
+
+
+def create_owner_indexes(sync_conn: Connection) -> None:
+    """Создает индексы по владельцу и дате в основных таблицах."""
+    for model in (Car, Reminder, Note, Purchase, Analytics):
+        for index in model.__table__.indexes:
+            create_index(sync_conn, index)
+
+
+def create_daily_spending(sync_conn: Connection) -> None:
+    """Создает сводку трат по дням и триггеры её обновления."""
+    DailySpending.__table__.create(sync_conn, checkfirst=True)
+    create_rollup(sync_conn)
+
+
+def create_archive_tables(sync_conn: Connection) -> None:
+    """Создает архивные таблицы напоминаний и аналитики."""
+    for model in (ReminderArchive, AnalyticsArchive):
+        model.__table__.create(sync_conn, checkfirst=True)
+        for index in model.__table__.indexes:
+            create_index(sync_conn, index)
+
+
+def create_purchase_photos(sync_conn: Connection, batch_size: int = 1000) -> None:
+    """
+    Переносит фотографии покупок из JSON в столбце purchases.purchase_photo
+    в таблицу purchase_photos и удаляет этот столбец.
+    """
+    PurchasePhoto.__table__.create(sync_conn, checkfirst=True)
+    for index in PurchasePhoto.__table__.indexes:
+        create_index(sync_conn, index)
+
+    columns = {row[1] for row in sync_conn.exec_driver_sql("PRAGMA table_info(purchases)")}
+    if "purchase_photo" not in columns:
+        return
+
+    last_id = 0
+    while True:
+        rows = sync_conn.exec_driver_sql(
+            "SELECT purchase_id, purchase_photo FROM purchases "
+            "WHERE purchase_id > ? AND purchase_photo IS NOT NULL ORDER BY purchase_id LIMIT ?",
+            (last_id, batch_size)
+        ).all()
+        if not rows:
+            break
+
+        photos = []
+        for purchase_id, purchase_photo in rows:
+            # Раньше сохранялся один PhotoSize или список PhotoSize
+            stored = json.loads(purchase_photo)
+            for photo in stored if isinstance(stored, list) else [stored]:
+                photos.append((
+                    purchase_id, photo["file_id"], photo["file_unique_id"],
+                    photo.get("width"), photo.get("height"), photo.get("file_size"),
+                ))
+        if photos:
+            sync_conn.exec_driver_sql(
+                "INSERT OR IGNORE INTO purchase_photos"
+                "(purchase_id, file_id, file_unique_id, width, height, file_size) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                photos
+            )
+        sync_conn.commit()
+        last_id = rows[-1][0]
+
+    sync_conn.exec_driver_sql("ALTER TABLE purchases DROP COLUMN purchase_photo")
+
+
+def create_fsm_states(sync_conn: Connection) -> None:
+    """Создает таблицу состояний FSM."""
+    FSMState.__table__.create(sync_conn, checkfirst=True)
+    for index in FSMState.__table__.indexes:
+        create_index(sync_conn, index)
+
+
+def add_reminder_delivery(sync_conn: Connection) -> None:
+    """
+    Добавляет в напоминания и их архив столбцы результата отправки, индекс
+    наступивших неотправленных напоминаний и имя пользователя для приветствия
+    в напоминаниях.
+
+    Напоминания, дата которых уже прошла, отправлены задачами планировщика,
+    поэтому отмечаются отправленными. Триггеры поискового индекса
+    пересоздаются так, чтобы срабатывать только при изменении индексируемых
+    столбцов, а не при каждой отметке об отправке.
+    """
+    for table in ("reminders", "reminders_archive"):
+        columns = {row[1] for row in sync_conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+        if "delivered_at" not in columns:
+            sync_conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN delivered_at DATETIME")
+        if "delivery_error" not in columns:
+            sync_conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN delivery_error VARCHAR(256)")
+        if "delivery_attempts" not in columns:
+            sync_conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN delivery_attempts INTEGER NOT NULL DEFAULT 0")
+
+    columns = {row[1] for row in sync_conn.exec_driver_sql("PRAGMA table_info(users)")}
+    if "fullname" not in columns:
+        sync_conn.exec_driver_sql("ALTER TABLE users ADD COLUMN fullname VARCHAR(256)")
+
+    sync_conn.exec_driver_sql(
+        "UPDATE reminders SET delivered_at = reminder_date "
+        "WHERE delivered_at IS NULL AND reminder_date <= datetime('now', 'localtime')"
+    )
+    # Частичный индекс содержит только неотправленные напоминания, поэтому
+    # проверка наступивших не просматривает уже отправленные
+    sync_conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_reminders_due ON reminders (reminder_date) WHERE delivered_at IS NULL"
+    )
+
+    rebuild_search_update_triggers(sync_conn)
+
+
+# Миграции в порядке применения; номер версии каждой следующей на единицу больше
+MIGRATIONS = (
+    Migration(1, "base tables", create_base_tables),
+    Migration(2, "owner/date indexes", create_owner_indexes),
+    Migration(3, "full-text search index", create_search_index),
+    Migration(4, "daily spending rollup", create_daily_spending),
+    Migration(5, "archive tables", create_archive_tables),
+    Migration(6, "purchase photos table", create_purchase_photos),
+    Migration(7, "fsm states table", create_fsm_states),
+    Migration(8, "reminder delivery status", add_reminder_delivery),
+)
+
+
+def get_version(sync_conn: Connection) -> int:
+    """
+    Возвращает текущую версию схемы или 0, если миграции еще не применялись.
+    """
+    try:
+        return sync_conn.exec_driver_sql("SELECT version FROM schema_version").scalar() or 0
+    except OperationalError:
+        sync_conn.rollback()
+        return 0
+
+
+def set_version(sync_conn: Connection, version: int) -> None:
+    """
+    Записывает версию схемы.
+    """
+    sync_conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+    sync_conn.exec_driver_sql("DELETE FROM schema_version")
+    sync_conn.exec_driver_sql("INSERT INTO schema_version (version) VALUES (?)", (version,))
+
+
+async def migrate(db_engine: AsyncEngine = engine) -> int:
+    """
+    Асинхронная функция для приведения схемы базы данных к актуальной версии.
+
+    :param db_engine: Двигатель базы данных (по умолчанию - двигатель записи)
+    :return: Версия схемы после миграции
+    """
+    latest = MIGRATIONS[-1].version
+
+    async with db_engine.connect() as conn:
+        # Быстрая проверка: при актуальной схеме это единственный запрос
+        version = await conn.run_sync(get_version)
+        if version >= latest:
+            return version
+
+        for migration in MIGRATIONS:
+            if migration.version <= version:
+                continue
+            logger.info("Applying migration %d: %s", migration.version, migration.description)
+            await conn.run_sync(migration.apply)
+            await conn.run_sync(set_version, migration.version)
+            await conn.commit()
+            version = migration.version
+
+    return version
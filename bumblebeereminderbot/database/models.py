@@ -1,13 +1,18 @@
-from sqlalchemy import BigInteger, String, DateTime, ForeignKey, Float, Integer, Boolean
+from sqlalchemy import BigInteger, String, DateTime, Date, ForeignKey, Float, Integer, Boolean, Index, LargeBinary
 from sqlalchemy.dialects.sqlite import DATETIME
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker
 
-# Создание асинхронного двигателя для подключения к базе данных SQLite с использованием aiosqlite
-engine = create_async_engine(url='sqlite+aiosqlite:///db.sqlite3')
+from bumblebeereminderbot.config import DB_URL, DB_READ_POOL_SIZE
+from .engine import create_engines
+
+# Создание асинхронных двигателей SQLite: одно соединение для записи и пул для чтения
+engine, read_engine = create_engines(DB_URL, DB_READ_POOL_SIZE)
 
 # Создание асинхронного sessionmaker для управления сессиями с базой данных
 async_session = async_sessionmaker(engine, expire_on_commit=False)
+# Sessionmaker для запросов только на чтение
+read_session = async_sessionmaker(read_engine, expire_on_commit=False)
 
 
 class Base(AsyncAttrs, DeclarativeBase):
@@ -25,6 +30,8 @@ class User(Base):
 
     # Первичный ключ таблицы и уникальный идентификатор пользователя в Telegram
     tg_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, unique=True)
+    # Имя пользователя в Telegram для обращения в напоминаниях
+    fullname: Mapped[str] = mapped_column(String(256), nullable=True)
     # Определение отношения между Reminder и Car моделями
     car = relationship('Car', back_populates='tg', cascade="all, delete")
     # Определение отношения между User и Note моделями
@@ -40,6 +47,8 @@ class Car(Base):
     Модель машин, представляющая таблицу 'cars' в базе данных.
     """
     __tablename__ = "cars"  # Название таблицы в базе данных
+    # Индекс для выборки машин конкретного пользователя
+    __table_args__ = (Index("ix_cars_tg_id", "tg_id"),)
 
     # Первичный ключ таблицы
     car_id: Mapped[int] = mapped_column(primary_key=True)
@@ -61,6 +70,8 @@ class Reminder(Base):
     Модель напоминаний, представляюшая таблицу 'reminders' в базе данных.
     """
     __tablename__ = "reminders" # Название таблицы в базе данных
+    # Составной индекс для выборки напоминаний автомобиля в порядке даты
+    __table_args__ = (Index("ix_reminders_car_id_reminder_date", "car_id", "reminder_date"),)
 
     # Первичный ключ таблицы
     reminder_id: Mapped[int] = mapped_column(primary_key=True)
@@ -72,6 +83,12 @@ class Reminder(Base):
     reminder_date: Mapped[DateTime] = mapped_column(DateTime)
     # Отметка о выполнении напоминания
     is_done_reminder: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Время отправки напоминания пользователю; NULL - еще не отправлено
+    delivered_at: Mapped[DateTime] = mapped_column(DateTime, nullable=True)
+    # Ошибка последней неудачной попытки отправки
+    delivery_error: Mapped[str] = mapped_column(String(256), nullable=True)
+    # Количество попыток отправки
+    delivery_attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
 
     # Внешний ключ, связывающий событие с автомобилем
     car_id = mapped_column(Integer, ForeignKey("cars.car_id"))
@@ -84,6 +101,8 @@ class Note(Base):
     Модель заметок, представляет таблицу 'notes' в базе данных
     """
     __tablename__ = "notes" # Название таблицы в базе данных
+    # Составной индекс для выборки заметок пользователя в порядке даты
+    __table_args__ = (Index("ix_notes_tg_id_note_date", "tg_id", "note_date"),)
 
     # Первичный ключ таблицы
     note_id: Mapped[int] = mapped_column(primary_key=True)
@@ -105,13 +124,13 @@ class Purchase(Base):
     Модель покупок, представляет таблицу 'purchases' в базе данных
     """
     __tablename__ = "purchases" # Название таблицы в базе данных
+    # Составной индекс для выборки покупок пользователя в порядке даты
+    __table_args__ = (Index("ix_purchases_tg_id_purchase_date", "tg_id", "purchase_date"),)
 
     # Первичный ключ таблицы
     purchase_id: Mapped[int] = mapped_column(primary_key=True)
     # Название покупки 
     purchase_title: Mapped[str] = mapped_column(String(64))
-    # Фото покупки
-    purchase_photo: Mapped[str] = mapped_column(String, nullable=True)
     # Дата покупки
     purchase_date: Mapped[DateTime] = mapped_column(DateTime)
 
@@ -121,11 +140,41 @@ class Purchase(Base):
     tg = relationship("User", foreign_keys=[tg_id], back_populates='purchase')
 
 
+class PurchasePhoto(Base):
+    """
+    Модель фотографий покупок, представляет таблицу 'purchase_photos' в базе данных
+    """
+    __tablename__ = "purchase_photos" # Название таблицы в базе данных
+    __table_args__ = (
+        # Выборка фотографий покупок в порядке добавления
+        Index("ix_purchase_photos_purchase_id", "purchase_id", "photo_id"),
+        # Одна и та же фотография не добавляется к покупке повторно
+        Index("ux_purchase_photos_purchase_id_file_unique_id", "purchase_id", "file_unique_id", unique=True),
+    )
+
+    # Первичный ключ таблицы
+    photo_id: Mapped[int] = mapped_column(primary_key=True)
+    # Идентификатор файла для повторной отправки
+    file_id: Mapped[str] = mapped_column(String)
+    # Постоянный идентификатор файла, одинаковый для всех ботов
+    file_unique_id: Mapped[str] = mapped_column(String)
+    # Размеры фотографии
+    width: Mapped[int] = mapped_column(Integer, nullable=True)
+    height: Mapped[int] = mapped_column(Integer, nullable=True)
+    # Размер файла в байтах
+    file_size: Mapped[int] = mapped_column(Integer, nullable=True)
+
+    # Внешний ключ, связывающий фотографию с покупкой
+    purchase_id = mapped_column(Integer, ForeignKey("purchases.purchase_id"))
+
+
 class Analytics(Base):
     """
     Модель аналитики, представляет таблицу 'analytics' в базе данных
     """
     __tablename__ = "analytics" # Название таблицы в базе данных
+    # Составной индекс для выборки аналитики пользователя в порядке даты
+    __table_args__ = (Index("ix_analytics_tg_id_analytics_date", "tg_id", "analytics_date"),)
 
     # Первичный ключ таблицы
     analytics_id: Mapped[int] = mapped_column(primary_key=True)
@@ -144,10 +193,76 @@ class Analytics(Base):
     tg = relationship("User", foreign_keys=[tg_id], back_populates='analytics')
 
 
-async def async_main():
+class DailySpending(Base):
     """
-    Асинхронная функция для создания всех таблиц в базе данных на основе определенных моделей.
+    Модель сводки трат по дням и категориям, представляет таблицу 'daily_spending' в базе данных.
+    Поддерживается триггерами на таблице 'analytics' (см. database/rollup.py).
     """
-    async with engine.begin() as conn:
-        # Создание всех таблиц, если они еще не существуют
-        await conn.run_sync(Base.metadata.create_all)
+    __tablename__ = "daily_spending" # Название таблицы в базе данных
+
+    # Пользователь, день и категория образуют составной первичный ключ
+    tg_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    day: Mapped[Date] = mapped_column(Date, primary_key=True)
+    category: Mapped[str] = mapped_column(String(64), primary_key=True)
+    # Сумма трат за день в категории
+    total: Mapped[float] = mapped_column(Float, default=0.0)
+    # Количество записей аналитики за день в категории
+    count: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class ReminderArchive(Base):
+    """
+    Модель архива напоминаний, представляет таблицу 'reminders_archive' в базе данных.
+    Сюда переносятся выполненные и прошедшие напоминания (см. database/archive.py).
+    """
+    __tablename__ = "reminders_archive" # Название таблицы в базе данных
+    # Составной индекс для выборки архива автомобиля в порядке даты
+    __table_args__ = (Index("ix_reminders_archive_car_id_reminder_date", "car_id", "reminder_date"),)
+
+    # Первичный ключ совпадает с ключом напоминания до переноса
+    reminder_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    reminder_title: Mapped[str] = mapped_column(String(64))
+    reminder_description: Mapped[str] = mapped_column(String(256), nullable=True)
+    reminder_date: Mapped[DateTime] = mapped_column(DateTime)
+    is_done_reminder: Mapped[bool] = mapped_column(Boolean, default=False)
+    delivered_at: Mapped[DateTime] = mapped_column(DateTime, nullable=True)
+    delivery_error: Mapped[str] = mapped_column(String(256), nullable=True)
+    delivery_attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    car_id = mapped_column(Integer)
+
+
+class AnalyticsArchive(Base):
+    """
+    Модель архива аналитики, представляет таблицу 'analytics_archive' в базе данных.
+    Сюда переносятся записи старше горизонта хранения (см. database/archive.py).
+    """
+    __tablename__ = "analytics_archive" # Название таблицы в базе данных
+    # Составной индекс для выборки архива пользователя в порядке даты
+    __table_args__ = (Index("ix_analytics_archive_tg_id_analytics_date", "tg_id", "analytics_date"),)
+
+    # Первичный ключ совпадает с ключом записи до переноса
+    analytics_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    analytics_title: Mapped[str] = mapped_column(String(64))
+    analytics_description: Mapped[str] = mapped_column(String(256), nullable=True)
+    analytics_date: Mapped[DateTime] = mapped_column(DateTime)
+    analytics_price: Mapped[float] = mapped_column(Float, nullable=True)
+    tg_id = mapped_column(BigInteger)
+
+
+class FSMState(Base):
+    """
+    Модель состояний FSM, представляет таблицу 'fsm_states' в базе данных.
+    Используется хранилищем состояний бота (см. telegram/storage/sqlite.py).
+    """
+    __tablename__ = "fsm_states" # Название таблицы в базе данных
+    # Индекс для удаления устаревших состояний
+    __table_args__ = (Index("ix_fsm_states_updated_at", "updated_at"),)
+
+    # Ключ состояния, построенный из StorageKey (бот, чат, пользователь, назначение)
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    # Имя состояния
+    state: Mapped[str] = mapped_column(String, nullable=True)
+    # Данные состояния в сериализованном виде
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=True)
+    # Время последнего изменения, в секундах Unix
+    updated_at: Mapped[int] = mapped_column(Integer)
@@ -0,0 +1,137 @@
+"""
+Учет SQL-запросов по обновлениям и журнал медленных запросов.
+
+События двигателя считают и замеряют каждый запрос и добавляют его в
+QueryStats текущего обновления, если middleware его установил. Запросы
+операций очереди записи учитываются в статистике обновлений, которые их
+отправили (см. WriteQueue). Медленные запросы записываются в журнал без
+значений параметров.
+"""
+import logging
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from time import perf_counter
+
+from sqlalchemy import Engine, event
+
+from bumblebeereminderbot.config import SLOW_QUERY_MS
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger(f"{__name__}.slow")
+
+# Сколько раз один и тот же запрос должен повториться за обновление,
+# чтобы считаться признаком N+1
+REPEAT_THRESHOLD = 3
+
+
+@dataclass
+class QueryStats:
+    """
+    Запросы, выполненные при обработке одного обновления.
+    """
+    # Количество запросов
+    count: int = 0
+    # Суммарное время выполнения, в секундах
+    duration: float = 0.0
+    # Количество выполнений каждого текста запроса
+    statements: Counter = field(default_factory=Counter)
+
+    def repeated(self, threshold: int = REPEAT_THRESHOLD) -> list[tuple[str, int]]:
+        """
+        Возвращает запросы, повторившиеся не меньше threshold раз: [(запрос, количество)].
+        """
+        return [(statement, n) for statement, n in self.statements.most_common() if n >= threshold]
+
+
+@dataclass
+class HandlerStats:
+    """
+    Накопленная статистика запросов одного обработчика.
+    """
+    # Количество обработанных обновлений
+    calls: int = 0
+    # Суммарное количество запросов
+    queries: int = 0
+    # Наибольшее количество запросов за одно обновление
+    max_queries: int = 0
+    # Суммарное время запросов, в секундах
+    duration: float = 0.0
+    # Количество обновлений с повторяющимися запросами (N+1)
+    repeats: int = 0
+
+
+# Статистика запросов текущего обновления
+current_stats: ContextVar[QueryStats | None] = ContextVar("current_stats", default=None)
+# Статистика по обработчикам с момента запуска: {имя обработчика: HandlerStats}
+handler_stats: dict[str, HandlerStats] = {}
+
+
+def redact(parameters) -> str:
+    """
+    Заменяет значения параметров запроса их количеством.
+    """
+    if isinstance(parameters, (list, tuple)) and parameters and isinstance(parameters[0], (list, tuple, dict)):
+        # executemany: несколько наборов параметров
+        return f"[{len(parameters)} x {len(parameters[0])} redacted]"
+    return f"[{len(parameters or ())} redacted]"
+
+
+def instrument(engine: Engine) -> None:
+    """
+    Подключает учет запросов к синхронному двигателю SQLAlchemy.
+
+    :param engine: Синхронный двигатель (AsyncEngine.sync_engine)
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = perf_counter() - conn.info["query_start"].pop()
+
+        stats = current_stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.duration += duration
+            stats.statements[statement] += 1
+
+        if duration * 1000 >= SLOW_QUERY_MS:
+            slow_logger.warning("Slow query (%.1f ms): %s %s", duration * 1000, statement, redact(parameters))
+
+
+def record(handler: str, stats: QueryStats) -> None:
+    """
+    Добавляет статистику обновления к статистике обработчика и сообщает о повторяющихся запросах.
+
+    :param handler: Имя обработчика
+    :param stats: Статистика запросов обновления
+    """
+    total = handler_stats.setdefault(handler, HandlerStats())
+    total.calls += 1
+    total.queries += stats.count
+    total.max_queries = max(total.max_queries, stats.count)
+    total.duration += stats.duration
+
+    repeated = stats.repeated()
+    if repeated:
+        total.repeats += 1
+        for statement, n in repeated:
+            logger.warning("Possible N+1 in %s: %d x %s", handler, n, statement)
+
+    logger.debug("%s: %d queries in %.1f ms", handler, stats.count, stats.duration * 1000)
+
+
+def report() -> str:
+    """
+    Возвращает отчет по обработчикам, отсортированный по среднему количеству запросов.
+    """
+    lines = [f"{'handler':40} {'calls':>6} {'avg q':>6} {'max q':>6} {'avg ms':>8} {'N+1':>5}"]
+    rows = sorted(handler_stats.items(), key=lambda item: item[1].queries / item[1].calls, reverse=True)
+    for name, total in rows:
+        lines.append(
+            f"{name:40} {total.calls:>6} {total.queries / total.calls:>6.1f} {total.max_queries:>6} "
+            f"{total.duration * 1000 / total.calls:>8.1f} {total.repeats:>5}"
+        )
+    return "\n".join(lines)
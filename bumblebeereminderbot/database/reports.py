@@ -0,0 +1,108 @@
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import select, func
+
+from .archive import analytics_horizon
+from .cache import cached
+from .models import read_session
+from .models import Analytics, AnalyticsArchive, DailySpending
+
+
+@dataclass
+class AnalyticsReport:
+    """
+    Агрегированные данные аналитики пользователя за период.
+    """
+    # Сумма всех трат за период
+    total: float = 0.0
+    # Суммы трат по дням: {дата: сумма}
+    daily: dict[date, float] = field(default_factory=dict)
+    # Суммы трат по категориям в порядке убывания: [(категория, сумма)]
+    categories: list[tuple[str, float]] = field(default_factory=list)
+    # Последние записи аналитики за период
+    recent: list[Analytics] = field(default_factory=list)
+
+    @property
+    def max_day(self) -> tuple[date, float] | None:
+        """
+        День с самыми большими тратами в виде (дата, сумма) или None, если данных нет.
+        """
+        return max(self.daily.items(), key=lambda x: x[1], default=None)
+
+
+@cached("analytics")
+async def get_analytics_report(tg_id, start_date, end_date, recent_limit=5) -> AnalyticsReport:
+    """
+    Асинхронная функция для получения агрегатов аналитики пользователя за период.
+
+    Суммы по дням и категориям читаются из сводки daily_spending,
+    последние записи - из analytics по индексу (tg_id, analytics_date)
+    и, для периодов старше границы архива, из analytics_archive.
+
+    :param tg_id: Внешний ключ, между Analytics и User моделями
+    :param start_date: Дата начала периода (включительно)
+    :param end_date: Дата окончания периода (включительно)
+    :param recent_limit: Количество последних записей в отчете
+    :return: Объект AnalyticsReport
+    """
+    period_start = datetime.combine(start_date, time.min)
+    period_end = datetime.combine(end_date + timedelta(days=1), time.min)
+    # Дни и категории берутся из сводки daily_spending, поэтому стоимость
+    # агрегатов зависит от количества дней в периоде, а не от количества трат
+    in_rollup = (
+        DailySpending.tg_id == tg_id,
+        DailySpending.day >= start_date,
+        DailySpending.day <= end_date,
+    )
+    amount = func.sum(DailySpending.total)
+
+    # Создание асинхронной сессии с базой данных
+    async with read_session() as session:
+        # Суммы по дням
+        daily = {
+            row_day: row_amount or 0.0
+            for row_day, row_amount in await session.execute(
+                select(DailySpending.day, amount).where(*in_rollup).group_by(DailySpending.day)
+            )
+        }
+        if not daily:
+            return AnalyticsReport()
+
+        # Суммы по категориям
+        categories = [
+            (title, category_amount or 0.0)
+            for title, category_amount in await session.execute(
+                select(DailySpending.category, amount)
+                .where(*in_rollup)
+                .group_by(DailySpending.category)
+                .order_by(amount.desc())
+            )
+        ]
+
+        # Последние записи за период; если период уходит дальше границы
+        # архива, недостающие записи дочитываются из analytics_archive
+        models = [Analytics]
+        if datetime.combine(start_date, time.min) < analytics_horizon():
+            models.append(AnalyticsArchive)
+        recent = []
+        for model in models:
+            recent.extend(await session.scalars(
+                select(model)
+                .where(
+                    model.tg_id == tg_id,
+                    model.analytics_date >= period_start,
+                    model.analytics_date < period_end,
+                )
+                .order_by(model.analytics_date.desc(), model.analytics_id.desc())
+                .limit(recent_limit)
+            ))
+        recent.sort(key=lambda x: (x.analytics_date, x.analytics_id), reverse=True)
+        del recent[recent_limit:]
+
+    return AnalyticsReport(
+        total=sum(daily.values()),
+        daily=daily,
+        categories=categories,
+        recent=recent,
+    )
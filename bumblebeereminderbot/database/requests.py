@@ -1,25 +1,102 @@
-from .models import async_session
-from .models import User, Car, Reminder, Note, Purchase, Analytics
-from sqlalchemy import select
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime
 
+from .cache import cache, cached, known_users
+from .models import read_session
+from .models import Car, Reminder, Note, Purchase, Analytics, DailySpending
+from .models import ReminderArchive, AnalyticsArchive, PurchasePhoto
+from .writer import writer
+from . import statements as st
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.sqlite import insert
 
+# Количество записей на одной странице списка
+PAGE_SIZE = 10
 
-async def set_user(tg_id):
+
+@dataclass
+class Page:
+    """
+    Страница записей, выбранная по ключу (keyset-пагинация).
+    """
+    # Записи текущей страницы
+    items: list
+    # Курсор (дата, id) для получения следующей страницы или None, если страница последняя
+    after: tuple | None = None
+    # Общее количество записей, если оно запрашивалось
+    total: int | None = None
+
+
+@dataclass
+class CarReminders:
+    """
+    Автомобиль со сводкой его ожидающих напоминаний (не выполненных и не отправленных).
+    """
+    car: Car
+    # Количество ожидающих напоминаний
+    pending: int = 0
+    # Дата ближайшего предстоящего напоминания или None, если таких нет
+    next_date: datetime | None = None
+
+
+@dataclass
+class Dashboard:
+    """
+    Счетчики пользователя для главного меню.
+    """
+    cars: int = 0
+    # Ожидающие напоминания по всем автомобилям
+    reminders: int = 0
+    notes: int = 0
+    purchases: int = 0
+    # Траты с начала текущего месяца
+    month_spend: float = 0.0
+
+
+
+@asynccontextmanager
+async def _reading(session=None):
+    """
+    Асинхронный контекстный менеджер сессии чтения.
+    Возвращает сессию текущего обновления, если она передана, иначе открывает и закрывает новую.
+
+    Транзакция сессии обновления завершается сразу после чтения, и соединение
+    возвращается в пул: обновление не держит его во время вызовов Bot API и
+    вложенных чтений через read_session. При expire_on_commit=False загруженные
+    объекты остаются доступными.
+
+    :param session: Сессия текущего обновления или None
+    """
+    if session is not None:
+        try:
+            yield session
+        finally:
+            await session.commit()
+    else:
+        async with read_session() as session:
+            yield session
+
+
+async def set_user(tg_id, fullname=None):
     """
     Асинхронная функция для добавления пользователя в базу данных, если он еще не существует
     
     :param tg_id: ID пользователя в Telegram
+    :param fullname: Имя пользователя в Telegram для обращения в напоминаниях
     """
-    # Создание асинхронной сессии с базой данных
-    async with async_session() as session:
-        # Поиск пользователя по его tg_id
-        user = await session.scalar(select(User).where(User.tg_id == tg_id))
-
-        # Если пользователь не найден, добавляем его в базу данных
-        if not user:
-            session.add(User(tg_id=tg_id))
-            # Фиксация изменений в базе данных
-            await session.commit()
+    # Пользователь уже зарегистрирован этим процессом
+    if tg_id in known_users:
+        return
+
+    async def write(session):
+        # Добавление пользователя одним запросом; у существующей записи обновляется
+        # только имя, поэтому одновременные обновления от одного пользователя не конфликтуют
+        await session.execute(st.INSERT_USER, {"tg_id": tg_id, "fullname": fullname})
+
+    # Запись через общую очередь с групповой фиксацией
+    await writer.submit(write)
+    known_users.add(tg_id)
 
 async def set_car(name, year, tg_id):
     """
@@ -28,11 +105,13 @@ async def set_car(name, year, tg_id):
     :param year: Год выпуска автомобиля
     :param tg_id: Внешний ключ между Car и User
     """
-    # Создание асинхронной сессии с базой данных
-    async with async_session() as session:
+    async def write(session):
         session.add(Car(name=name, year=year, tg_id=tg_id))
-            # Фиксация изменений в базе данных
-        await session.commit()
+
+    # Запись через общую очередь с групповой фиксацией
+    await writer.submit(write)
+    await cache.invalidate("cars", tg_id)
+    await cache.invalidate("dashboard", tg_id)
 
 async def set_reminder(reminder_title, reminder_date, car_id, reminder_description=None):
     """
@@ -42,8 +121,7 @@ async def set_reminder(reminder_title, reminder_date, car_id, reminder_descripti
     :param reminder_date: Дата и время когда следует напомнить
     :param car_id: Внешний ключ, между Reminder и Car моделями
     """
-    # Создание асинхронной сессии с базой данных
-    async with async_session() as session:
+    async def write(session):
         session.add(Reminder(
             reminder_title=reminder_title,
             reminder_description=reminder_description,
@@ -51,8 +129,11 @@ async def set_reminder(reminder_title, reminder_date, car_id, reminder_descripti
             car_id=car_id
             )
         )
-        # Фиксация изменений в базе данных
-        await session.commit()
+
+    # Запись через общую очередь с групповой фиксацией
+    await writer.submit(write)
+    await cache.invalidate("reminders", car_id)
+    await invalidate_car_dashboard(car_id)
 
 async def set_note(note_title, note_date, tg_id, note_description=None):
     """
@@ -62,8 +143,7 @@ async def set_note(note_title, note_date, tg_id, note_description=None):
     :param note_date: Дата и время создания заметки
     :param tg_id: Внешний ключ, между Note и User моделями
     """
-    # Создание асинхронной сессии с базой данных
-    async with async_session() as session:
+    async def write(session):
         session.add(Note(
             note_title=note_title,
             note_description=note_description,
@@ -71,29 +151,62 @@ async def set_note(note_title, note_date, tg_id, note_description=None):
             tg_id=tg_id
         )
     )
-        # Фиксация изменений в базе данных
-        await session.commit()
 
-async def set_purchase(purchase_date, tg_id, purchase_title, purchase_photo=None):
+    # Запись через общую очередь с групповой фиксацией
+    await writer.submit(write)
+    await cache.invalidate("notes", tg_id)
+    await cache.invalidate("dashboard", tg_id)
+
+async def set_purchase(purchase_date, tg_id, purchase_title, purchase_photos=None):
     """
     Асинхронная функция для добавления покупки в базу данных
     :param purchase_title: Название покупки
-    :param purchase_photo: Фото покупки, опционально
+    :param purchase_photos: Список фото покупки (PhotoSize), опционально
     :param purchase_date: Дата и время покупки
     :param tg_id: Внешний ключ, между Purchase и User моделями
     """
-    # Создание асинхронной сессии с базой данных
-    async with async_session() as session:
+    async def write(session):
         # Добавление покупки в базу данных
-        session.add(Purchase(
+        purchase = Purchase(
             purchase_title=purchase_title,
-            purchase_photo=purchase_photo,
             purchase_date=purchase_date,
             tg_id=tg_id
-            )
         )
-        # Фиксация асинхронной сессии с базой данных
-        await session.commit()
+        session.add(purchase)
+        if purchase_photos:
+            # Получение purchase_id до фиксации пачки
+            await session.flush()
+            await _add_purchase_photos(session, purchase.purchase_id, purchase_photos)
+
+    # Запись через общую очередь с групповой фиксацией
+    await writer.submit(write)
+    await cache.invalidate("purchases", tg_id)
+    await cache.invalidate("dashboard", tg_id)
+
+async def _add_purchase_photos(session, purchase_id, photos):
+    """
+    Асинхронная функция для добавления фото к покупке внутри операции очереди записи.
+    Фото, уже добавленные к покупке (тот же file_unique_id), пропускаются.
+
+    :param session: Сессия пачки очереди записи
+    :param purchase_id: Внешний ключ, между PurchasePhoto и Purchase моделями
+    :param photos: Список фото (PhotoSize)
+    """
+    await session.execute(
+        insert(PurchasePhoto)
+        .values([
+            {
+                "purchase_id": purchase_id,
+                "file_id": photo.file_id,
+                "file_unique_id": photo.file_unique_id,
+                "width": photo.width,
+                "height": photo.height,
+                "file_size": photo.file_size,
+            }
+            for photo in photos
+        ])
+        .on_conflict_do_nothing(index_elements=[PurchasePhoto.purchase_id, PurchasePhoto.file_unique_id])
+    )
 
 async def set_analytics(
         analytics_title,
@@ -109,8 +222,7 @@ async def set_analytics(
     :param analytics_date: Дата и время покупки
     :param tg_id: Внешний ключ, между Purchase и User моделями
     """
-    # Создание асинхронной сессии с базой данных
-    async with async_session() as session:
+    async def write(session):
         session.add(Analytics(
             analytics_title=analytics_title,
             analytics_description=analytics_description,
@@ -119,179 +231,642 @@ async def set_analytics(
             tg_id=tg_id
         )
     )
-        # Фиксация асинхронной сессии с базой данных
-        await session.commit()
 
-async def get_cars(tg_id):
+    # Запись через общую очередь с групповой фиксацией
+    await writer.submit(write)
+    await cache.invalidate("analytics", tg_id)
+    await cache.invalidate("dashboard", tg_id)
+
+@cached("cars")
+async def get_cars(tg_id, session=None):
     """
     Асинхронная функция для получения всех автомобилей пользователя
 
     :param tg_id: Внешний ключ, между Car и User моделями
-    :return: Генератор объектов Car, связанных с пользователем
+    :param session: Сессия текущего обновления (DatabaseMiddleware) или None для отдельной сессии
+    :return: Список объектов Car, связанных с пользователем
     """
     # Создание асинхронной сессии с базой данных
-    async with async_session() as session:
+    async with _reading(session) as session:
         # Получение всех автомобилей пользователя по его tg_id
-        return await session.scalars(select(Car).where(Car.tg_id == tg_id))
+        return list(await session.scalars(st.CARS_BY_OWNER, {"tg_id": tg_id}))
     
-async def get_car(car_id):
+@cached("car")
+async def get_car(car_id, session=None):
     """
     Асинхронная функция для получения всех автомобилей пользователя
 
     :param car_id: Ключ Car
+    :param session: Сессия текущего обновления (DatabaseMiddleware) или None для отдельной сессии
     :return: Генератор объекта Car, связанных с пользователем
     """
     # Создание асинхронной сессии с базой данных
-    async with async_session() as session:
+    async with _reading(session) as session:
         # Получение автомобиля пользователя по его car_id
-        return await session.scalar(select(Car).where(Car.car_id == car_id))
+        return await session.scalar(st.CAR_BY_ID, {"car_id": car_id})
 
-async def get_reminders(car_id):
+@cached("reminders")
+async def get_reminders(car_id, session=None):
     """
     Асинхронная функция для получения всех напоминаний
 
     :param car_id: Внешний ключ, между Reminder и Car моделями
-    :return: Генератор объектов Reminder, связанных с автомобилем
+    :param session: Сессия текущего обновления (DatabaseMiddleware) или None для отдельной сессии
+    :return: Список объектов Reminder, связанных с автомобилем
     """
     # Создание асинхронной сессии с базой данных
-    async with async_session() as session:
+    async with _reading(session) as session:
         # Получение всех напоминаний по car_id
-        return await session.scalars(select(Reminder).where(Reminder.car_id == car_id))
+        return list(await session.scalars(st.REMINDERS_BY_CAR, {"car_id": car_id}))
 
-async def get_notes(tg_id):
+@cached("notes")
+async def get_notes(tg_id, session=None):
     """
     Асинхронная функция для получения всех заметок
 
     :param tg_id: Внешний ключ, между Note и User моделями
-    :return: Генератор объектов Note, связанных с пользователем
+    :param session: Сессия текущего обновления (DatabaseMiddleware) или None для отдельной сессии
+    :return: Список объектов Note, связанных с пользователем
     """
     # Создание асинхронной сессии с базой данных
-    async with async_session() as session:
+    async with _reading(session) as session:
         # Получение всех заметок по tg_id
-        return await session.scalars(select(Note).where(Note.tg_id == tg_id))
+        return list(await session.scalars(st.NOTES_BY_OWNER, {"tg_id": tg_id}))
+
+@cached("notes")
+async def get_note(tg_id, note_id, session=None):
+    """
+    Асинхронная функция для получения одной заметки пользователя
 
-async def get_purchases(tg_id):
+    :param tg_id: ID владельца заметки в Telegram
+    :param note_id: Уникальный идентификатор заметки
+    :param session: Сессия текущего обновления (DatabaseMiddleware) или None для отдельной сессии
+    :return: Объект Note или None, если заметка не найдена
+    """
+    async with _reading(session) as session:
+        return await session.scalar(st.NOTE_BY_ID, {"note_id": note_id, "tg_id": tg_id})
+
+@cached("purchases")
+async def get_purchases(tg_id, session=None):
     """
     Асинхронная функция для получения всех покупок
 
     :param tg_id: Внешний ключ, между Purchase и User моделями
-    :return: Генератор объектов Purchase, связанных с пользователем
+    :param session: Сессия текущего обновления (DatabaseMiddleware) или None для отдельной сессии
+    :return: Список объектов Purchase, связанных с пользователем
     """
     # Создание асинхронной сессии с базой данных
-    async with async_session() as session:
+    async with _reading(session) as session:
         # Получение всех заметок по tg_id
-        return await session.scalars(select(Purchase).where(Purchase.tg_id == tg_id))
+        return list(await session.scalars(st.PURCHASES_BY_OWNER, {"tg_id": tg_id}))
+
+async def get_cars_with_reminders(tg_id, session=None):
+    """
+    Асинхронная функция для получения автомобилей пользователя со сводкой напоминаний.
+    Выполняет один запрос LEFT JOIN ... GROUP BY без загрузки самих напоминаний.
+
+    :param tg_id: Внешний ключ, между Car и User моделями
+    :param session: Сессия текущего обновления (DatabaseMiddleware) или None для отдельной сессии
+    :return: Список объектов CarReminders в порядке car_id
+    """
+    async with _reading(session) as session:
+        rows = await session.execute(st.CARS_WITH_REMINDERS, {"tg_id": tg_id, "now": datetime.now()})
+        return [CarReminders(car, pending, next_date) for car, pending, next_date in rows]
+
+@cached("dashboard")
+async def get_dashboard(tg_id, month_start, session=None):
+    """
+    Асинхронная функция для получения счетчиков главного меню одним запросом.
+    Траты за месяц берутся из сводки daily_spending.
+
+    :param tg_id: ID пользователя в Telegram
+    :param month_start: Первый день текущего месяца (входит в ключ кэша)
+    :param session: Сессия текущего обновления (DatabaseMiddleware) или None для отдельной сессии
+    :return: Объект Dashboard
+    """
+    async with _reading(session) as session:
+        row = (await session.execute(st.DASHBOARD, {"tg_id": tg_id, "month_start": month_start})).one()
+        return Dashboard(*row)
+
+async def invalidate_car_dashboard(car_id):
+    """
+    Асинхронная функция для сброса сводки главного меню владельца автомобиля.
+    Используется изменениями напоминаний, которые знают только car_id.
+
+    :param car_id: Уникальный идентификатор автомобиля
+    """
+    car = await get_car(car_id)
+    if car is not None:
+        await cache.invalidate("dashboard", car.tg_id)
+
+async def get_due_reminders(now, max_attempts, after=None, limit=1000):
+    """
+    Асинхронная функция для получения наступивших и еще не отправленных напоминаний всех пользователей.
+    Результат не кэшируется: напоминания выбираются один раз за проверку.
+
+    :param now: Время проверки; выбираются напоминания с датой не позже него
+    :param max_attempts: Напоминания с таким количеством неудачных попыток больше не выбираются
+    :param after: Курсор (tg_id, id) последнего напоминания предыдущей порции или None
+    :param limit: Количество напоминаний в порции
+    :return: Список строк (reminder_id, reminder_title, reminder_description, reminder_date, car_id, tg_id, name,
+             fullname)
+             в порядке (tg_id, reminder_id)
+    """
+    params = {"now": now, "max_attempts": max_attempts, "limit": limit}
+    statement = st.DUE_REMINDERS
+    if after is not None:
+        params["after_tg_id"], params["after_id"] = after
+        statement = st.DUE_REMINDERS_AFTER
+    async with read_session() as session:
+        return (await session.execute(statement, params)).all()
+
+async def record_deliveries(now, delivered, failed, car_ids):
+    """
+    Асинхронная функция для сохранения результата отправки напоминаний одной операцией записи.
+
+    :param now: Время отправки
+    :param delivered: Список id отправленных напоминаний
+    :param failed: Словарь {id напоминания: текст ошибки} для неудачных отправок
+    :param car_ids: Автомобили напоминаний, кэш которых и сводку владельцев нужно сбросить
+    """
+    if not delivered and not failed:
+        return
+
+    async def write(session):
+        if delivered:
+            await session.execute(st.MARK_REMINDERS_DELIVERED, {"ids": delivered, "now": now})
+        if failed:
+            await session.execute(
+                st.MARK_REMINDER_FAILED,
+                [{"id": reminder_id, "error": error} for reminder_id, error in failed.items()]
+            )
+
+    await writer.submit(write)
+    for car_id in car_ids:
+        await cache.invalidate("reminders", car_id)
+        # Отправленные напоминания больше не входят в счетчик главного меню
+        await invalidate_car_dashboard(car_id)
+
+async def get_purchase_gallery(tg_id, purchase_ids, session=None):
+    """
+    Асинхронная функция для получения покупок пользователя вместе с file_id их фото
 
-async def get_analytics(tg_id):
+    :param tg_id: ID владельца покупок в Telegram
+    :param purchase_ids: Список уникальных идентификаторов покупок
+    :param session: Сессия текущего обновления (DatabaseMiddleware) или None для отдельной сессии
+    :return: Список кортежей (Purchase, [file_id, ...]) в порядке purchase_ids
+    """
+    async with _reading(session) as session:
+        rows = await session.execute(
+            select(Purchase, PurchasePhoto.file_id)
+            .outerjoin(PurchasePhoto, PurchasePhoto.purchase_id == Purchase.purchase_id)
+            .where(Purchase.tg_id == tg_id, Purchase.purchase_id.in_(purchase_ids))
+            .order_by(Purchase.purchase_id, PurchasePhoto.photo_id)
+        )
+        gallery = {}
+        for purchase, file_id in rows:
+            photos = gallery.setdefault(purchase.purchase_id, (purchase, []))[1]
+            if file_id is not None:
+                photos.append(file_id)
+        # Удаленные покупки пропускаются
+        return [gallery[purchase_id] for purchase_id in purchase_ids if purchase_id in gallery]
+
+@cached("analytics")
+async def get_analytics(tg_id, session=None):
     """
     Асинхронная функция для получения всех отличных покупок и услуг
 
     :param tg_id: Внешний ключ, между Analytics и User моделями
-    :return: Генератор объектов Analytics, связанных с пользователем
+    :param session: Сессия текущего обновления (DatabaseMiddleware) или None для отдельной сессии
+    :return: Список объектов Analytics, связанных с пользователем
     """
     # Создание асинхронной сессии с базой данных
-    async with async_session() as session:
+    async with _reading(session) as session:
         # Получение всех заметок по tg_id
-        return await session.scalars(select(Analytics).where(Analytics.tg_id == tg_id))
+        return list(await session.scalars(st.ANALYTICS_BY_OWNER, {"tg_id": tg_id}))
     
+@cached("analytics")
+async def get_analytics_entry(tg_id, analytics_id, session=None):
+    """
+    Асинхронная функция для получения одной записи аналитики пользователя
+
+    :param tg_id: ID владельца записи в Telegram
+    :param analytics_id: Уникальный идентификатор записи
+    :param session: Сессия текущего обновления (DatabaseMiddleware) или None для отдельной сессии
+    :return: Объект Analytics или None, если запись не найдена
+    """
+    async with _reading(session) as session:
+        return await session.scalar(st.ANALYTICS_BY_ID, {"analytics_id": analytics_id, "tg_id": tg_id})
+
+async def _get_page(statements, owner_id, date_column, id_column, after, limit, with_total, session=None):
+    """
+    Асинхронная функция для получения страницы записей владельца в порядке (дата, id).
+
+    Вместо OFFSET используется условие "после курсора", которое
+    обслуживается составным индексом (владелец, дата).
+
+    :param statements: Заранее построенные запросы страниц (statements.PageStatements)
+    :param owner_id: Значение владельца
+    :param date_column: Столбец даты для сортировки
+    :param id_column: Первичный ключ модели
+    :param after: Курсор (дата, id) последней записи предыдущей страницы или None
+    :param limit: Размер страницы
+    :param with_total: Посчитать общее количество записей владельца
+    :param session: Сессия текущего обновления (DatabaseMiddleware) или None для отдельной сессии
+    :return: Объект Page
+    """
+    # Запрашиваем на одну запись больше, чтобы узнать, есть ли следующая страница
+    params = {"owner_id": owner_id, "limit": limit + 1}
+    query = statements.first
+    if after:
+        params["after_date"], params["after_id"] = after
+        query = statements.after
+
+    # Создание асинхронной сессии с базой данных
+    async with _reading(session) as session:
+        items = list(await session.scalars(query, params))
+        total = await session.scalar(statements.count, {"owner_id": owner_id}) if with_total else None
+
+    next_after = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_after = (getattr(last, date_column.key), getattr(last, id_column.key))
+
+    return Page(items=items, after=next_after, total=total)
+
+@cached("notes")
+async def get_notes_page(tg_id, after=None, limit=PAGE_SIZE, with_total=False, session=None):
+    """
+    Асинхронная функция для получения страницы заметок пользователя
+
+    :param tg_id: Внешний ключ, между Note и User моделями
+    :param after: Курсор (дата, id) предыдущей страницы, None для первой страницы
+    :param limit: Размер страницы
+    :param with_total: Посчитать общее количество заметок
+    :param session: Сессия текущего обновления (DatabaseMiddleware) или None для отдельной сессии
+    :return: Объект Page с заметками
+    """
+    return await _get_page(st.NOTES_PAGE, tg_id, Note.note_date, Note.note_id, after, limit, with_total, session)
+
+@cached("purchases")
+async def get_purchases_page(tg_id, after=None, limit=PAGE_SIZE, with_total=False, session=None):
+    """
+    Асинхронная функция для получения страницы покупок пользователя
+
+    :param tg_id: Внешний ключ, между Purchase и User моделями
+    :param after: Курсор (дата, id) предыдущей страницы, None для первой страницы
+    :param limit: Размер страницы
+    :param with_total: Посчитать общее количество покупок
+    :param session: Сессия текущего обновления (DatabaseMiddleware) или None для отдельной сессии
+    :return: Объект Page с покупками
+    """
+    return await _get_page(
+        st.PURCHASES_PAGE, tg_id, Purchase.purchase_date, Purchase.purchase_id, after, limit, with_total, session
+    )
+
+@cached("analytics")
+async def get_analytics_page(tg_id, after=None, limit=PAGE_SIZE, with_total=False, session=None):
+    """
+    Асинхронная функция для получения страницы данных аналитики пользователя
+
+    :param tg_id: Внешний ключ, между Analytics и User моделями
+    :param after: Курсор (дата, id) предыдущей страницы, None для первой страницы
+    :param limit: Размер страницы
+    :param with_total: Посчитать общее количество записей
+    :param session: Сессия текущего обновления (DatabaseMiddleware) или None для отдельной сессии
+    :return: Объект Page с данными аналитики
+    """
+    return await _get_page(
+        st.ANALYTICS_PAGE, tg_id, Analytics.analytics_date, Analytics.analytics_id, after, limit, with_total, session
+    )
+
+@cached("reminders")
+async def get_reminders_page(car_id, after=None, limit=PAGE_SIZE, with_total=False, session=None):
+    """
+    Асинхронная функция для получения страницы напоминаний автомобиля
+
+    :param car_id: Внешний ключ, между Reminder и Car моделями
+    :param after: Курсор (дата, id) предыдущей страницы, None для первой страницы
+    :param limit: Размер страницы
+    :param with_total: Посчитать общее количество напоминаний
+    :param session: Сессия текущего обновления (DatabaseMiddleware) или None для отдельной сессии
+    :return: Объект Page с напоминаниями
+    """
+    return await _get_page(
+        st.REMINDERS_PAGE, car_id, Reminder.reminder_date, Reminder.reminder_id, after, limit, with_total, session
+    )
+
+@cached("analytics")
+async def get_analytics_sum(tg_id, session=None):
+    """
+    Асинхронная функция для подсчета суммы всех трат пользователя
+
+    :param tg_id: Внешний ключ, между Analytics и User моделями
+    :param session: Сессия текущего обновления (DatabaseMiddleware) или None для отдельной сессии
+    :return: Сумма analytics_price
+    """
+    # Создание асинхронной сессии с базой данных
+    async with _reading(session) as session:
+        # Сумма считается по дневной сводке, а не по всем записям аналитики
+        return await session.scalar(st.ANALYTICS_SUM_BY_OWNER, {"tg_id": tg_id})
+
 async def update_car(car_id, name, year):
-    async with async_session() as session:
+    async def write(session):
         car = await session.scalar(select(Car).where(Car.car_id == car_id))
         car.name = name if name else car.name
         car.year = year if year else car.year
-        await session.commit()
+        return car.tg_id
+
+    tg_id = await writer.submit(write)
+    await cache.invalidate("car", car_id)
+    await cache.invalidate("cars", tg_id)
+
+async def _delete(model, id_column, ids, owner_column, owner_id):
+    """
+    Асинхронная функция для удаления записей владельца одним запросом DELETE.
+
+    :param model: Модель удаляемых записей
+    :param id_column: Первичный ключ модели
+    :param ids: Список значений первичного ключа
+    :param owner_column: Столбец владельца (tg_id или car_id)
+    :param owner_id: Значение владельца
+    :return: Количество удаленных записей
+    """
+    async def write(session):
+        result = await session.execute(
+            delete(model)
+            .where(id_column.in_(ids), owner_column == owner_id)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    return await writer.submit(write)
 
-async def remove_car(car_id):
+async def _delete_cars(session, tg_id, car_ids=None):
+    """
+    Асинхронная функция для удаления автомобилей пользователя вместе с их напоминаниями.
+    Выполняется внутри операции очереди записи.
+
+    :param session: Сессия пачки очереди записи
+    :param tg_id: ID пользователя в Telegram
+    :param car_ids: Список car_id или None для удаления всех автомобилей пользователя
+    :return: Кортеж (car_id удаленных автомобилей, количество удаленных автомобилей)
+    """
+    query = select(Car.car_id).where(Car.tg_id == tg_id)
+    if car_ids is not None:
+        query = query.where(Car.car_id.in_(car_ids))
+    owned = list(await session.scalars(query))
+    if not owned:
+        return owned, 0
+
+    # Каскадное удаление напоминаний, которое раньше выполнял ORM
+    for model in (Reminder, ReminderArchive):
+        await session.execute(
+            delete(model)
+            .where(model.car_id.in_(owned))
+            .execution_options(synchronize_session=False)
+        )
+    result = await session.execute(
+        delete(Car)
+        .where(Car.car_id.in_(owned))
+        .execution_options(synchronize_session=False)
+    )
+    return owned, result.rowcount
+
+async def remove_many_cars(car_ids, tg_id):
+    """
+    Асинхронная функция для удаления нескольких автомобилей пользователя и их напоминаний.
+
+    :param car_ids: Список уникальных идентификаторов автомобилей.
+    :param tg_id: ID владельца автомобилей в Telegram.
+    :return: Количество удаленных автомобилей.
+    """
+    async def write(session):
+        return await _delete_cars(session, tg_id, car_ids)
+
+    owned, count = await writer.submit(write)
+
+    await cache.invalidate("cars", tg_id)
+    await cache.invalidate("dashboard", tg_id)
+    for car_id in owned:
+        await cache.invalidate("car", car_id)
+        await cache.invalidate("reminders", car_id)
+    return count
+
+async def remove_car(car_id, tg_id):
     """
     Асинхронная функция для удаления автомобиля из базы данных по его car_id.
+    Вместе с автомобилем удаляются его напоминания.
 
     :param car_id: Уникальный идентификатор автомобиля.
+    :param tg_id: ID владельца автомобиля в Telegram.
+    :return: Количество удаленных автомобилей (0 или 1).
     """
-    # Создание асинхронной сессии с базой данных
-    async with async_session() as session:
-        # Поиск автомобиля по его car_id
-        car = await session.scalar(select(Car).where(Car.car_id == car_id))
-    
-        # Если автомобиль найден, удаляем его из базы данных
-        try:
-            await session.delete(car)
-            # Фиксация изменений в базе данных
-            await session.commit()
-        except:
-            pass
+    return await remove_many_cars([car_id], tg_id)
 
-async def remove_reminder(reminder_id):
+async def remove_many_reminders(reminder_ids, car_id, tg_id):
+    """
+    Асинхронная функция для удаления нескольких напоминаний автомобиля.
+    Удаляются только напоминания автомобилей пользователя tg_id.
+
+    :param reminder_ids: Список уникальных идентификаторов напоминаний.
+    :param car_id: Автомобиль, которому принадлежат напоминания.
+    :param tg_id: ID владельца автомобиля в Telegram.
+    :return: Количество удаленных напоминаний.
+    """
+    async def write(session):
+        # car_id приходит из состояния FSM, поэтому владелец проверяется в самом запросе
+        owned = select(Car.car_id).where(Car.tg_id == tg_id)
+        result = await session.execute(
+            delete(Reminder)
+            .where(
+                Reminder.reminder_id.in_(reminder_ids),
+                Reminder.car_id == car_id,
+                Reminder.car_id.in_(owned)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    count = await writer.submit(write)
+    await cache.invalidate("reminders", car_id)
+    await invalidate_car_dashboard(car_id)
+    return count
+
+async def remove_reminder(reminder_id, car_id, tg_id):
     """
     Асинхронная функция для удаления напоминания из базы данных по его reminder_id.
 
     :param reminder_id: Уникальный идентификатор напоминания.
+    :param car_id: Автомобиль, которому принадлежит напоминание.
+    :param tg_id: ID владельца автомобиля в Telegram.
+    :return: Количество удаленных напоминаний (0 или 1).
     """
-    # Создание асинхронной сессии с базой данных
-    async with async_session() as session:
-        # Поиск напоминания по его reminder_id
-        id = await session.scalar(select(Reminder).where(Reminder.reminder_id == reminder_id))
-    
-        # Если напоминание найдено, удаляем его из базы данных
-        try:
-            await session.delete(id)
-            # Фиксация изменений в базе данных
-            await session.commit()
-        except:
-            pass
+    return await remove_many_reminders([reminder_id], car_id, tg_id)
+
+async def remove_many_notes(note_ids, tg_id):
+    """
+    Асинхронная функция для удаления нескольких заметок пользователя.
+
+    :param note_ids: Список уникальных идентификаторов заметок.
+    :param tg_id: ID владельца заметок в Telegram.
+    :return: Количество удаленных заметок.
+    """
+    count = await _delete(Note, Note.note_id, note_ids, Note.tg_id, tg_id)
+    await cache.invalidate("notes", tg_id)
+    await cache.invalidate("dashboard", tg_id)
+    return count
 
-async def remove_note(note_id):
+async def remove_note(note_id, tg_id):
     """
     Асинхронная функция для удаления напоминания из базы данных по его note_id.
 
     :param note_id: Уникальный идентификатор напоминания.
+    :param tg_id: ID владельца заметки в Telegram.
+    :return: Количество удаленных заметок (0 или 1).
     """
-    # Создание асинхронной сессии с базой данных
-    async with async_session() as session:
-        # Поиск заметки по её note_id
-        id = await session.scalar(select(Note).where(Note.note_id == note_id))
-    
-        # Если заметка найдена, удаляем её из базы данных
-        try:
-            await session.delete(id)
-            # Фиксация изменений в базе данных
-            await session.commit()
-        except:
-            pass
+    return await remove_many_notes([note_id], tg_id)
 
-async def remove_purchase(purchase_id):
+async def remove_many_purchases(purchase_ids, tg_id):
+    """
+    Асинхронная функция для удаления нескольких покупок пользователя.
+
+    :param purchase_ids: Список уникальных идентификаторов покупок.
+    :param tg_id: ID владельца покупок в Telegram.
+    :return: Количество удаленных покупок.
+    """
+    async def write(session):
+        await session.execute(
+            delete(PurchasePhoto)
+            .where(PurchasePhoto.purchase_id.in_(
+                select(Purchase.purchase_id)
+                .where(Purchase.purchase_id.in_(purchase_ids), Purchase.tg_id == tg_id)
+            ))
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.execute(
+            delete(Purchase)
+            .where(Purchase.purchase_id.in_(purchase_ids), Purchase.tg_id == tg_id)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    # Фото и покупки удаляются одной транзакцией
+    count = await writer.submit(write)
+    await cache.invalidate("purchases", tg_id)
+    await cache.invalidate("dashboard", tg_id)
+    return count
+
+async def remove_purchase(purchase_id, tg_id):
     """
     Асинхронная функция для удаления покупки из базы данных по её purchase_id.
 
     :param purchase_id: Уникальный идентификатор покупки
+    :param tg_id: ID владельца покупки в Telegram
+    :return: Количество удаленных покупок (0 или 1)
     """
-    # Создание асинхронной сессии с базой данных
-    async with async_session() as session:
-        # Поиск покупки по её purchase_id
-        id = await session.scalar(select(Purchase).where(Purchase.purchase_id == purchase_id))
-    
-        # Если покупка найдена, удаляем её из базы данных
-        try:
-            await session.delete(id)
-            # Фиксация изменений в базе данных
-            await session.commit()
-        except:
-            pass
+    return await remove_many_purchases([purchase_id], tg_id)
 
-async def remove_analytics(analytics_id):
+async def remove_many_analytics(analytics_ids, tg_id):
+    """
+    Асинхронная функция для удаления нескольких записей аналитики пользователя.
+
+    :param analytics_ids: Список уникальных идентификаторов записей.
+    :param tg_id: ID владельца записей в Telegram.
+    :return: Количество удаленных записей.
+    """
+    count = await _delete(Analytics, Analytics.analytics_id, analytics_ids, Analytics.tg_id, tg_id)
+    await cache.invalidate("analytics", tg_id)
+    await cache.invalidate("dashboard", tg_id)
+    return count
+
+async def remove_analytics(analytics_id, tg_id):
     """
     Асинхронная функция для удаления покупки из базы данных по её analytics_id
 
     :param analytics_id: Уникальный идентификатор покупки
+    :param tg_id: ID владельца записи в Telegram
+    :return: Количество удаленных записей (0 или 1)
     """
-    # Создание асинхронной сессии с базой данных
-    async with async_session() as session:
-        # Поиск покупки по её analytics_id
-        id = await session.scalar(select(Analytics).where(Analytics.analytics_id == analytics_id))
-    
-        # Если покупка найдена, удаляем её из базы данных
-        try:
-            await session.delete(id)
-            # Фиксация изменений в базе данных
-            await session.commit()
-        except:
-            pass
+    return await remove_many_analytics([analytics_id], tg_id)
+
+# Разделы, которые можно очистить целиком: {раздел: (модель, столбец владельца)}
+SECTIONS = {
+    "notes": (Note, Note.tg_id),
+    "purchases": (Purchase, Purchase.tg_id),
+    "analytics": (Analytics, Analytics.tg_id),
+}
+
+async def clear_section(section, tg_id):
+    """
+    Асинхронная функция для удаления всех записей пользователя в разделе.
+
+    :param section: Раздел: "cars", "reminders", "notes", "purchases" или "analytics".
+    :param tg_id: ID пользователя в Telegram.
+    :return: Количество удаленных записей раздела.
+    """
+    if section == "cars":
+        async def write(session):
+            return await _delete_cars(session, tg_id)
+
+        owned, count = await writer.submit(write)
+        await cache.invalidate("cars", tg_id)
+        await cache.invalidate("dashboard", tg_id)
+        for car_id in owned:
+            await cache.invalidate("car", car_id)
+            await cache.invalidate("reminders", car_id)
+        return count
+
+    if section == "reminders":
+        async def write(session):
+            owned = list(await session.scalars(select(Car.car_id).where(Car.tg_id == tg_id)))
+            await session.execute(
+                delete(ReminderArchive)
+                .where(ReminderArchive.car_id.in_(owned))
+                .execution_options(synchronize_session=False)
+            )
+            result = await session.execute(
+                delete(Reminder)
+                .where(Reminder.car_id.in_(owned))
+                .execution_options(synchronize_session=False)
+            )
+            return owned, result.rowcount
+
+        owned, count = await writer.submit(write)
+        for car_id in owned:
+            await cache.invalidate("reminders", car_id)
+        await cache.invalidate("dashboard", tg_id)
+        return count
+
+    if section not in SECTIONS:
+        raise ValueError(f"Неизвестный раздел: {section}")
+
+    model, owner_column = SECTIONS[section]
+
+    async def write(session):
+        if section == "purchases":
+            await session.execute(
+                delete(PurchasePhoto)
+                .where(PurchasePhoto.purchase_id.in_(select(Purchase.purchase_id).where(Purchase.tg_id == tg_id)))
+                .execution_options(synchronize_session=False)
+            )
+        result = await session.execute(
+            delete(model)
+            .where(owner_column == tg_id)
+            .execution_options(synchronize_session=False)
+        )
+        if section == "analytics":
+            # Архив и сводка содержат суммы и перенесенных в архив записей
+            for archived in (AnalyticsArchive, DailySpending):
+                await session.execute(
+                    delete(archived)
+                    .where(archived.tg_id == tg_id)
+                    .execution_options(synchronize_session=False)
+                )
+        return result.rowcount
+
+    count = await writer.submit(write)
+    await cache.invalidate(section, tg_id)
+    await cache.invalidate("dashboard", tg_id)
+    return count
@@ -0,0 +1,89 @@
+"""
+Сводка трат по дням и категориям (таблица daily_spending).
+
+Сводка обновляется триггерами на таблице analytics в той же транзакции,
+что и добавление или удаление записи аналитики. Для пересчета сводки
+по уже существующим данным:
+
+    python -m bumblebeereminderbot.database.rollup
+"""
+import asyncio
+
+from .models import engine
+
+# Условие строки сводки, к которой относится запись аналитики {row}
+_ROLLUP_ROW = (
+    "tg_id = {row}.tg_id AND day = date({row}.analytics_date) AND category = {row}.analytics_title"
+)
+
+_ADD = (
+    "INSERT INTO daily_spending(tg_id, day, category, total, count) "
+    "VALUES (NEW.tg_id, date(NEW.analytics_date), NEW.analytics_title, COALESCE(NEW.analytics_price, 0), 1) "
+    "ON CONFLICT(tg_id, day, category) DO UPDATE SET "
+    "total = total + excluded.total, count = count + 1;"
+)
+
+_SUBTRACT = (
+    "UPDATE daily_spending SET total = total - COALESCE(OLD.analytics_price, 0), count = count - 1 "
+    f"WHERE {_ROLLUP_ROW.format(row='OLD')}; "
+    f"DELETE FROM daily_spending WHERE {_ROLLUP_ROW.format(row='OLD')} AND count <= 0;"
+)
+
+ROLLUP_TRIGGERS = (
+    f"CREATE TRIGGER IF NOT EXISTS analytics_rollup_insert AFTER INSERT ON analytics BEGIN {_ADD} END",
+    f"CREATE TRIGGER IF NOT EXISTS analytics_rollup_delete AFTER DELETE ON analytics BEGIN {_SUBTRACT} END",
+    f"CREATE TRIGGER IF NOT EXISTS analytics_rollup_update AFTER UPDATE ON analytics BEGIN {_SUBTRACT} {_ADD} END",
+)
+
+
+def rebuild_rollup(sync_conn):
+    """
+    Пересчитывает сводку daily_spending по всем записям аналитики.
+
+    :param sync_conn: Синхронное соединение с базой данных
+    """
+    columns = "tg_id, analytics_date, analytics_title, analytics_price"
+    source = f"SELECT {columns} FROM analytics"
+    # Архивные записи тоже входят в сводку
+    if sync_conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analytics_archive'"
+    ).scalar():
+        source += f" UNION ALL SELECT {columns} FROM analytics_archive"
+
+    sync_conn.exec_driver_sql("DELETE FROM daily_spending")
+    sync_conn.exec_driver_sql(
+        "INSERT INTO daily_spending(tg_id, day, category, total, count) "
+        "SELECT tg_id, date(analytics_date), analytics_title, SUM(COALESCE(analytics_price, 0)), COUNT(*) "
+        f"FROM ({source}) GROUP BY tg_id, date(analytics_date), analytics_title"
+    )
+
+
+def create_rollup(sync_conn):
+    """
+    Создает триггеры сводки. Если триггеров еще не было,
+    сводка предварительно заполняется по существующим данным.
+
+    :param sync_conn: Синхронное соединение с базой данных
+    """
+    exists = sync_conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'analytics_rollup_insert'"
+    ).scalar()
+    if not exists:
+        rebuild_rollup(sync_conn)
+
+    for statement in ROLLUP_TRIGGERS:
+        sync_conn.exec_driver_sql(statement)
+
+
+async def rebuild():
+    """
+    Асинхронная функция для пересчета сводки трат в отдельной транзакции.
+    """
+    async with engine.begin() as conn:
+        await conn.run_sync(rebuild_rollup)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild())
+    print("daily_spending rebuilt")
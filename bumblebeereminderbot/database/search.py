@@ -0,0 +1,212 @@
+import re
+from dataclasses import dataclass
+
+from sqlalchemy import select, text
+
+from .models import read_session
+from .models import Note, Purchase
+
+# Разделы, попадающие в полнотекстовый индекс: {раздел: код}.
+# rowid записи индекса равен id * 8 + код, поэтому триггеры удаляют записи по rowid без сканирования.
+KINDS = {
+    "notes": 1,
+    "purchases": 2,
+    "analytics": 3,
+    "reminders": 4,
+}
+
+# Источники индекса: (раздел, таблица, первичный ключ, заголовок, текст, владелец).
+# Выражения столбцов содержат {row} - псевдоним строки (NEW, OLD или имя таблицы).
+SOURCES = (
+    ("notes", "notes", "note_id", "{row}.note_title", "{row}.note_description", "{row}.tg_id"),
+    ("purchases", "purchases", "purchase_id", "{row}.purchase_title", "NULL", "{row}.tg_id"),
+    ("analytics", "analytics", "analytics_id", "{row}.analytics_title", "{row}.analytics_description", "{row}.tg_id"),
+    ("reminders", "reminders", "reminder_id", "{row}.reminder_title", "{row}.reminder_description",
+     "(SELECT tg_id FROM cars WHERE cars.car_id = {row}.car_id)"),
+)
+
+CREATE_INDEX = (
+    "CREATE VIRTUAL TABLE search_index USING fts5("
+    "title, body, tg_id, tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+
+def search_index_ddl() -> list[str]:
+    """
+    Возвращает триггеры, поддерживающие индекс search_index в актуальном состоянии.
+
+    :return: Список SQL-выражений CREATE TRIGGER
+    """
+    statements = []
+    for kind, table, pk, title, body, owner in SOURCES:
+        code = KINDS[kind]
+        # Триггер изменения срабатывает только при изменении индексируемых столбцов
+        columns = ", ".join(dict.fromkeys(
+            column for expression in (title, body, owner) for column in re.findall(r"\{row\}\.(\w+)", expression)
+        ))
+
+        def insert(row):
+            return (
+                "INSERT INTO search_index(rowid, title, body, tg_id) VALUES ("
+                f"{row}.{pk} * 8 + {code}, {title.format(row=row)}, {body.format(row=row)}, {owner.format(row=row)});"
+            )
+
+        def delete(row):
+            return f"DELETE FROM search_index WHERE rowid = {row}.{pk} * 8 + {code};"
+
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table} BEGIN "
+            f"{insert('NEW')} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table} BEGIN "
+            f"{delete('OLD')} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE OF {columns} ON {table} BEGIN "
+            f"{delete('OLD')} {insert('NEW')} END",
+        ]
+    return statements
+
+
+def create_search_index(sync_conn):
+    """
+    Создает полнотекстовый индекс и его триггеры.
+    Если индекс создается впервые, в него переносятся уже существующие записи.
+
+    :param sync_conn: Синхронное соединение с базой данных
+    """
+    exists = sync_conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'"
+    ).scalar()
+
+    if not exists:
+        sync_conn.exec_driver_sql(CREATE_INDEX)
+        for kind, table, pk, title, body, owner in SOURCES:
+            sync_conn.exec_driver_sql(
+                "INSERT INTO search_index(rowid, title, body, tg_id) "
+                f"SELECT {table}.{pk} * 8 + {KINDS[kind]}, {title.format(row=table)}, "
+                f"{body.format(row=table)}, {owner.format(row=table)} FROM {table}"
+            )
+
+    for statement in search_index_ddl():
+        sync_conn.exec_driver_sql(statement)
+
+
+def rebuild_search_update_triggers(sync_conn):
+    """
+    Пересоздает триггеры изменения поискового индекса по текущему search_index_ddl.
+    CREATE TRIGGER IF NOT EXISTS не заменяет существующие триггеры, поэтому они удаляются.
+
+    :param sync_conn: Синхронное соединение с базой данных
+    """
+    for _, table, *_ in SOURCES:
+        sync_conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {table}_search_update")
+    for statement in search_index_ddl():
+        sync_conn.exec_driver_sql(statement)
+
+
+def match_expression(tg_id, query) -> str | None:
+    """
+    Строит выражение MATCH для поиска по записям пользователя.
+
+    Каждое слово запроса ищется как префикс в заголовке и тексте,
+    поэтому спецсимволы FTS5 во вводе пользователя не интерпретируются.
+
+    :param tg_id: ID пользователя в Telegram
+    :param query: Текст запроса пользователя
+    :return: Выражение MATCH или None, если в запросе нет слов
+    """
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    terms = " AND ".join(f'"{word}"*' for word in words)
+    return f'tg_id : "{tg_id}" AND {{title body}} : ({terms})'
+
+
+@dataclass
+class SearchHit:
+    """
+    Найденная запись полнотекстового поиска.
+    """
+    # Раздел записи: "notes", "purchases", "analytics" или "reminders"
+    kind: str
+    # Первичный ключ записи в её таблице
+    id: int
+    # Заголовок записи
+    title: str
+    # Текст записи (может отсутствовать)
+    body: str | None
+
+
+async def search(tg_id, query, kinds=None, limit=20) -> list[SearchHit]:
+    """
+    Асинхронная функция для полнотекстового поиска по записям пользователя.
+
+    :param tg_id: ID пользователя в Telegram
+    :param query: Текст запроса
+    :param kinds: Разделы для поиска или None для всех разделов
+    :param limit: Максимальное количество результатов
+    :return: Список SearchHit, отсортированный по релевантности
+    """
+    expression = match_expression(tg_id, query)
+    if expression is None:
+        return []
+
+    codes = [KINDS[kind] for kind in kinds] if kinds else list(KINDS.values())
+    kind_names = {code: kind for kind, code in KINDS.items()}
+
+    # Создание асинхронной сессии с базой данных
+    async with read_session() as session:
+        rows = await session.execute(
+            text(
+                "SELECT rowid, title, body FROM search_index "
+                "WHERE search_index MATCH :expression "
+                f"AND rowid % 8 IN ({', '.join(str(code) for code in codes)}) "
+                "ORDER BY rank LIMIT :limit"
+            ),
+            {"expression": expression, "limit": limit}
+        )
+        return [
+            SearchHit(kind=kind_names[rowid % 8], id=rowid // 8, title=title, body=body)
+            for rowid, title, body in rows
+        ]
+
+
+async def _search_rows(model, id_column, kind, tg_id, query, limit):
+    """
+    Асинхронная функция для загрузки объектов модели, найденных полнотекстовым поиском.
+
+    :return: Список объектов в порядке релевантности
+    """
+    ids = [hit.id for hit in await search(tg_id, query, kinds=[kind], limit=limit)]
+    if not ids:
+        return []
+
+    # Создание асинхронной сессии с базой данных
+    async with read_session() as session:
+        rows = {
+            getattr(row, id_column.key): row
+            for row in await session.scalars(select(model).where(id_column.in_(ids)))
+        }
+    return [rows[row_id] for row_id in ids if row_id in rows]
+
+
+async def search_notes(tg_id, query, limit=20) -> list[Note]:
+    """
+    Асинхронная функция для поиска заметок пользователя по заголовку и тексту.
+
+    :param tg_id: ID пользователя в Telegram
+    :param query: Текст запроса
+    :param limit: Максимальное количество результатов
+    :return: Список объектов Note в порядке релевантности
+    """
+    return await _search_rows(Note, Note.note_id, "notes", tg_id, query, limit)
+
+
+async def search_purchases(tg_id, query, limit=20) -> list[Purchase]:
+    """
+    Асинхронная функция для поиска покупок пользователя по названию.
+
+    :param tg_id: ID пользователя в Telegram
+    :param query: Текст запроса
+    :param limit: Максимальное количество результатов
+    :return: Список объектов Purchase в порядке релевантности
+    """
+    return await _search_rows(Purchase, Purchase.purchase_id, "purchases", tg_id, query, limit)
@@ -0,0 +1,165 @@
+"""
+Запросы, которые выполняются почти на каждом обновлении.
+
+Объекты запросов строятся один раз при импорте, значения передаются через
+bindparam. SQLAlchemy запоминает ключ кэша компиляции у объекта запроса,
+поэтому повторное выполнение не строит запрос и не вычисляет ключ заново.
+"""
+from dataclasses import dataclass
+
+from sqlalchemy import Select, and_, bindparam, case, delete, func, or_, select, update
+from sqlalchemy.dialects.sqlite import insert
+
+from .models import User, Car, Reminder, Note, Purchase, Analytics, DailySpending, FSMState
+
+
+@dataclass(frozen=True)
+class PageStatements:
+    """
+    Запросы keyset-пагинации записей одного владельца.
+    Параметры: owner_id, limit и для after - after_date, after_id.
+    """
+    # Первая страница
+    first: Select
+    # Страница после курсора (дата, id)
+    after: Select
+    # Общее количество записей владельца
+    count: Select
+
+
+def page_statements(model, owner_column, date_column, id_column) -> PageStatements:
+    """
+    Строит запросы страниц записей владельца в порядке (дата, id).
+
+    :param model: Модель, записи которой выбираются
+    :param owner_column: Столбец владельца (tg_id или car_id)
+    :param date_column: Столбец даты для сортировки
+    :param id_column: Первичный ключ модели
+    :return: Объект PageStatements
+    """
+    owned = select(model).where(owner_column == bindparam("owner_id"))
+    after_date = bindparam("after_date")
+    ordered = (date_column, id_column)
+    return PageStatements(
+        first=owned.order_by(*ordered).limit(bindparam("limit")),
+        after=owned.where(or_(
+            date_column > after_date,
+            and_(date_column == after_date, id_column > bindparam("after_id"))
+        )).order_by(*ordered).limit(bindparam("limit")),
+        count=select(func.count()).select_from(model).where(owner_column == bindparam("owner_id")),
+    )
+
+
+# Регистрация пользователя; существующая запись не изменяется
+_insert_user = insert(User).values(tg_id=bindparam("tg_id"), fullname=bindparam("fullname"))
+INSERT_USER = _insert_user.on_conflict_do_update(
+    index_elements=[User.tg_id],
+    # Имя обновляется, если оно известно; без имени существующая запись не меняется
+    set_={"fullname": func.coalesce(_insert_user.excluded.fullname, User.fullname)}
+)
+
+# Списки записей владельца
+CARS_BY_OWNER = select(Car).where(Car.tg_id == bindparam("tg_id"))
+CAR_BY_ID = select(Car).where(Car.car_id == bindparam("car_id"))
+REMINDERS_BY_CAR = select(Reminder).where(Reminder.car_id == bindparam("car_id"))
+NOTES_BY_OWNER = select(Note).where(Note.tg_id == bindparam("tg_id"))
+NOTE_BY_ID = select(Note).where(Note.note_id == bindparam("note_id"), Note.tg_id == bindparam("tg_id"))
+PURCHASES_BY_OWNER = select(Purchase).where(Purchase.tg_id == bindparam("tg_id"))
+ANALYTICS_BY_OWNER = select(Analytics).where(Analytics.tg_id == bindparam("tg_id"))
+ANALYTICS_BY_ID = select(Analytics).where(
+    Analytics.analytics_id == bindparam("analytics_id"), Analytics.tg_id == bindparam("tg_id")
+)
+
+# Ожидающее напоминание: не выполнено и еще не отправлено
+_pending_reminder = and_(Reminder.is_done_reminder.is_not(True), Reminder.delivered_at.is_(None))
+
+# Автомобили пользователя с количеством ожидающих напоминаний и датой ближайшего
+# предстоящего; наступившие напоминания в дату ближайшего не входят. Параметры: tg_id, now
+CARS_WITH_REMINDERS = (
+    select(
+        Car,
+        func.count(Reminder.reminder_id),
+        func.min(case((Reminder.reminder_date >= bindparam("now"), Reminder.reminder_date))),
+    )
+    .outerjoin(Reminder, and_(Reminder.car_id == Car.car_id, _pending_reminder))
+    .where(Car.tg_id == bindparam("tg_id"))
+    .group_by(Car.car_id)
+    .order_by(Car.car_id)
+)
+
+# Сводка для главного меню: все счетчики пользователя одним запросом,
+# каждый подзапрос обслуживается индексом по владельцу
+DASHBOARD = select(
+    select(func.count()).select_from(Car)
+    .where(Car.tg_id == bindparam("tg_id")).scalar_subquery(),
+    select(func.count()).select_from(Reminder)
+    .join(Car, Car.car_id == Reminder.car_id)
+    .where(Car.tg_id == bindparam("tg_id"), _pending_reminder).scalar_subquery(),
+    select(func.count()).select_from(Note)
+    .where(Note.tg_id == bindparam("tg_id")).scalar_subquery(),
+    select(func.count()).select_from(Purchase)
+    .where(Purchase.tg_id == bindparam("tg_id")).scalar_subquery(),
+    select(func.coalesce(func.sum(DailySpending.total), 0.0))
+    .where(DailySpending.tg_id == bindparam("tg_id"), DailySpending.day >= bindparam("month_start")).scalar_subquery(),
+)
+
+# Сумма всех трат пользователя по дневной сводке
+ANALYTICS_SUM_BY_OWNER = select(
+    func.coalesce(func.sum(DailySpending.total), 0.0)
+).where(DailySpending.tg_id == bindparam("tg_id"))
+
+# Страницы списков
+NOTES_PAGE = page_statements(Note, Note.tg_id, Note.note_date, Note.note_id)
+PURCHASES_PAGE = page_statements(Purchase, Purchase.tg_id, Purchase.purchase_date, Purchase.purchase_id)
+ANALYTICS_PAGE = page_statements(Analytics, Analytics.tg_id, Analytics.analytics_date, Analytics.analytics_id)
+REMINDERS_PAGE = page_statements(Reminder, Reminder.car_id, Reminder.reminder_date, Reminder.reminder_id)
+
+# Наступившие и еще не отправленные напоминания с владельцем автомобиля. Порядок (tg_id, id)
+# собирает напоминания одного пользователя в одну порцию; наступивших немного, и их
+# сортировка дешевле, чем отправка одного пользователю нескольких сообщений.
+# Параметры: now, max_attempts, limit и для after - after_tg_id, after_id.
+_due = (
+    select(
+        Reminder.reminder_id, Reminder.reminder_title, Reminder.reminder_description,
+        Reminder.reminder_date, Reminder.car_id, Car.tg_id, Car.name, User.fullname
+    )
+    .join(Car, Car.car_id == Reminder.car_id)
+    .join(User, User.tg_id == Car.tg_id)
+    .where(
+        Reminder.delivered_at.is_(None),
+        Reminder.reminder_date <= bindparam("now"),
+        Reminder.is_done_reminder.is_not(True),
+        Reminder.delivery_attempts < bindparam("max_attempts"),
+    )
+)
+DUE_REMINDERS = _due.order_by(Car.tg_id, Reminder.reminder_id).limit(bindparam("limit"))
+DUE_REMINDERS_AFTER = _due.where(or_(
+    Car.tg_id > bindparam("after_tg_id"),
+    and_(Car.tg_id == bindparam("after_tg_id"), Reminder.reminder_id > bindparam("after_id"))
+)).order_by(Car.tg_id, Reminder.reminder_id).limit(bindparam("limit"))
+
+# Результат отправки напоминаний (таблица, а не модель: выполняется как обычный UPDATE)
+_reminders = Reminder.__table__
+MARK_REMINDERS_DELIVERED = update(_reminders).where(
+    _reminders.c.reminder_id.in_(bindparam("ids", expanding=True))
+).values(
+    delivered_at=bindparam("now"),
+    delivery_error=None,
+    delivery_attempts=_reminders.c.delivery_attempts + 1,
+)
+MARK_REMINDER_FAILED = update(_reminders).where(
+    _reminders.c.reminder_id == bindparam("id")
+).values(
+    delivery_error=bindparam("error"),
+    delivery_attempts=_reminders.c.delivery_attempts + 1,
+)
+
+# Состояния FSM
+FSM_STATE_BY_KEY = select(FSMState.state, FSMState.data, FSMState.updated_at).where(FSMState.key == bindparam("key"))
+_fsm_insert = insert(FSMState)
+UPSERT_FSM_STATE = _fsm_insert.on_conflict_do_update(
+    index_elements=[FSMState.key],
+    set_={"state": _fsm_insert.excluded.state, "data": _fsm_insert.excluded.data, "updated_at": _fsm_insert.excluded.updated_at},
+)
+DELETE_FSM_STATES = delete(FSMState).where(FSMState.key.in_(bindparam("keys", expanding=True)))
+DELETE_EXPIRED_FSM_STATES = delete(FSMState).where(FSMState.updated_at < bindparam("expired_before"))
@@ -0,0 +1,124 @@
+import asyncio
+import contextvars
+import logging
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from bumblebeereminderbot.config import WRITE_BATCH_DELAY, WRITE_BATCH_SIZE
+from .models import async_session
+from .profiling import QueryStats, current_stats
+
+logger = logging.getLogger(__name__)
+
+# Операция записи: получает общую сессию пачки и возвращает результат для вызывающего
+WriteOperation = Callable[[AsyncSession], Awaitable[Any]]
+# Элемент очереди: операция, future вызывающего и статистика запросов его обновления
+WriteItem = tuple[WriteOperation, asyncio.Future, QueryStats | None]
+
+
+class WriteQueue:
+    """
+    Очередь записи с групповой фиксацией (group commit).
+
+    Все изменения выполняются одной фоновой задачей: операции, накопившиеся
+    за короткое окно, выполняются в одной транзакции и фиксируются одним
+    COMMIT. Вызывающий ожидает future, который завершается после фиксации.
+
+    Фоновая задача работает в своем контексте, поэтому статистика запросов
+    обновления (QueryStats) передается вместе с операцией, и запросы операции
+    учитываются в статистике её вызывающего.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        delay: float = WRITE_BATCH_DELAY / 1000,
+        max_batch: int = WRITE_BATCH_SIZE
+    ):
+        self.session_factory = session_factory
+        self.delay = delay
+        self.max_batch = max_batch
+        self._queue: asyncio.Queue[WriteItem] | None = None
+        self._task: asyncio.Task | None = None
+
+    async def submit(self, operation: WriteOperation) -> Any:
+        """
+        Ставит операцию в очередь и ожидает фиксации её транзакции.
+
+        :param operation: Асинхронная функция, выполняющая изменения в переданной сессии
+        :return: Результат операции
+        """
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            # Фоновая задача не наследует контекст обновления, из которого
+            # была запущена: запросы учитываются по статистике каждой операции
+            self._task = asyncio.create_task(self._run(), context=contextvars.Context())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((operation, future, current_stats.get()))
+        return await future
+
+    async def close(self) -> None:
+        """
+        Дожидается записи всех операций в очереди и останавливает фоновую задачу.
+        """
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            # Ожидание других операций, пришедших в то же окно
+            await asyncio.sleep(self.delay)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                await self._commit(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _commit(self, batch: list[WriteItem]) -> None:
+        batch = [item for item in batch if not item[1].done()]
+        if not batch:
+            return
+
+        try:
+            async with self.session_factory() as session:
+                results = []
+                for operation, _, stats in batch:
+                    current_stats.set(stats)
+                    results.append(await operation(session))
+                    # Объекты, добавленные через session.add, записываются сразу, чтобы
+                    # их INSERT попал в статистику этой операции, а не в общий COMMIT
+                    if stats is not None and (session.new or session.dirty or session.deleted):
+                        await session.flush()
+                current_stats.set(None)
+                await session.commit()
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # Ошибка одной операции не должна отменять остальные:
+            # повторяем пачку по одной операции в транзакции
+            logger.warning("Group commit of %d operations failed, retrying one by one: %s", len(batch), e)
+            for item in batch:
+                await self._commit([item])
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+# Общая очередь записи в базу данных
+writer = WriteQueue(async_session)
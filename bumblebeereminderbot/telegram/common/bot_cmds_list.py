@@ -3,5 +3,6 @@ from aiogram.types import BotCommand
 # Список команд для приватных чатов
 private = [
     BotCommand(command="menu", description="Меню"),
-    BotCommand(command="help", description="Помощь")
+    BotCommand(command="help", description="Помощь"),
+    BotCommand(command="search", description="Поиск")
 ]
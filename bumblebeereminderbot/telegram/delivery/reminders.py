@@ -0,0 +1,172 @@
+"""
+Рассылка наступивших напоминаний.
+
+Вместо отдельной задачи планировщика на каждое напоминание периодическая
+задача deliver_reminders() раз в REMINDER_SLICE_SECONDS выбирает все
+наступившие и еще не отправленные напоминания порциями по
+REMINDER_BATCH_SIZE. Напоминания одного пользователя объединяются в одно
+сообщение, сообщения отправляют REMINDER_WORKERS обработчиков в очереди LOW
+ограничителя частоты. Результат отправки всей порции записывается в базу
+одной операцией: отправленные напоминания больше не выбираются, а
+неудачные повторяются до REMINDER_MAX_ATTEMPTS раз.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Sequence
+
+from aiogram import Bot
+from sqlalchemy import Row
+
+from bumblebeereminderbot.config import REMINDER_WORKERS, REMINDER_BATCH_SIZE, REMINDER_MAX_ATTEMPTS
+import bumblebeereminderbot.database.requests as rq
+from bumblebeereminderbot.telegram.middlewares import scheduler
+from bumblebeereminderbot.telegram.middlewares.ratelimit import low_priority
+
+logger = logging.getLogger(__name__)
+
+# Наибольшая длина текста сообщения Telegram
+MESSAGE_LIMIT = 4096
+
+
+def reminder_line(reminder: Row) -> str:
+    """
+    Возвращает строку напоминания: название и описание.
+    """
+    if reminder.reminder_description:
+        return f"{reminder.reminder_title}: {reminder.reminder_description}"
+    return reminder.reminder_title
+
+
+def greeting(reminder: Row) -> str:
+    """
+    Возвращает приветствие пользователя по имени, если оно известно.
+    """
+    if reminder.fullname:
+        return f"Привет, {reminder.fullname}"
+    return "Привет"
+
+
+def reminder_messages(reminders: Sequence[Row]) -> list[tuple[str, list[int]]]:
+    """
+    Объединяет напоминания одного пользователя в сообщения не длиннее MESSAGE_LIMIT.
+
+    :param reminders: Наступившие напоминания пользователя
+    :return: Список пар (текст сообщения, id вошедших в него напоминаний)
+    """
+    if len(reminders) == 1:
+        reminder = reminders[0]
+        text = f"{greeting(reminder)}, у тебя есть задача {reminder_line(reminder)}"
+        return [(text[:MESSAGE_LIMIT], [reminder.reminder_id])]
+
+    header = f"{greeting(reminders[0])}, у тебя есть задачи:"
+    messages = []
+    text, ids = header, []
+    for reminder in reminders:
+        line = f"\n— {reminder.name}. {reminder_line(reminder)}"
+        if ids and len(text) + len(line) > MESSAGE_LIMIT:
+            messages.append((text, ids))
+            text, ids = header, []
+        text = (text + line)[:MESSAGE_LIMIT]
+        ids.append(reminder.reminder_id)
+    messages.append((text, ids))
+    return messages
+
+
+class ReminderDispatcher:
+    """
+    Отправка наступивших напоминаний пулом обработчиков с объединением по пользователям.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        workers: int = REMINDER_WORKERS,
+        batch_size: int = REMINDER_BATCH_SIZE,
+        max_attempts: int = REMINDER_MAX_ATTEMPTS
+    ):
+        self.bot = bot
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+
+    async def run(self, now: datetime | None = None) -> tuple[int, int]:
+        """
+        Отправляет все напоминания, наступившие к моменту now.
+
+        :param now: Время проверки, по умолчанию datetime.now()
+        :return: Кортеж (отправлено напоминаний, не удалось отправить)
+        """
+        now = now or datetime.now()
+        delivered = failed = 0
+        after = None
+        while True:
+            reminders = await rq.get_due_reminders(now, self.max_attempts, after=after, limit=self.batch_size)
+            if not reminders:
+                break
+            batch_delivered, batch_failed = await self.deliver(reminders)
+            delivered += batch_delivered
+            failed += batch_failed
+            if len(reminders) < self.batch_size:
+                break
+            # Следующая порция начинается после последнего напоминания, поэтому
+            # неудачные отправки повторяются только при следующей проверке
+            after = (reminders[-1].tg_id, reminders[-1].reminder_id)
+
+        if delivered or failed:
+            logger.info("Delivered %d reminders, %d failed", delivered, failed)
+        return delivered, failed
+
+    async def deliver(self, reminders: Sequence[Row]) -> tuple[int, int]:
+        """
+        Отправляет порцию напоминаний и записывает результат в базу.
+
+        :param reminders: Строки, выбранные rq.get_due_reminders
+        :return: Кортеж (отправлено напоминаний, не удалось отправить)
+        """
+        by_user: dict[int, list[Row]] = defaultdict(list)
+        for reminder in reminders:
+            by_user[reminder.tg_id].append(reminder)
+
+        queue: asyncio.Queue[tuple[int, list[Row]]] = asyncio.Queue()
+        for item in by_user.items():
+            queue.put_nowait(item)
+
+        delivered: list[int] = []
+        failed: dict[int, str] = {}
+
+        async def work():
+            while not queue.empty():
+                tg_id, user_reminders = queue.get_nowait()
+                for text, ids in reminder_messages(user_reminders):
+                    try:
+                        await self.bot.send_message(chat_id=tg_id, text=text)
+                    except Exception as e:
+                        logger.warning("Failed to deliver reminders %s to %s: %s", ids, tg_id, e)
+                        error = f"{type(e).__name__}: {e}"[:256]
+                        failed.update(dict.fromkeys(ids, error))
+                    else:
+                        delivered.extend(ids)
+
+        # Напоминания отправляются в очереди LOW общего ограничителя частоты
+        with low_priority():
+            await asyncio.gather(*(work() for _ in range(min(self.workers, len(by_user)))))
+
+        # Результат всей порции записывается одной операцией очереди записи
+        delivered_at = datetime.now()
+        car_ids = {reminder.car_id for reminder in reminders}
+        await rq.record_deliveries(delivered_at, delivered, failed, car_ids)
+        return len(delivered), len(failed)
+
+
+async def deliver_reminders() -> tuple[int, int]:
+    """
+    Периодическая задача планировщика: отправляет наступившие напоминания
+    через бота, зарегистрированного setup_reminder_bot().
+
+    :return: Кортеж (отправлено напоминаний, не удалось отправить)
+    """
+    if scheduler.reminder_bot is None:
+        raise RuntimeError("Reminder bot is not registered, call setup_reminder_bot() on startup")
+    return await ReminderDispatcher(scheduler.reminder_bot).run()
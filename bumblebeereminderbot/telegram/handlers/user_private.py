@@ -1,33 +1,31 @@
 """
 Модуль обработчиков для приватных сообщений пользователя.
 """
-from collections import defaultdict
+from itertools import accumulate
 from datetime import datetime, timedelta
+from functools import partial
 from tzlocal import get_localzone
-import json
 import re
 
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.date import DateTrigger
-
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from matplotlib.ticker import MaxNLocator
 from io import BytesIO
 
-from aiogram import Router, types, F, Bot
-from aiogram.filters import Command, CommandStart, or_f, StateFilter
-from aiogram.utils.serialization import deserialize_telegram_object_to_python
-from aiogram.types import PhotoSize
+from aiogram import Router, types, F
+from aiogram.filters import Command, CommandObject, CommandStart, or_f, StateFilter
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.scene import Scene, on, ScenesManager
 from aiogram.fsm.context import FSMContext
 
-from bumblebeereminderbot.telegram.kbd.inline import get_callback_btns, Remove, View, Period
-from bumblebeereminderbot.telegram.middlewares.scheduler import send_message_scheduler
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bumblebeereminderbot.telegram.kbd.inline import get_callback_btns, Remove, View, Period, Album
+from bumblebeereminderbot.telegram.middlewares.ratelimit import low_priority
 
 import bumblebeereminderbot.database.requests as rq
-from bumblebeereminderbot.utils.searcher import searcher
+from bumblebeereminderbot.database.reports import AnalyticsReport, get_analytics_report
+from bumblebeereminderbot.database.search import search, search_notes, search_purchases
 
 # Создание роутера для обработки приватных сообщений
 user_private = Router()
@@ -50,6 +48,67 @@ BUTTONS = {
 }
 
 
+async def load_page(state: FSMContext, key: str, fetch, page: int = 0):
+    """
+    Загружает страницу списка и сохраняет в FSM только номер страницы и курсоры уже открытых страниц.
+
+    :param state: FSMContext пользователя.
+    :param key: Ключ списка в данных FSM (например, "notes").
+    :param fetch: Функция получения страницы, принимающая курсор after.
+    :param page: Номер страницы, начиная с 0.
+    :return: Кортеж (rq.Page, номер фактически загруженной страницы).
+    """
+    data = await state.get_data()
+    # Курсор страницы i - это курсор последней записи страницы i - 1
+    cursors = data.get(f"{key}_cursors", [None])[:page + 1] if page else [None]
+    page = min(page, len(cursors) - 1)
+
+    result = await fetch(after=cursors[page])
+    # Страница могла опустеть после удаления её последних записей
+    while not result.items and page:
+        page -= 1
+        cursors = cursors[:page + 1]
+        result = await fetch(after=cursors[page])
+
+    if result.after:
+        cursors.append(result.after)
+    await state.update_data({f"{key}_cursors": cursors, f"{key}_page": page})
+    return result, page
+
+
+async def current_page(state: FSMContext, key: str, fetch):
+    """
+    Повторно загружает открытую страницу списка по курсору из FSM.
+    Страницы кэшируются слоем запросов, поэтому повторная загрузка обычно не обращается к базе.
+
+    :param state: FSMContext пользователя.
+    :param key: Ключ списка в данных FSM (например, "notes").
+    :param fetch: Функция получения страницы, принимающая курсор after.
+    :return: Объект rq.Page.
+    """
+    data = await state.get_data()
+    cursors = data.get(f"{key}_cursors", [None])
+    page = min(data.get(f"{key}_page", 0), len(cursors) - 1)
+    return await fetch(after=cursors[page])
+
+
+def page_buttons(name: str, page: int, result) -> dict[str, str]:
+    """
+    Формирует кнопки перехода между страницами списка.
+
+    :param name: Имя списка для callback_data ("prev_<name>", "next_<name>").
+    :param page: Номер текущей страницы.
+    :param result: Текущая страница rq.Page.
+    :return: Словарь кнопок.
+    """
+    buttons = {}
+    if page:
+        buttons["⬅️"] = f"prev_{name}"
+    if result.after:
+        buttons["➡️"] = f"next_{name}"
+    return buttons
+
+
 # Регистрация обработчиков команд /menu и /start
 @user_private.message(or_f(Command("menu"), CommandStart()))
 async def start_menu(message: types.Message, state: FSMContext, scenes: ScenesManager):
@@ -60,6 +119,58 @@ async def start_menu(message: types.Message, state: FSMContext, scenes: ScenesMa
     await scenes.enter(Menu)
 
 
+#==========Search==========
+# Названия разделов в результатах поиска
+SEARCH_KINDS = {
+    "notes": "Заметка",
+    "purchases": "Покупка",
+    "analytics": "Аналитика",
+    "reminders": "Напоминание",
+}
+# Наибольшая длина заголовка и текста записи в результатах поиска
+SEARCH_TITLE_LENGTH = 64
+SEARCH_BODY_LENGTH = 100
+# Наибольшая длина текста сообщения Telegram
+MESSAGE_LIMIT = 4096
+
+
+def shorten(text: str, length: int) -> str:
+    """
+    Обрезает текст до length символов, заменяя окончание многоточием.
+    """
+    return text if len(text) <= length else text[:length - 1] + "…"
+
+
+@user_private.message(Command("search"))
+async def search_all(message: types.Message, command: CommandObject):
+    """
+    Обработчик команды /search. Ищет текст во всех разделах пользователя.
+    """
+    if not command.args:
+        await message.answer("Введите текст для поиска после команды, например: /search масло")
+        return
+
+    hits = await search(message.from_user.id, command.args)
+    if not hits:
+        await message.answer("Ничего не найдено.")
+        return
+
+    # Текст записей не ограничен по длине, поэтому строки обрезаются,
+    # а результаты при необходимости делятся на несколько сообщений
+    messages = [""]
+    for i, hit in enumerate(hits, start=1):
+        line = f"{i}. {SEARCH_KINDS[hit.kind]}: {shorten(hit.title, SEARCH_TITLE_LENGTH)}"
+        if hit.body:
+            line += f" - {shorten(hit.body, SEARCH_BODY_LENGTH)}"
+        if messages[-1] and len(messages[-1]) + len(line) + 1 > MESSAGE_LIMIT:
+            messages.append("")
+        messages[-1] += ("\n" if messages[-1] else "") + line
+    for message_text in messages:
+        await message.answer(text=message_text)
+
+#==========Search==========
+
+
 class Menu(Scene, state="main_menu"):
     """
     Сцена главного меню.
@@ -67,42 +178,32 @@ class Menu(Scene, state="main_menu"):
 
     @on.message.enter()
     @on.callback_query.enter()
-    async def on_enter(self, event: types.Message | types.CallbackQuery, state: FSMContext):
+    async def on_enter(self, event: types.Message | types.CallbackQuery, state: FSMContext, session: AsyncSession):
         """
         Обработчик входа в сцену меню. Отправляет приветственное сообщение и кнопки меню.
         """
         # записываем tg_id пользователя и добавление в базу данных User
-        await rq.set_user(tg_id=event.from_user.id)
+        await rq.set_user(tg_id=event.from_user.id, fullname=event.from_user.full_name)
+
+        # Счетчики разделов одним запросом (кэшируются до изменения данных пользователя)
+        month_start = datetime.now(local_tz).date().replace(day=1)
+        dashboard = await rq.get_dashboard(event.from_user.id, month_start, session=session)
+        text = f"Здравствуйте, вы в CarBotHelper!\nТраты за этот месяц: {round(dashboard.month_spend, 2)}"
+        buttons = {
+            f'{BUTTONS["Profile"]} ({dashboard.cars})': "profile",
+            f'{BUTTONS["Reminders"]} ({dashboard.reminders})': "reminder",
+            f'{BUTTONS["Notes"]} ({dashboard.notes})': "notes",
+            f'{BUTTONS["Purchases"]} ({dashboard.purchases})': "purchase",
+            BUTTONS["Analytics"]: "analisis",
+        }
 
         if isinstance(event, types.Message):
             # Удаление предыдущего сообщения и отправка меню
             await event.delete()
-            await event.answer(
-                text="Здравствуйте, вы в CarBotHelper!",
-                reply_markup=get_callback_btns(
-                    btns={
-                        BUTTONS["Profile"]: "profile",
-                        BUTTONS["Reminders"]: "reminder",
-                        BUTTONS["Notes"]: "notes",
-                        BUTTONS["Purchases"]: "purchase",
-                        BUTTONS["Analytics"]: "analisis",
-                    }
-                )
-            )
+            await event.answer(text=text, reply_markup=get_callback_btns(btns=buttons))
         else:
             # Редактирование сообщения и отправка меню
-            await event.message.edit_text(
-                text="Здравствуйте, вы в CarBotHelper!",
-                reply_markup=get_callback_btns(
-                    btns={
-                        BUTTONS["Profile"]: "profile",
-                        BUTTONS["Reminders"]: "reminder",
-                        BUTTONS["Notes"]: "notes",
-                        BUTTONS["Purchases"]: "purchase",
-                        BUTTONS["Analytics"]: "analisis",
-                    }
-                )
-            )
+            await event.message.edit_text(text=text, reply_markup=get_callback_btns(btns=buttons))
             await event.answer()
         
     @on.callback_query(F.data == "profile")
@@ -163,7 +264,7 @@ class Profile(Scene, state="profile"):
 
     @on.message.enter()
     @on.callback_query.enter()
-    async def on_enter(self, event: types.Message | types.CallbackQuery, state: FSMContext):
+    async def on_enter(self, event: types.Message | types.CallbackQuery, state: FSMContext, session: AsyncSession):
         """
         Обработчик входа в сцену профиля.  Отображает список автомобилей пользователя.
         """
@@ -173,7 +274,7 @@ class Profile(Scene, state="profile"):
                 await event.message.delete()
         except:
             pass
-        cars = [i for i in await rq.get_cars(tg_id=event.from_user.id)]
+        cars = [i for i in await rq.get_cars(tg_id=event.from_user.id, session=session)]
 
         message_text = f'У вас {len(cars)} машины.' or "У вас нет машин."
         buttons = {
@@ -222,11 +323,11 @@ class Profile(Scene, state="profile"):
         await callback.answer()
 
     @on.callback_query(F.data == "remove_auto")
-    async def remove_auto(self, callback: types.CallbackQuery, state: FSMContext):
+    async def remove_auto(self, callback: types.CallbackQuery, state: FSMContext, session: AsyncSession):
         """
         Начало процесса удаления автомобиля.  Отображает список автомобилей для удаления.
         """
-        cars = [i for i in await rq.get_cars(tg_id=callback.from_user.id)]
+        cars = [i for i in await rq.get_cars(tg_id=callback.from_user.id, session=session)]
         text = '\n'.join(f'{i}: {car.name} {car.year}' for i, car in enumerate(cars, start=1))
         btns = {f"{i}": f'{Remove(id=car.car_id).pack()}' for i, car in enumerate(cars, start=1)}
         await callback.message.edit_text(
@@ -242,12 +343,12 @@ class Profile(Scene, state="profile"):
         """
         Удаление выбранного автомобиля.  Удаляет автомобиль из базы данных и обновляет список.
         """
-        await rq.remove_car(car_id=callback_data.id)
+        await rq.remove_car(car_id=callback_data.id, tg_id=callback.from_user.id)
         await self.wizard.retake()
 
     @on.callback_query(F.data == 'view_auto')
-    async def view_cars(self, callback: types.CallbackQuery, state: FSMContext):
-        cars = await rq.get_cars(callback.from_user.id)
+    async def view_cars(self, callback: types.CallbackQuery, state: FSMContext, session: AsyncSession):
+        cars = await rq.get_cars(callback.from_user.id, session=session)
 
         message_text = "Выберите автомобиль для подробной информации о нем."
         buttons = {f'{car.name}': View(id=car.car_id).pack() for car in cars}
@@ -261,8 +362,8 @@ class Profile(Scene, state="profile"):
         await callback.answer()
 
     @on.callback_query(View.filter())
-    async def view_car(self, callback: types.CallbackQuery, callback_data: View, state: FSMContext):
-        car = await rq.get_car(callback_data.id)
+    async def view_car(self, callback: types.CallbackQuery, callback_data: View, state: FSMContext, session: AsyncSession):
+        car = await rq.get_car(callback_data.id, session=session)
         await state.update_data(edit_car=[car.car_id])
 
         message_text = f'{car.name} - {car.year} года выпуска.'
@@ -309,12 +410,12 @@ async def back_profiler(callback: types.CallbackQuery, scenes: ScenesManager):
 
 @user_private.message(AddCar.edit_name, F.text.regexp(r'^\w+$'))
 @user_private.callback_query(F.data == 'next_name')
-async def edit_name(event: types.Message | types.CallbackQuery, state: FSMContext):
+async def edit_name(event: types.Message | types.CallbackQuery, state: FSMContext, session: AsyncSession):
     """
     Сохранение нового названия автомобиля и переход к вводу года.  Проверяет на уникальность названия.
     """
     data = await state.get_data()
-    car = await rq.get_car(data['edit_car'][0])
+    car = await rq.get_car(data['edit_car'][0], session=session)
     if isinstance(event, types.CallbackQuery):
         data['edit_car'].append(car.name)
         await state.set_state(AddCar.edit_year)
@@ -347,12 +448,12 @@ async def edit_name(event: types.Message | types.CallbackQuery, state: FSMContex
         
 @user_private.message(AddCar.edit_year, F.text.regexp(r'^\d+$'))
 @user_private.callback_query(F.data == 'next_year')
-async def edit_year(event: types.Message | types.CallbackQuery, state: FSMContext, scenes: ScenesManager):
+async def edit_year(event: types.Message | types.CallbackQuery, state: FSMContext, scenes: ScenesManager, session: AsyncSession):
     """
     Сохранение года автомобиля и возврат в профиль.  Проверяет корректность года выпуска.
     """
     data = await state.get_data()
-    car = await rq.get_car(data['edit_car'][0])
+    car = await rq.get_car(data['edit_car'][0], session=session)
     if isinstance(event, types.CallbackQuery):
         data = await state.get_data()
         data["edit_car"].append(car.year)
@@ -375,11 +476,11 @@ async def edit_year(event: types.Message | types.CallbackQuery, state: FSMContex
 
 
 @user_private.message(AddCar.name, F.text.regexp(r'^\w+$'))
-async def add_auto_name(message: types.Message, state: FSMContext):
+async def add_auto_name(message: types.Message, state: FSMContext, session: AsyncSession):
     """
     Сохранение названия автомобиля и переход к вводу года.  Проверяет на уникальность названия.
     """
-    existing_car = await rq.get_cars(message.from_user.id)
+    existing_car = await rq.get_cars(message.from_user.id, session=session)
     if not any(message.text.lower() == car.name.lower() for car in existing_car):
         await state.update_data(add_car=[message.text])
         await state.set_state(AddCar.year)
@@ -455,9 +556,9 @@ class Notes(Scene, state="notes"):
 
     @on.message.enter()
     @on.callback_query.enter()
-    async def on_enter(self, event: types.Message | types.CallbackQuery, state: FSMContext):
+    async def on_enter(self, event: types.Message | types.CallbackQuery, state: FSMContext, session: AsyncSession, page: int = 0):
         """
-        Обработчик входа в сцену заметок.  Отображает список заметок пользователя.
+        Обработчик входа в сцену заметок.  Отображает страницу заметок пользователя.
         """
         try:
             await event.bot.delete_messages(
@@ -470,8 +571,8 @@ class Notes(Scene, state="notes"):
         except:
             pass
 
-        notes = [i for i in await rq.get_notes(tg_id=event.from_user.id)]
-        await state.update_data(notes=notes)
+        result, page = await load_page(state, "notes", partial(rq.get_notes_page, event.from_user.id, session=session), page)
+        notes = result.items
 
         message_text = '\n'.join(f'{i}: {note.note_title} {note.note_date}' for i, note in enumerate(notes, start=1)) or "У вас нет заметок."
         buttons = {
@@ -479,7 +580,8 @@ class Notes(Scene, state="notes"):
             "Добавить": "add_note",
             "Показать": "show_note",
             "Поиск": "search_note",
-            "Main": "main_menu"
+            "Main": "main_menu",
+            **page_buttons("notes", page, result)
         } if notes else {
             "Добавить": "add_note",
             "Main": "main_menu"
@@ -522,7 +624,17 @@ class Notes(Scene, state="notes"):
         """
         Возврат к предыдущему состоянию.
         """
-        await self.wizard.retake()
+        data = await state.get_data()
+        await self.wizard.retake(page=data.get("notes_page", 0))
+
+    @on.callback_query(F.data.in_({"prev_notes", "next_notes"}))
+    async def turn_page(self, callback: types.CallbackQuery, state: FSMContext):
+        """
+        Переход на предыдущую или следующую страницу заметок.
+        """
+        data = await state.get_data()
+        step = 1 if callback.data == "next_notes" else -1
+        await self.wizard.retake(page=data.get("notes_page", 0) + step)
 
     @on.callback_query(F.data == "add_note")
     async def add_note(self, callback: types.CallbackQuery, state: FSMContext):
@@ -539,12 +651,11 @@ class Notes(Scene, state="notes"):
         await callback.answer()
 
     @on.callback_query(F.data == "remove_note")
-    async def remove_note(self, callback: types.CallbackQuery, state: FSMContext):
+    async def remove_note(self, callback: types.CallbackQuery, state: FSMContext, session: AsyncSession):
         """
         Начало процесса удаления заметки.  Отображает список заметок для удаления.
         """
-        data = await state.get_data()
-        notes = data["notes"]
+        notes = (await current_page(state, "notes", partial(rq.get_notes_page, callback.from_user.id, session=session))).items
         btns = {f"{i}": Remove(id=note_pk.note_id).pack() for i, note_pk in enumerate(notes, start=1)}
         await callback.message.edit_text(
             text='\n'.join(f'{i}: {note.note_title} {note.note_date}' for i, note in enumerate(notes, start=1)),
@@ -560,21 +671,21 @@ class Notes(Scene, state="notes"):
         Удаление выбранной заметки.  Удаляет заметку из списка и обновляет состояние.
         """
         try:
-            await rq.remove_note(note_id=callback_data.id)
+            await rq.remove_note(note_id=callback_data.id, tg_id=callback.from_user.id)
         except:  # Обработка потенциальной ошибки IndexError
             await callback.answer("Ошибка: заметка не найдена.")
             return
 
-        await self.wizard.retake()
+        data = await state.get_data()
+        await self.wizard.retake(page=data.get("notes_page", 0))
 
     @on.callback_query(F.data == "show_note")
-    async def show_note(self, callback: types.CallbackQuery, state: FSMContext):
+    async def show_note(self, callback: types.CallbackQuery, state: FSMContext, session: AsyncSession):
         """
         Начало процесса просмотра заметки. Отображает список заметок для просмотра.
         """
-        data = await state.get_data()
-        notes = data["notes"]
-        btns = {f"{i+1}": View(id=i).pack() for i in range(len(notes))}
+        notes = (await current_page(state, "notes", partial(rq.get_notes_page, callback.from_user.id, session=session))).items
+        btns = {f"{i}": View(id=note.note_id).pack() for i, note in enumerate(notes, start=1)}
         await callback.message.edit_text(
             text='\n'.join(f'{i}: {note.note_title} {note.note_date}' for i, note in enumerate(notes, start=1)),
             reply_markup=get_callback_btns(
@@ -584,18 +695,15 @@ class Notes(Scene, state="notes"):
         )
 
     @on.callback_query(View.filter())
-    async def _view_note(self, callback: types.CallbackQuery, callback_data: View, state: FSMContext):
+    async def _view_note(self, callback: types.CallbackQuery, callback_data: View, state: FSMContext, session: AsyncSession):
         """
         Отображение выбранной заметки.  Показывает полное содержание заметки.
         """
-        data = await state.get_data()
-        notes = data["notes"]
-        try:
-            note = notes[callback_data.id]
-            message_text = f"{note.note_title} {note.note_date}\n\n{note.note_description}"
-        except IndexError:  # Обработка потенциальной ошибки IndexError
+        note = await rq.get_note(callback.from_user.id, callback_data.id, session=session)
+        if note is None:
             await callback.answer("Ошибка: заметка не найдена.")
             return
+        message_text = f"{note.note_title} {note.note_date}\n\n{note.note_description}"
         try:
             await callback.message.edit_text(
                 text=message_text,
@@ -632,7 +740,7 @@ class Notes(Scene, state="notes"):
         pass 
 
 @user_private.message(AddNote.title, F.text)
-async def add_note_title(message: types.Message, state: FSMContext):
+async def add_note_title(message: types.Message, state: FSMContext, session: AsyncSession):
     """
     Сохранение заголовка заметки и переход к вводу описания.
     """
@@ -648,7 +756,7 @@ async def add_note_title(message: types.Message, state: FSMContext):
     except:
         pass
     
-    existing_notes = await rq.get_notes(message.from_user.id)
+    existing_notes = await rq.get_notes(message.from_user.id, session=session)
     if not any(message.text.lower() == note.note_title.lower() for note in existing_notes):
         await state.update_data(add_note=[message.text])
         await state.set_state(AddNote.description)
@@ -724,13 +832,12 @@ async def search_note_text(message: types.Message, state: FSMContext, scenes: Sc
     except:
         pass
     
-    data = await state.get_data()
-    notes: list[rq.Note] = data["notes"]
-    targeted_notes = searcher(notes, message.text, ["note_title", "note_description"])
-    message_text = ('\n'.join(f'{i}: {note.note_title} {note.note_date}' for i, note in enumerate(notes, start=1) if i-1 in targeted_notes) or
+    # Полнотекстовый поиск по всем заметкам пользователя, а не только по открытой странице
+    notes: list[rq.Note] = await search_notes(message.from_user.id, message.text)
+    message_text = ('\n'.join(f'{i}: {note.note_title} {note.note_date}' for i, note in enumerate(notes, start=1)) or
     "Ничего не найдено. Введите текст заметки снова:")
-    if targeted_notes:
-        btns = {f"{i+1}": View(id=i).pack() for i in targeted_notes}
+    if notes:
+        btns = {f"{i}": View(id=note.note_id).pack() for i, note in enumerate(notes, start=1)}
         await message.answer(
             text=message_text,
             reply_markup=get_callback_btns(
@@ -764,15 +871,75 @@ class AddPurchases(StatesGroup):
     back = State()
     search = State()
 
+# Наибольшее количество фото в одном альбоме (sendMediaGroup)
+ALBUM_SIZE = 10
+
+def purchase_caption(purchase) -> str:
+    """
+    Подпись покупки: название и дата.
+    """
+    return f'{purchase.purchase_title} {purchase.purchase_date.strftime("%d %B %Y %H:%M")}'
+
+async def send_album(message: types.Message, state: FSMContext, session: AsyncSession, tg_id: int, index: int = 0):
+    """
+    Отправляет альбом галереи покупок и сообщение с навигацией по альбомам.
+    В FSM хранятся только ID покупок галереи и ID сообщений текущего альбома.
+
+    :param message: Сообщение, в чат которого отправляется альбом.
+    :param state: FSMContext пользователя.
+    :param session: Сессия текущего обновления.
+    :param tg_id: ID пользователя в Telegram.
+    :param index: Номер альбома, начиная с 0.
+    """
+    data = await state.get_data()
+    gallery = await rq.get_purchase_gallery(tg_id, data.get("gallery", []), session=session)
+    photos = [
+        types.InputMediaPhoto(media=file_id, caption=purchase_caption(purchase))
+        for purchase, file_ids in gallery for file_id in file_ids
+    ]
+    albums = [photos[i:i + ALBUM_SIZE] for i in range(0, len(photos), ALBUM_SIZE)]
+    index = max(0, min(index, len(albums) - 1))
+
+    # Предыдущий альбом заменяется новым
+    if data.get("gallery_messages"):
+        try:
+            await message.bot.delete_messages(chat_id=message.chat.id, message_ids=data["gallery_messages"])
+        except:
+            pass
+    # sendMediaGroup принимает от 2 до 10 элементов, одно фото отправляется отдельно.
+    # Альбом отправляется в очереди массовых отправок, сообщение с навигацией - как ответ
+    sent = []
+    with low_priority():
+        if albums and len(albums[index]) == 1:
+            photo = albums[index][0]
+            sent = [await message.answer_photo(photo=photo.media, caption=photo.caption)]
+        elif albums:
+            sent = await message.answer_media_group(media=albums[index])
+
+    lines = [f"Альбом {index + 1} из {len(albums)}"] if albums else []
+    without_photos = [purchase_caption(purchase) for purchase, file_ids in gallery if not file_ids]
+    if without_photos:
+        lines.append("Без фото:\n" + "\n".join(f"{i}: {caption}" for i, caption in enumerate(without_photos, start=1)))
+    buttons = {}
+    if index:
+        buttons["⬅️"] = Album(index=index - 1).pack()
+    if index + 1 < len(albums):
+        buttons["➡️"] = Album(index=index + 1).pack()
+    buttons["⬅️ Назад"] = "back_purchase"
+
+    await message.answer(text="\n\n".join(lines) or "Покупки не найдены.", reply_markup=get_callback_btns(btns=buttons))
+    await state.update_data(gallery_messages=[m.message_id for m in sent])
+
 class Purchase(Scene, state='purchase'):
     """
     Сцена управления покупками пользователя.
     """
     @on.message.enter()
     @on.callback_query.enter()
-    async def on_enter(self, event: types.Message | types.CallbackQuery, state: FSMContext):
+    async def on_enter(self, event: types.Message | types.CallbackQuery, state: FSMContext, session: AsyncSession, page: int = 0, gallery: list[int] | None = None):
         """
-        Обработчик входа в сцену покупок. Отображает список покупок пользователя.
+        Обработчик входа в сцену покупок. Отображает страницу покупок пользователя
+        или, если передан список ID покупок gallery, их галерею.
         """
         try:
             await event.bot.delete_messages(
@@ -785,7 +952,14 @@ class Purchase(Scene, state='purchase'):
         except:
             pass
 
-        purchases = [i for i in await rq.get_purchases(tg_id=event.from_user.id)]
+        if gallery is not None:
+            await state.update_data(gallery=gallery, gallery_messages=[])
+            message = event if isinstance(event, types.Message) else event.message
+            await send_album(message, state, session, event.from_user.id)
+            return
+
+        result, page = await load_page(state, "purchases", partial(rq.get_purchases_page, event.from_user.id, session=session), page)
+        purchases = result.items
 
         message_text = "\n".join(f"{i}: {purchase.purchase_title} {purchase.purchase_date.strftime('%d %B %Y %H:%M')}" 
                                  for i, purchase in enumerate(purchases, start=1)) or "У вас нет покупок."
@@ -795,7 +969,8 @@ class Purchase(Scene, state='purchase'):
             "Добавить покупку": "add_purchase",
             "Просмотр всех покупок": "view_purchase",
             "Поиск покупок": "search_purchase",
-            "В меню": "main_menu"
+            "В меню": "main_menu",
+            **page_buttons("purchases", page, result)
         } if purchases else {
             "Добавить покупку": "add_purchase",
             "В меню": "main_menu"
@@ -837,9 +1012,25 @@ class Purchase(Scene, state='purchase'):
     @on.callback_query(F.data == 'back_purchase')
     async def goto_back(self, callback: types.CallbackQuery, state: FSMContext):
         """
-        Возврат к предыдущему состоянию.
+        Возврат к предыдущему состоянию. Удаляет открытый альбом галереи.
         """
-        await self.wizard.retake()
+        data = await state.get_data()
+        if data.get("gallery_messages"):
+            try:
+                await callback.bot.delete_messages(chat_id=callback.from_user.id, message_ids=data["gallery_messages"])
+            except:
+                pass
+        await state.update_data(gallery=[], gallery_messages=[])
+        await self.wizard.retake(page=data.get("purchases_page", 0))
+
+    @on.callback_query(F.data.in_({"prev_purchases", "next_purchases"}))
+    async def turn_page(self, callback: types.CallbackQuery, state: FSMContext):
+        """
+        Переход на предыдущую или следующую страницу покупок.
+        """
+        data = await state.get_data()
+        step = 1 if callback.data == "next_purchases" else -1
+        await self.wizard.retake(page=data.get("purchases_page", 0) + step)
 
     @on.callback_query(F.data == 'add_purchase')
     async def add_purchase(self, callback: types.CallbackQuery, state: FSMContext):
@@ -856,11 +1047,11 @@ class Purchase(Scene, state='purchase'):
         await callback.answer()
 
     @on.callback_query(F.data == 'remove_purchase')
-    async def remove_purchase(self, callback: types.CallbackQuery, state: FSMContext):
+    async def remove_purchase(self, callback: types.CallbackQuery, state: FSMContext, session: AsyncSession):
         """
         Начало процесса удаления покупки.  Отображает список покупок для удаления.
         """
-        purchases = [i for i in await rq.get_purchases(tg_id=callback.from_user.id)]
+        purchases = (await current_page(state, "purchases", partial(rq.get_purchases_page, callback.from_user.id, session=session))).items
         message_text = '\n'.join(f'{i}: {purchase.purchase_title} {purchase.purchase_date}' for i, purchase in enumerate(purchases, start=1))
         buttons = {f'{i}': Remove(id=purchase.purchase_id).pack() for i, purchase in enumerate(purchases, start=1)}
         await callback.message.edit_text(
@@ -875,40 +1066,35 @@ class Purchase(Scene, state='purchase'):
         """
         Удаление выбранной покупки.  Удаляет покупку из базы данных и обновляет список.
         """
-        await rq.remove_purchase(purchase_id=callback_data.id)
-        await self.wizard.retake()
+        await rq.remove_purchase(purchase_id=callback_data.id, tg_id=callback.from_user.id)
+        data = await state.get_data()
+        await self.wizard.retake(page=data.get("purchases_page", 0))
 
     @on.callback_query(F.data == 'view_purchase')
-    async def view_purchases(self, callback: types.CallbackQuery, state: FSMContext):
+    async def view_purchases(self, callback: types.CallbackQuery, state: FSMContext, session: AsyncSession):
         """
-        Просмотр всех покупок с фото и датой.
+        Просмотр покупок текущей страницы: фото альбомами до 10 штук с подписями.
         """
         try:
-            await callback.bot.delete_messages(
-                chat_id=callback.from_user.id,
-                message_ids=[
-                    callback.message.message_id - 1,
-                    callback.message.message_id
-                    ]
-            )
+            await callback.message.delete()
         except:
             pass
-        purchases = [i for i in await rq.get_purchases(callback.from_user.id)]
-        title_dicts = {purchase.purchase_id: f'{purchase.purchase_title} {purchase.purchase_date.strftime("%d %B %Y %H:%M")}' for purchase in purchases}
-        photo_dicts = {purchase.purchase_id: json.loads(purchase.purchase_photo) for purchase in purchases if purchase.purchase_photo}
+        purchases = (await current_page(state, "purchases", partial(rq.get_purchases_page, callback.from_user.id, session=session))).items
+        await state.update_data(gallery=[purchase.purchase_id for purchase in purchases], gallery_messages=[])
+        await send_album(callback.message, state, session, callback.from_user.id)
+        await callback.answer()
 
-        for k, v in title_dicts.items():
-            if k not in photo_dicts:
-                await callback.message.answer(text=v)
-            else:
-                if isinstance(photo_dicts[k], list):
-                    photos = [PhotoSize(**photo) for photo in photo_dicts[k]]  
-                    for photo in photos:
-                        await callback.message.answer_photo(photo.file_id, caption=v)
-                else:
-                    photo = PhotoSize(**photo_dicts[k])
-                    await callback.message.answer_photo(photo.file_id, caption=v)
-        await self.wizard.retake()
+    @on.callback_query(Album.filter())
+    async def turn_album(self, callback: types.CallbackQuery, callback_data: Album, state: FSMContext, session: AsyncSession):
+        """
+        Переход к другому альбому галереи покупок.
+        """
+        try:
+            await callback.message.delete()
+        except:
+            pass
+        await send_album(callback.message, state, session, callback.from_user.id, callback_data.index)
+        await callback.answer()
 
     @on.callback_query(F.data == 'search_purchase')
     async def search_purchases(self, callback: types.CallbackQuery, state: FSMContext):
@@ -944,7 +1130,7 @@ async def back_purchases(callback: types.CallbackQuery, scenes: ScenesManager, s
     await scenes.enter(Purchase)
 
 @user_private.message(AddPurchases.search, F.text)
-async def search_purchase(message: types.Message, state: FSMContext, scenes: ScenesManager):
+async def search_purchase(message: types.Message, state: FSMContext, scenes: ScenesManager, session: AsyncSession):
     """
     Поиск покупок по названию.  Отображает найденные покупки.
     """
@@ -958,30 +1144,17 @@ async def search_purchase(message: types.Message, state: FSMContext, scenes: Sce
         )
     except:
         pass
-    purchases = [i for i in await rq.get_purchases(message.from_user.id)]
-    purchases_filter = [i for i in purchases if re.search(message.text.lower(), i.purchase_title.lower())]
-    title_dicts = {purchase.purchase_id: f'{purchase.purchase_title} {purchase.purchase_date.strftime("%d %B %Y %H:%M")}' for purchase in purchases_filter}
-    photo_dicts = {purchase.purchase_id: json.loads(purchase.purchase_photo) for purchase in purchases_filter if purchase.purchase_photo}
-
-    if title_dicts:
-        for k, v in title_dicts.items():
-            if k not in photo_dicts:
-                await message.answer(text=v)
-            else:
-                if isinstance(photo_dicts[k], list):
-                    photos = [PhotoSize(**photo) for photo in photo_dicts[k]]  
-                    for photo in photos:
-                        await message.answer_photo(photo.file_id, caption=v)
-                else:
-                    photo = PhotoSize(**photo_dicts[k])
-                    await message.answer_photo(photo.file_id, caption=v)
-        await scenes.enter(Purchase)
+    purchases_filter = await search_purchases(message.from_user.id, message.text)
+
+    if purchases_filter:
+        # Найденные покупки показываются галереей в сцене покупок
+        await scenes.enter(Purchase, gallery=[purchase.purchase_id for purchase in purchases_filter])
     else:
         await message.answer("Такого товара нет среди покупок.\nВведите снова или нажмите кнопку назад.",
                                  reply_markup=get_callback_btns(btns={"⬅️ Назад": "back_purchase"}))
 
 @user_private.message(AddPurchases.title, F.text)
-async def add_title(message: types.Message, state: FSMContext):
+async def add_title(message: types.Message, state: FSMContext, session: AsyncSession):
     """
     Добавление названия покупки. Переходит в состояние AddPurchases.photo.  Проверяет на уникальность названия.
     """
@@ -995,7 +1168,7 @@ async def add_title(message: types.Message, state: FSMContext):
         )
     except:
         pass    
-    title_list = [i.purchase_title for i in await rq.get_purchases(tg_id=message.from_user.id)]
+    title_list = [i.purchase_title for i in await rq.get_purchases(tg_id=message.from_user.id, session=session)]
     if not any(message.text.lower() == title.lower() for title in title_list):
         await state.update_data(add_purchase=[message.text])
         await state.set_state(AddPurchases.photo)
@@ -1034,12 +1207,11 @@ async def add_photo(event: types.Message | types.CallbackQuery, state: FSMContex
             purchase_title=data.get('add_purchase')[0])
         await scenes.enter(Purchase)
     else:
-        data['add_purchase'].append(event.photo[-1])
         await rq.set_purchase(
             purchase_date=datetime.now(local_tz),
             tg_id=event.from_user.id, 
             purchase_title=data.get('add_purchase')[0],
-            purchase_photo=json.dumps(deserialize_telegram_object_to_python(data.get('add_purchase')[1])))
+            purchase_photos=[event.photo[-1]])
         try:
             await event.bot.delete_messages(
                 chat_id=event.from_user.id,
@@ -1089,42 +1261,28 @@ async def incorerct_search_purchase(message: types.Message, state: FSMContext, s
 #=========Analisis=========
 
 # Вспомогательная функция для генерации аналитичекского графика
-async def generate_analytics_graph(analytics_data, start_date, end_date):
+async def generate_analytics_graph(report: AnalyticsReport, start_date, end_date):
     """
-    Генерирует аналитический график на основе предоставленных данных.
+    Генерирует аналитический график на основе агрегированных данных.
 
     Args:
-        analytics_data: Список объектов аналитики.
+        report: Агрегаты аналитики за период.
         start_date: Дата начала периода.
         end_date: Дата окончания периода.
 
     Returns:
         aiogram.types.BufferedInputFile: График в виде файла, или None, если данных нет.
     """
-    filtered_data = [
-        analytic
-        for analytic in analytics_data
-        if start_date <= analytic.analytics_date.date() <= end_date
-    ]
-    if not filtered_data:
+    if not report.daily:
         return None
 
-    # Sort data by date
-    filtered_data.sort(key=lambda x: x.analytics_date)
-
-    # Create a dictionary to store daily spending
-    daily_spending = defaultdict(float)
-    for analytic in filtered_data:
-        date = analytic.analytics_date.date()
-        daily_spending[date] += analytic.analytics_price
-
     # Generate a list of all dates in the range
     all_dates = [start_date + timedelta(days=x) for x in range((end_date - start_date).days + 1)]
 
     # Prepare data for plotting
     dates = all_dates
-    prices = [daily_spending[date] for date in all_dates]
-    cumulative_spending = [sum(prices[:i+1]) for i in range(len(prices))]
+    prices = [report.daily.get(date, 0.0) for date in all_dates]
+    cumulative_spending = list(accumulate(prices))
 
     # Create a figure with two subplots
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
@@ -1158,38 +1316,30 @@ async def generate_analytics_graph(analytics_data, start_date, end_date):
     return types.BufferedInputFile(buf.read(), filename="report.png")
 
 # Improved function for generating analytics report
-async def generate_analytics_report(analytics_data, start_date, end_date):
+async def generate_analytics_report(tg_id, start_date, end_date):
     """
-    Генерирует аналитический отчет на основе предоставленных данных.
+    Генерирует аналитический отчет пользователя за период.
+    Агрегация выполняется в базе данных.
 
     Args:
-        analytics_data: Список объектов аналитики.
+        tg_id: ID пользователя в Telegram.
         start_date: Дата начала периода.
         end_date: Дата окончания периода.
 
     Returns:
         Tuple[str, aiogram.types.BufferedInputFile | None]: Текст отчета и график (или None, если данных нет).
     """
-    report_graph = await generate_analytics_graph(analytics_data, start_date, end_date)
+    report = await get_analytics_report(tg_id, start_date, end_date)
 
-    filtered_data = [
-        analytic
-        for analytic in analytics_data
-        if start_date <= analytic.analytics_date.date() <= end_date
-    ]
-    
-    if not filtered_data:
+    if not report.daily:
         return "Нет данных за выбранный период.", None
 
-    total_spent = sum(analytic.analytics_price for analytic in filtered_data)
-    
-    # Group expenses by category
-    categories = defaultdict(float)
-    for analytic in filtered_data:
-        categories[analytic.analytics_title] += analytic.analytics_price
+    report_graph = await generate_analytics_graph(report, start_date, end_date)
+
+    total_spent = report.total
     
     # Find the day with the highest spending
-    max_spending_day = max(filtered_data, key=lambda x: x.analytics_price, default=None) # added default=None to handle empty filtered_data
+    max_spending_day = report.max_day
     
     # Calculate average daily spending
     days_count = (end_date - start_date).days + 1
@@ -1201,18 +1351,17 @@ async def generate_analytics_report(analytics_data, start_date, end_date):
     report_text += f"Средние траты в день: {avg_daily_spending:.2f}\n"
 
     if max_spending_day: # Check if max_spending_day is not None
-        report_text += f"День с самыми большими тратами: {max_spending_day.analytics_date.date()} - {max_spending_day.analytics_price:.2f}\n\n"
+        report_text += f"День с самыми большими тратами: {max_spending_day[0]} - {max_spending_day[1]:.2f}\n\n"
     else:
         report_text += "День с самыми большими тратами: Нет данных.\n\n"
 
     report_text += "Траты по категориям:\n"
-    for category, amount in sorted(categories.items(), key=lambda x: x[1], reverse=True):
-        percentage = (amount / total_spent) * 100
+    for category, amount in report.categories:
+        percentage = (amount / total_spent) * 100 if total_spent else 0.0
         report_text += f"- {category}: {amount:.2f} ({percentage:.1f}%)\n"
     
     report_text += "\nПоследние транзакции:\n"
-    recent_transactions = sorted(filtered_data, key=lambda x: x.analytics_date, reverse=True)[:5]
-    for analytic in recent_transactions:
+    for analytic in report.recent:
         report_text += f"- {analytic.analytics_date.date()}: {analytic.analytics_title} - {analytic.analytics_price:.2f}\n"
         if analytic.analytics_description:
             report_text += f"  Описание: {analytic.analytics_description}\n"
@@ -1231,10 +1380,7 @@ async def generate_and_send_report(event: types.Message | types.CallbackQuery, s
         start_date: Дата начала периода.
         end_date: Дата окончания периода.
     """
-    data = await state.get_data()
-    analytics_data = data.get("adata", [])
-
-    report_text, report_file = await generate_analytics_report(analytics_data, start_date, end_date)
+    report_text, report_file = await generate_analytics_report(event.from_user.id, start_date, end_date)
 
     if isinstance(event, types.Message):
         if report_file:
@@ -1275,26 +1421,27 @@ class Analisis(Scene, state="analysis"):
     
     @on.callback_query.enter()
     @on.message.enter()
-    async def on_enter(self, event: types.Message | types.CallbackQuery, state: FSMContext):
+    async def on_enter(self, event: types.Message | types.CallbackQuery, state: FSMContext, session: AsyncSession, page: int = 0):
         """
-        Обработчик входа в сцену аналитики. Отображает общую информацию и список данных аналитики.
+        Обработчик входа в сцену аналитики. Отображает общую информацию и страницу данных аналитики.
         """
         try:
             # Пытаемся удалить предыдущее сообщение
             await event.message.delete()
         except:
             pass
-        analitics = [*(analitic for analitic in await rq.get_analytics(tg_id=event.from_user.id))]
-        await state.update_data(adata=analitics)
+        result, page = await load_page(state, "adata", partial(rq.get_analytics_page, event.from_user.id, session=session), page)
+        analitics = result.items
         
-        spended_money = sum(analitic.analytics_price for analitic in analitics)
+        spended_money = await rq.get_analytics_sum(tg_id=event.from_user.id, session=session)
 
         message_text = f"Вы всего потратили: {round(spended_money, 2)}\n" + "\n".join(f"{i}: {analitic.analytics_title} {analitic.analytics_price} {analitic.analytics_date.strftime('%d %B %Y %H:%M')}" for i, analitic in enumerate(analitics, start=1)) or "У вас нету данных для аналитики."
         buttons = {
             "Удалить": "remove_adata",
             "Добавить": "add_adata",
             "Показать": "show_adata",
-            "В меню": "main_menu"
+            "В меню": "main_menu",
+            **page_buttons("adata", page, result)
         } if analitics else {
             "Добавить": "add_adata",
             "В меню": "main_menu"
@@ -1326,7 +1473,17 @@ class Analisis(Scene, state="analysis"):
         """
         Возврат к предыдущему состоянию.
         """
-        await self.wizard.retake()
+        data = await state.get_data()
+        await self.wizard.retake(page=data.get("adata_page", 0))
+
+    @on.callback_query(F.data.in_({"prev_adata", "next_adata"}))
+    async def turn_page(self, callback: types.CallbackQuery, state: FSMContext):
+        """
+        Переход на предыдущую или следующую страницу данных аналитики.
+        """
+        data = await state.get_data()
+        step = 1 if callback.data == "next_adata" else -1
+        await self.wizard.retake(page=data.get("adata_page", 0) + step)
         
     @on.callback_query(F.data == "add_adata")
     async def add_adata(self, callback: types.CallbackQuery, state: FSMContext):
@@ -1343,12 +1500,11 @@ class Analisis(Scene, state="analysis"):
         await callback.answer()
     
     @on.callback_query(F.data == "remove_adata")
-    async def remove_adata(self, callback: types.CallbackQuery, state: FSMContext):
+    async def remove_adata(self, callback: types.CallbackQuery, state: FSMContext, session: AsyncSession):
         """
         Начало процесса удаления данных аналитики. Отображает список данных для удаления.
         """
-        data = await state.get_data()
-        adata = data["adata"]
+        adata = (await current_page(state, "adata", partial(rq.get_analytics_page, callback.from_user.id, session=session))).items
         btns = {f"{i}": Remove(id=adata_pk.analytics_id).pack() for i, adata_pk in enumerate(adata, start=1)}
         await callback.message.edit_text(
             text="\n".join(f"{i}: {analitic.analytics_title} {analitic.analytics_price} {analitic.analytics_date.strftime('%d %B %Y %H:%M')}" for i, analitic in enumerate(adata, start=1)),
@@ -1363,17 +1519,17 @@ class Analisis(Scene, state="analysis"):
         """
         Удаление выбранных данных аналитики. Удаляет данные из базы данных и обновляет список.
         """
-        await rq.remove_analytics(analytics_id=callback_data.id)
-        await self.wizard.retake()
+        await rq.remove_analytics(analytics_id=callback_data.id, tg_id=callback.from_user.id)
+        data = await state.get_data()
+        await self.wizard.retake(page=data.get("adata_page", 0))
     
     @on.callback_query(F.data == "show_adata")
-    async def show_adata(self, callback: types.CallbackQuery, state: FSMContext):
+    async def show_adata(self, callback: types.CallbackQuery, state: FSMContext, session: AsyncSession):
         """
         Начало процесса просмотра данных аналитики.  Отображает список данных для просмотра.
         """
-        data = await state.get_data()
-        adata = data["adata"]
-        btns = {f"{i+1}": View(id=i).pack() for i in range(len(adata))}
+        adata = (await current_page(state, "adata", partial(rq.get_analytics_page, callback.from_user.id, session=session))).items
+        btns = {f"{i}": View(id=analitic.analytics_id).pack() for i, analitic in enumerate(adata, start=1)}
         await callback.message.edit_text(
             text="\n".join(f"{i}: {analitic.analytics_title} {analitic.analytics_price} {analitic.analytics_date.strftime('%d %B %Y %H:%M')}" for i, analitic in enumerate(adata, start=1)),
             reply_markup=get_callback_btns(
@@ -1383,12 +1539,14 @@ class Analisis(Scene, state="analysis"):
         )
 
     @on.callback_query(View.filter())
-    async def _view_adata(self, callback: types.CallbackQuery, callback_data: View, state: FSMContext):
+    async def _view_adata(self, callback: types.CallbackQuery, callback_data: View, state: FSMContext, session: AsyncSession):
         """
         Отображение выбранных данных аналитики.  Показывает полное описание данных.
         """
-        data = await state.get_data()
-        adata = data["adata"][callback_data.id]
+        adata = await rq.get_analytics_entry(callback.from_user.id, callback_data.id, session=session)
+        if adata is None:
+            await callback.answer("Ошибка: данные не найдены.")
+            return
         try:
             await callback.message.edit_text(
                 text=adata.analytics_description,
@@ -1477,8 +1635,7 @@ async def process_end_date(message: types.Message, state: FSMContext, scenes: Sc
         start_date = data["start_date"]
         
         if start_date <= end_date:
-            analytics_data = data.get("adata", []) # добавлено .get для избежания keyError
-            report_text, report_file = await generate_analytics_report(analytics_data, start_date, end_date)
+            report_text, report_file = await generate_analytics_report(message.from_user.id, start_date, end_date)
 
             if report_file:
                     await message.answer_photo(photo=report_file, caption=report_text)
@@ -1495,12 +1652,12 @@ async def process_end_date(message: types.Message, state: FSMContext, scenes: Sc
 
 
 @user_private.message(AddAData.title, F.text)
-async def add_adata_title(message: types.Message, state: FSMContext):
+async def add_adata_title(message: types.Message, state: FSMContext, session: AsyncSession):
     """
     Добавление заголовка данных аналитики. Переходит в состояние AddAData.price.
     Проверяет на уникальность заголовка.
     """
-    existing_anaitics = await rq.get_analytics(tg_id=message.from_user.id)
+    existing_anaitics = await rq.get_analytics(tg_id=message.from_user.id, session=session)
         
     if not any(analitic.analytics_title.lower() == message.text.lower() for analitic in existing_anaitics):
         await state.update_data(add_adata=[message.text])
@@ -1630,7 +1787,7 @@ class Reminders(Scene, state="reminder"):
     """
     @on.message.enter()
     @on.callback_query.enter()
-    async def on_enter(self, event: types.Message | types.CallbackQuery, state: FSMContext):
+    async def on_enter(self, event: types.Message | types.CallbackQuery, state: FSMContext, session: AsyncSession):
         """
         Обработчик входа в сцену напоминаний.  Отображает список автомобилей для выбора.
         """
@@ -1639,10 +1796,16 @@ class Reminders(Scene, state="reminder"):
         except:
             pass
 
-        cars = await rq.get_cars(tg_id=event.from_user.id)
+        # Автомобили вместе с количеством задач и ближайшей датой - одним запросом
+        cars = await rq.get_cars_with_reminders(tg_id=event.from_user.id, session=session)
 
         message_text = "Добро пожаловать в раздел напоминаний.\nВыберите автомобиль, что бы перейти к задачам."
-        buttons = {f'{car.name}': View(id=car.car_id).pack() for car in cars}
+        buttons = {
+            (f'{item.car.name} ({item.pending}, след. {item.next_date.strftime("%d.%m.%Y")})' if item.next_date
+             else f'{item.car.name} ({item.pending})' if item.pending
+             else f'{item.car.name}'): View(id=item.car.car_id).pack()
+            for item in cars
+        }
 
         if isinstance(event, types.Message):
             await event.answer(text=message_text, reply_markup=get_callback_btns(btns={**buttons, **{'В меню': 'main_menu'}}))
@@ -1658,14 +1821,16 @@ class Reminders(Scene, state="reminder"):
         await self.wizard.goto(Menu)
 
     @on.callback_query(View.filter())
-    async def car_reminders(self, callback: types.CallbackQuery, callback_data: View, state: FSMContext):
+    async def car_reminders(self, callback: types.CallbackQuery, callback_data: View, state: FSMContext, session: AsyncSession):
         """
         Отображает напоминания для выбранного автомобиля.
         """
-        reminders = await rq.get_reminders(car_id=callback_data.id)
+        # Количество задач берется из сводки, сами напоминания не загружаются
+        cars = await rq.get_cars_with_reminders(tg_id=callback.from_user.id, session=session)
+        pending = next((item.pending for item in cars if item.car.car_id == callback_data.id), 0)
         await state.update_data(car_id=callback_data.id)
-        is_reminders = [reminder.reminder_title for reminder in reminders]
-        reminder_text = f'У вас запланированно {len(is_reminders)} задач.' if is_reminders else 'У вас нет запланированных задач.'
+        is_reminders = pending > 0
+        reminder_text = f'У вас запланированно {pending} задач.' if is_reminders else 'У вас нет запланированных задач.'
         buttons = {
             **{
                 'Добавить': 'add_reminder',
@@ -1708,12 +1873,12 @@ class Reminders(Scene, state="reminder"):
         await callback.message.answer(text='Введите название задачи.')
 
     @on.callback_query(F.data == 'view_reminder')
-    async def view_reminders(self, callback: types.CallbackQuery, state: FSMContext):
+    async def view_reminders(self, callback: types.CallbackQuery, state: FSMContext, session: AsyncSession):
         """
         Просмотр всех напоминаний для выбранного автомобиля.
         """
         data = await state.get_data()
-        reminders = await rq.get_reminders(data['car_id'])
+        reminders = await rq.get_reminders(data['car_id'], session=session)
         message_text = '\n'.join(f'{i}. {reminder.reminder_title}\n'
                                  f'напомнить: {reminder.reminder_date.strftime("%d %B %Y %H:%M")}\n'
                                  f'описание: {reminder.reminder_description}\n\n' for i, reminder in enumerate(reminders, start=1))
@@ -1725,12 +1890,12 @@ class Reminders(Scene, state="reminder"):
         )
 
     @on.callback_query(F.data == 'remove_reminder')
-    async def remove_reminder(self, callback: types.CallbackQuery, state: FSMContext):
+    async def remove_reminder(self, callback: types.CallbackQuery, state: FSMContext, session: AsyncSession):
         """
         Начало процесса удаления напоминания. Отображает список напоминаний для удаления.
         """
         data = await state.get_data()
-        reminders = [i for i in await rq.get_reminders(car_id=data['car_id'])]
+        reminders = [i for i in await rq.get_reminders(car_id=data['car_id'], session=session)]
         message_text = '\n'.join(f'{i}. {reminder.reminder_title}' for i, reminder in enumerate(reminders, start=1))
         buttons = {f'{i}': Remove(id=reminder.reminder_id).pack() for i, reminder in enumerate(reminders, start=1)}
 
@@ -1745,7 +1910,8 @@ class Reminders(Scene, state="reminder"):
         """
         Удаление выбранного напоминания.  Удаляет напоминание из базы данных и обновляет список.
         """
-        await rq.remove_reminder(reminder_id=callback_data.id)
+        data = await state.get_data()
+        await rq.remove_reminder(reminder_id=callback_data.id, car_id=data['car_id'], tg_id=callback.from_user.id)
         await callback.answer(text='Данные задачи успешно удалены.')
         await self.wizard.retake()
 
@@ -1795,9 +1961,10 @@ async def add_reminder_description(message: types.Message, state: FSMContext):
         F.text.func(lambda text: re.findall(r'(\d+){4}-(\d+){2}-(\d+){2} (\d+){2}:(\d+){2}', text) # fixed regex for date format
                     and datetime.strptime(text, '%Y-%m-%d %H:%M')
                     .replace(tzinfo=local_tz) > datetime.now(local_tz)))
-async def add_reminder_date(message: types.Message, state: FSMContext, scenes: ScenesManager, apscheduler: AsyncIOScheduler, bot: Bot):
+async def add_reminder_date(message: types.Message, state: FSMContext, scenes: ScenesManager):
     """
-    Добавление даты и времени напоминания.  Сохраняет напоминание в базе данных и добавляет задачу в планировщик.
+    Добавление даты и времени напоминания.  Сохраняет напоминание в базе данных;
+    в назначенное время его отправит рассылка deliver_reminders.
     """
     date_reminder = datetime.strptime(message.text, '%Y-%m-%d %H:%M').replace(tzinfo=local_tz)
     await state.update_data(add_date=date_reminder)
@@ -1810,24 +1977,12 @@ async def add_reminder_date(message: types.Message, state: FSMContext, scenes: S
     )
     except:
         pass
+    # Имя для приветствия в напоминании, если пользователь не проходил через меню в этом процессе
+    await rq.set_user(tg_id=message.from_user.id, fullname=message.from_user.full_name)
     await rq.set_reminder(reminder_title=data['add_title'],
                           reminder_description=data['add_description'],
                           reminder_date=data['add_date'],
                           car_id=data['car_id'])
-    
-    # Добавляем задачу в планировщик
-    data_id = json.dumps(deserialize_telegram_object_to_python(data))
-    job = apscheduler.add_job(
-        send_message_scheduler,
-        trigger=DateTrigger(run_date=data['add_date']),
-        kwargs={
-            'bot_token': bot.token,
-            'chat_id': message.chat.id,
-            'fullname': message.from_user.full_name,
-            'data': data_id
-        },
-        id=f"reminder_{message.from_user.id}_{data['add_title']}"
-    )
     await scenes.enter(Reminders)
 
 @user_private.message(AddReminders.title)
@@ -1876,4 +2031,4 @@ async def incorrect_date(message: types.Message, state: FSMContext):
     await message.answer(text='Введите корректную дату и время.')
 
 
-#=========Reminders=========
\ No newline at end of file
+#=========Reminders=========
@@ -13,6 +13,9 @@ class View(CallbackData, prefix="view"):
 class Period(CallbackData, prefix="period"):
     period: int | str
 
+class Album(CallbackData, prefix="album"):
+    index: int
+
 def get_callback_btns(
     *,
     btns: dict[str, str] | dict,
@@ -0,0 +1,46 @@
+from typing import Callable, Any, Dict, Awaitable
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from aiogram.types import TelegramObject
+from aiogram import BaseMiddleware
+
+
+class DatabaseMiddleware(BaseMiddleware):
+    """
+    Middleware сессии чтения: открывает одну сессию базы данных на обновление
+    и добавляет её в данные, доступные для обработчиков.
+
+    Сессия работает с соединениями только для чтения (query_only), поэтому
+    фиксировать в ней нечего: записи идут через очередь записи. Соединение
+    берется из пула на время каждого запроса и сразу возвращается (см.
+    requests._reading), поэтому обновление не держит его во время вызовов Bot API.
+    """
+
+    def __init__(self, session_pool: async_sessionmaker) -> None:
+        """
+        Инициализация middleware с фабрикой сессий.
+
+        :param session_pool: Фабрика асинхронных сессий SQLAlchemy.
+        """
+        self.session_pool = session_pool
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """
+        Метод, вызываемый при каждом событии бота.
+        Передает сессию обработчику и закрывает её после обработки обновления.
+
+        :param handler: Функция обработчика, которую необходимо вызвать.
+        :param event: Объект события Telegram (например, Message).
+        :param data: Словарь данных, передаваемых обработчику.
+        :return: Результат выполнения обработчика.
+        """
+        async with self.session_pool() as session:
+            # Добавление сессии в словарь данных
+            data["session"] = session
+            return await handler(event, data)
@@ -0,0 +1,39 @@
+from typing import Callable, Any, Dict, Awaitable
+
+from aiogram.types import TelegramObject
+from aiogram import BaseMiddleware
+
+from bumblebeereminderbot.database.profiling import QueryStats, current_stats, record
+
+
+class QueryStatsMiddleware(BaseMiddleware):
+    """
+    Middleware для учета SQL-запросов, выполненных обработчиком.
+    Добавляет статистику запросов в данные, доступные для обработчиков,
+    и после обработки добавляет её в отчет по обработчикам.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """
+        Метод, вызываемый при каждом событии бота.
+
+        :param handler: Функция обработчика, которую необходимо вызвать.
+        :param event: Объект события Telegram (например, Message).
+        :param data: Словарь данных, передаваемых обработчику.
+        :return: Результат выполнения обработчика.
+        """
+        stats = QueryStats()
+        data["query_stats"] = stats
+        token = current_stats.set(stats)
+        try:
+            return await handler(event, data)
+        finally:
+            current_stats.reset(token)
+            # Имя обработчика, например Profile.view_cars
+            callback = data["handler"].callback
+            record(getattr(callback, "__qualname__", repr(callback)), stats)
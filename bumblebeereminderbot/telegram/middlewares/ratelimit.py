@@ -0,0 +1,217 @@
+"""
+Ограничение частоты исходящих сообщений.
+
+Telegram допускает около 30 сообщений в секунду от бота и около одного
+сообщения в секунду в один чат; при превышении он отвечает ошибкой
+TelegramRetryAfter. Middleware сессии бота пропускает методы отправки
+через общий OutboundLimiter с корзинами токенов (token bucket) на весь
+бот и на каждый чат, а после TelegramRetryAfter приостанавливает чат и
+повторяет запрос.
+
+Отправки идут в одной из двух очередей: HIGH для ответов пользователю и
+LOW для напоминаний и массовых рассылок. Запросы из LOW оставляют в общей
+корзине по токену на каждый ожидающий запрос из HIGH.
+"""
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from time import monotonic
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from bumblebeereminderbot.config import (
+    RATE_LIMIT_GLOBAL,
+    RATE_LIMIT_PER_CHAT,
+    RATE_LIMIT_CHAT_BURST,
+    RATE_LIMIT_RETRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Очереди отправки
+HIGH = "high"
+LOW = "low"
+# Методы, на которые распространяются ограничения Telegram
+LIMITED_PREFIXES = ("send", "copy", "forward")
+# Количество корзин чатов, после которого неиспользуемые корзины удаляются
+CHAT_BUCKETS_MAXSIZE = 10_000
+
+# Очередь отправок текущей задачи; по умолчанию - ответы пользователю
+current_lane: ContextVar[str] = ContextVar("current_lane", default=HIGH)
+
+
+@contextmanager
+def low_priority():
+    """
+    Отправляет сообщения внутри блока в очереди LOW.
+    """
+    token = current_lane.set(LOW)
+    try:
+        yield
+    finally:
+        current_lane.reset(token)
+
+
+class TokenBucket:
+    """
+    Корзина токенов: rate токенов в секунду, не больше capacity накопленных.
+    """
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = monotonic()
+        # Время, до которого отправка запрещена после TelegramRetryAfter
+        self.blocked_until = 0.0
+
+    def delay(self, now: float, need: float = 1) -> float:
+        """
+        Возвращает, сколько секунд осталось ждать need токенов (0 - токены есть).
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return max(self.blocked_until - now, (need - self.tokens) / self.rate, 0.0)
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def idle(self, now: float) -> bool:
+        """Полная незаблокированная корзина ничем не отличается от новой."""
+        return self.delay(now) == 0 and self.tokens >= self.capacity
+
+
+@dataclass
+class LaneStats:
+    """
+    Статистика очереди отправок.
+    """
+    # Ожидающих отправок сейчас
+    waiting: int = 0
+    # Наибольшее количество ожидающих отправок
+    max_waiting: int = 0
+    # Количество отправок
+    sent: int = 0
+    # Суммарное время ожидания, в секундах
+    wait_time: float = 0.0
+
+
+class OutboundLimiter:
+    """
+    Общий планировщик исходящих сообщений с корзинами токенов на бот и на чат.
+    """
+
+    def __init__(
+        self,
+        rate: float = RATE_LIMIT_GLOBAL,
+        chat_rate: float = RATE_LIMIT_PER_CHAT,
+        chat_burst: float = RATE_LIMIT_CHAT_BURST
+    ):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.bucket = TokenBucket(rate, rate)
+        self.chats: dict[int | str, TokenBucket] = {}
+        self.lanes = {HIGH: LaneStats(), LOW: LaneStats()}
+        self.retries = 0
+
+    async def acquire(self, chat_id: int | str, lane: str = HIGH) -> None:
+        """
+        Ожидает, пока отправка в чат chat_id будет разрешена общим ограничением и ограничением чата.
+
+        :param chat_id: Идентификатор чата
+        :param lane: Очередь отправки (HIGH или LOW)
+        """
+        stats = self.lanes[lane]
+        stats.waiting += 1
+        stats.max_waiting = max(stats.max_waiting, stats.waiting)
+        started = monotonic()
+        try:
+            chat = self._chat_bucket(chat_id)
+            while True:
+                now = monotonic()
+                # Токены для ожидающих ответов пользователям LOW не забирает
+                reserve = min(self.lanes[HIGH].waiting, self.bucket.capacity - 1) if lane == LOW else 0
+                delay = max(self.bucket.delay(now, 1 + reserve), chat.delay(now))
+                if delay <= 0:
+                    self.bucket.take()
+                    chat.take()
+                    break
+                await asyncio.sleep(delay)
+        finally:
+            stats.waiting -= 1
+        stats.sent += 1
+        stats.wait_time += monotonic() - started
+
+    def block(self, chat_id: int | str, seconds: float) -> None:
+        """
+        Приостанавливает отправку в чат на seconds секунд.
+        """
+        self.retries += 1
+        chat = self._chat_bucket(chat_id)
+        chat.blocked_until = max(chat.blocked_until, monotonic() + seconds)
+
+    def report(self) -> str:
+        """
+        Возвращает статистику очередей отправки.
+        """
+        lines = [f"{'lane':6} {'sent':>8} {'waiting':>8} {'max':>6} {'avg wait ms':>12}"]
+        for name, stats in self.lanes.items():
+            avg = stats.wait_time * 1000 / stats.sent if stats.sent else 0.0
+            lines.append(f"{name:6} {stats.sent:>8} {stats.waiting:>8} {stats.max_waiting:>6} {avg:>12.1f}")
+        lines.append(f"RetryAfter: {self.retries}")
+        return "\n".join(lines)
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            if len(self.chats) >= CHAT_BUCKETS_MAXSIZE:
+                now = monotonic()
+                self.chats = {key: bucket for key, bucket in self.chats.items() if not bucket.idle(now)}
+            chat = self.chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return chat
+
+
+# Общий планировщик исходящих сообщений всех экземпляров бота
+limiter = OutboundLimiter()
+
+
+class RateLimitMiddleware(BaseRequestMiddleware):
+    """
+    Middleware сессии бота, пропускающий методы отправки через OutboundLimiter.
+    """
+
+    def __init__(self, outbound: OutboundLimiter = limiter, retries: int = RATE_LIMIT_RETRIES) -> None:
+        """
+        :param outbound: Планировщик исходящих сообщений.
+        :param retries: Сколько раз повторять запрос после TelegramRetryAfter.
+        """
+        self.outbound = outbound
+        self.retries = retries
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None or not method.__api_method__.startswith(LIMITED_PREFIXES):
+            return await make_request(bot, method)
+
+        lane = current_lane.get()
+        for attempt in range(self.retries + 1):
+            await self.outbound.acquire(chat_id, lane)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt == self.retries:
+                    raise
+                logger.warning("Flood control in chat %s, retrying in %d s", chat_id, e.retry_after)
+                self.outbound.block(chat_id, e.retry_after)
@@ -1,4 +1,4 @@
-import json
+import logging
 
 from typing import Callable, Any, Dict, Awaitable
 
@@ -7,6 +7,8 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from aiogram.types import TelegramObject
 from aiogram import BaseMiddleware, Bot
 
+logger = logging.getLogger(__name__)
+
 
 class CounterMiddleware(BaseMiddleware):
     """
@@ -43,20 +45,32 @@ class CounterMiddleware(BaseMiddleware):
         return await handler(event, data)
 
 
-async def send_message_scheduler(bot_token: Bot, chat_id: str, fullname: str, data: str):
+# Бот, через сессию которого отправляются напоминания; регистрируется при запуске
+reminder_bot: Bot | None = None
+
+
+def setup_reminder_bot(bot: Bot) -> None:
     """
-    Функция, которая отправляет запланированное сообщение пользователю.
+    Регистрирует бота для отправки напоминаний. Все напоминания процесса
+    используют его сессию и пул соединений с Bot API.
+
+    :param bot: Экземпляр бота диспетчера.
+    """
+    global reminder_bot
+    reminder_bot = bot
+
 
-    :param bot: Экземпляр бота для отправки сообщений.
-    :param message: Исходное сообщение от пользователя, на основе которого отправляется напоминание.
-    :param date: Словарь с данными о времени и интервалах напоминания.
+async def send_reminder(chat_id: int, fullname: str, data: str):
+    """
+    Задача отдельного напоминания, сохраненная в хранилище задач до появления
+    рассылки deliver_reminders. Напоминание лежит в базе и будет отправлено
+    рассылкой, поэтому задача ничего не отправляет, чтобы не дублировать его.
+    """
+    logger.info("Skipping legacy reminder job for chat %s: reminders are sent by deliver_reminders", chat_id)
+
+
+async def send_message_scheduler(bot_token: str, chat_id: int, fullname: str, data: str):
+    """
+    Задача напоминания в прежнем формате, сохраненная в хранилище задач до появления send_reminder.
     """
-    bot = Bot(token=bot_token)
-    data_event = json.loads(data)
-    try:
-        await bot.send_message(
-            chat_id=chat_id,
-            text=f'Привет, {fullname}, у тебя есть задача {data_event['add_title']}: {data_event['add_description']}'
-        )
-    finally:
-        await bot.session.close()
+    await send_reminder(chat_id=chat_id, fullname=fullname, data=data)
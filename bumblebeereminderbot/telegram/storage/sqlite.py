@@ -0,0 +1,214 @@
+"""
+Хранилище состояний FSM в базе данных бота.
+
+Состояния хранятся в таблице fsm_states и переживают перезапуск бота.
+Перед базой стоит ограниченный LRU-кэш, поэтому обычное обновление не
+читает базу. Изменения записываются не сразу: фоновая задача раз в
+FSM_FLUSH_INTERVAL отправляет все накопившиеся изменения одной операцией
+через очередь записи. Состояния без изменений дольше FSM_TTL удаляются.
+"""
+import asyncio
+import contextvars
+import logging
+import pickle
+from collections import OrderedDict
+from copy import copy
+from time import monotonic, time
+from typing import Any, Mapping, NamedTuple
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+from bumblebeereminderbot.config import FSM_CACHE_MAXSIZE, FSM_TTL, FSM_FLUSH_INTERVAL, FSM_SWEEP_INTERVAL
+from bumblebeereminderbot.database import statements as st
+from bumblebeereminderbot.database.models import read_session
+from bumblebeereminderbot.database.writer import writer
+
+logger = logging.getLogger(__name__)
+
+
+class Record(NamedTuple):
+    """
+    Состояние FSM одного ключа. Записи не изменяются: каждое изменение создает новую запись.
+    """
+    # Имя состояния
+    state: str | None
+    # Данные состояния
+    data: dict[str, Any]
+    # Время последнего изменения, в секундах Unix
+    updated_at: int
+
+    @property
+    def empty(self) -> bool:
+        """Запись без состояния и данных не хранится в базе."""
+        return self.state is None and not self.data
+
+
+def dumps(data: dict[str, Any]) -> bytes | None:
+    """
+    Сериализует данные состояния. Пустые данные хранятся как NULL.
+
+    pickle сохраняет datetime и кортежи курсоров страниц (они входят в ключи
+    кэша запросов), которые JSON превратил бы в строки и списки; данные
+    пишет и читает только сам бот.
+    """
+    return pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL) if data else None
+
+
+def loads(data: bytes | None) -> dict[str, Any]:
+    """
+    Восстанавливает данные состояния, сериализованные функцией dumps.
+    """
+    return pickle.loads(data) if data else {}
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    Хранилище FSM с кэшем в памяти, отложенной групповой записью и удалением устаревших состояний.
+    """
+
+    def __init__(
+        self,
+        key_builder: KeyBuilder | None = None,
+        maxsize: int = FSM_CACHE_MAXSIZE,
+        ttl: int = FSM_TTL,
+        flush_interval: float = FSM_FLUSH_INTERVAL / 1000,
+        sweep_interval: float = FSM_SWEEP_INTERVAL
+    ):
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.sweep_interval = sweep_interval
+        # Недавно использованные записи
+        self._cache: OrderedDict[str, Record] = OrderedDict()
+        # Измененные записи, еще не записанные в базу
+        self._dirty: dict[str, Record] = {}
+        self._task: asyncio.Task | None = None
+        self._last_sweep = monotonic()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._get(key)
+        await self._put(key, state.state if isinstance(state, State) else state, record.data)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return (await self._get(key)).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(f"Data must be a dict or dict-like object, got {type(data).__name__}")
+        record = await self._get(key)
+        await self._put(key, record.state, data.copy())
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return (await self._get(key)).data.copy()
+
+    async def get_value(self, storage_key: StorageKey, dict_key: str, default: Any | None = None) -> Any | None:
+        return copy((await self._get(storage_key)).data.get(dict_key, default))
+
+    async def close(self) -> None:
+        """
+        Останавливает фоновую задачу и записывает оставшиеся изменения.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Записывает все накопившиеся изменения в базу одной операцией очереди записи.
+        """
+        if not self._dirty:
+            return
+        batch = dict(self._dirty)
+        upserts = [
+            {"key": key, "state": record.state, "data": dumps(record.data), "updated_at": record.updated_at}
+            for key, record in batch.items() if not record.empty
+        ]
+        deletes = [key for key, record in batch.items() if record.empty]
+
+        async def write(session):
+            if upserts:
+                await session.execute(st.UPSERT_FSM_STATE, upserts)
+            if deletes:
+                await session.execute(st.DELETE_FSM_STATES, {"keys": deletes})
+
+        await writer.submit(write)
+        # Записи, измененные во время записи, остаются до следующего раза
+        for key, record in batch.items():
+            if self._dirty.get(key) is record:
+                del self._dirty[key]
+
+    async def sweep(self) -> int:
+        """
+        Удаляет состояния без изменений дольше ttl из базы и из памяти.
+
+        :return: Количество удаленных из базы состояний
+        """
+        expired_before = int(time()) - self.ttl
+        for key in [key for key, record in self._cache.items() if record.updated_at < expired_before]:
+            del self._cache[key]
+
+        async def write(session):
+            result = await session.execute(st.DELETE_EXPIRED_FSM_STATES, {"expired_before": expired_before})
+            return result.rowcount
+
+        count = await writer.submit(write)
+        self._last_sweep = monotonic()
+        if count:
+            logger.info("Removed %d expired FSM states", count)
+        return count
+
+    async def _get(self, key: StorageKey) -> Record:
+        name = self.key_builder.build(key)
+        record = self._cache.get(name) or self._dirty.get(name)
+        if record is None:
+            record = await self._load(name)
+        self._remember(name, record)
+
+        if record.updated_at < time() - self.ttl:
+            # Устаревшая запись еще не удалена сборщиком
+            return Record(None, {}, record.updated_at)
+        return record
+
+    async def _load(self, name: str) -> Record:
+        async with read_session() as session:
+            row = (await session.execute(st.FSM_STATE_BY_KEY, {"key": name})).first()
+        if row is None:
+            return Record(None, {}, int(time()))
+        return Record(row.state, loads(row.data), row.updated_at)
+
+    async def _put(self, key: StorageKey, state: str | None, data: dict[str, Any]) -> None:
+        name = self.key_builder.build(key)
+        record = Record(state, data, int(time()))
+        self._remember(name, record)
+        self._dirty[name] = record
+
+        if self._task is None or self._task.done():
+            # Фоновая задача не наследует контекст обновления, из которого
+            # была запущена, чтобы её запросы не учитывались в чужой статистике
+            self._task = asyncio.create_task(self._run(), context=contextvars.Context())
+
+    def _remember(self, name: str, record: Record) -> None:
+        self._cache[name] = record
+        self._cache.move_to_end(name)
+        # Вытесненные записи остаются в базе или в очереди изменений
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if monotonic() - self._last_sweep >= self.sweep_interval:
+                    await self.sweep()
+            except Exception as e:
+                # Изменения остаются в очереди и будут записаны в следующий раз
+                logger.exception("Failed to write FSM states: %s", e)
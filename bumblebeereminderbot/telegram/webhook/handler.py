@@ -0,0 +1,73 @@
+"""
+Прием обновлений через webhook.
+
+Обработчик запросов сразу отвечает Telegram и кладет обновление в
+ограниченную очередь, которую разбирает фиксированное число обработчиков.
+Так количество одновременно обрабатываемых обновлений не превышает
+WEBHOOK_WORKERS, а при переполнении очереди сервер перестает отвечать
+Telegram, и тот придерживает обновления у себя.
+"""
+import asyncio
+import logging
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+
+from bumblebeereminderbot.config import WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerRequestHandler(SimpleRequestHandler):
+    """
+    Обработчик webhook с пулом обработчиков обновлений.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        workers: int = WEBHOOK_WORKERS,
+        queue_size: int = WEBHOOK_QUEUE_SIZE,
+        secret_token: str | None = None,
+        **data: Any
+    ):
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=True, secret_token=secret_token, **data)
+        self.workers = workers
+        self.queue_size = queue_size
+        self._queue: asyncio.Queue[tuple[Bot, dict[str, Any]]] | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        if not self._tasks:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+        update = await request.json(loads=bot.session.json_loads)
+        # При заполненной очереди ответ задерживается до освобождения места
+        await self._queue.put((bot, update))
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def close(self) -> None:
+        """
+        Дожидается обработки принятых обновлений, останавливает обработчики и закрывает сессию бота.
+        """
+        if self._tasks:
+            await self._queue.join()
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+        await super().close()
+
+    async def _work(self) -> None:
+        while True:
+            bot, update = await self._queue.get()
+            try:
+                await self._background_feed_update(bot=bot, update=update)
+            except Exception as e:
+                logger.exception("Failed to process update %s: %s", update.get("update_id"), e)
+            finally:
+                self._queue.task_done()